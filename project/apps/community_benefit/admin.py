@@ -1,13 +1,58 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin.sites import site as default_site
-from apps.main.admin import custom_admin_site
+from apps.main.admin import custom_admin_site, OptimizedChangeListMixin
+from apps.community_payment.batches import BatchError, generate_batches
+from apps.community_payment.distribution import (
+    RULES,
+    DistributionError,
+    distribute_allocation,
+)
 from .models import CommunityBenefitCategory, CommunityBenefitAllocation
 
 # Register your models here.
 
 
+def distribute_action(rule):
+    def action(modeladmin, request, queryset):
+        for allocation in queryset.select_related(
+            "community_benefit_category", "trust_region"
+        ):
+            try:
+                rows = distribute_allocation(allocation, rule)
+            except DistributionError as error:
+                modeladmin.message_user(
+                    request, f"{allocation}: {error}", messages.ERROR
+                )
+            else:
+                modeladmin.message_user(
+                    request, f"{allocation}: distributed to {len(rows)} households"
+                )
+
+    action.__name__ = f"distribute_by_{rule}"
+    action.short_description = f"Distribute selected allocations: {RULES[rule]}"
+    return action
+
+
+@admin.action(description="Generate payment batch files")
+def generate_payment_batches(modeladmin, request, queryset):
+    for allocation in queryset.select_related(
+        "community_benefit_category", "trust_region"
+    ):
+        try:
+            batches, rejected = generate_batches(allocation)
+        except (OSError, BatchError) as error:
+            modeladmin.message_user(request, f"{allocation}: {error}", messages.ERROR)
+            continue
+        modeladmin.message_user(
+            request,
+            f"{allocation}: wrote {len(batches)} batch files, "
+            f"{len(rejected)} distributions rejected",
+            messages.WARNING if rejected else messages.SUCCESS,
+        )
+
+
 @admin.register(CommunityBenefitCategory)
-class CommunityBenefitCategoryAdmin(admin.ModelAdmin):
+class CommunityBenefitCategoryAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = ("name", "trust_region", "year")
     search_fields = ("name", "trust_region__name", "year")
     list_filter = ("name", "trust_region", "year")
@@ -25,7 +70,7 @@ class CommunityBenefitCategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(CommunityBenefitAllocation)
-class CommunityBenefitAllocationAdmin(admin.ModelAdmin):
+class CommunityBenefitAllocationAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = (
         "community_benefit_category",
         "trust_region",
@@ -41,6 +86,7 @@ class CommunityBenefitAllocationAdmin(admin.ModelAdmin):
     list_filter = ("community_benefit_category", "trust_region", "year")
     list_per_page = 25
     ordering = ("-year", "community_benefit_category")
+    actions = [distribute_action(rule) for rule in RULES] + [generate_payment_batches]
 
     fieldsets = (
         (
@@ -1,18 +1,63 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
 from django.db.models import F
 from django.db import models
 from django.db.models import Case, When, Value, IntegerField
 from django.contrib.admin.sites import site as default_site
-from apps.main.admin import custom_admin_site
+from apps.main.admin import custom_admin_site, OptimizedChangeListMixin
+from apps.main.models import TrustRegion
+from apps.main.paginators import KeysetPaginator
+from apps.main.search import TrigramSearchMixin
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
 from dal_select2.widgets import ModelSelect2
-from .models import Dwelling, Household, CommunityPerson, HouseholdBankAccount
+from .census import COLUMNS, CensusError, CensusImporter, read_rows
+from .dedup import merge_persons
+from .models import (
+    Dwelling,
+    Household,
+    CommunityPerson,
+    HouseholdBankAccount,
+    DuplicateCluster,
+    DemographicRollup,
+)
+from .rollups import summary
 
 
 # Register your models here.
 
 
+class HouseholdSizeFilter(admin.SimpleListFilter):
+    title = "household size"
+    parameter_name = "size"
+    SIZES = {
+        "0": (0, 0),
+        "1": (1, 1),
+        "2-4": (2, 4),
+        "5-8": (5, 8),
+        "9+": (9, None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [
+            (key, "No members" if key == "0" else f"{key} members")
+            for key in self.SIZES
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.SIZES:
+            return queryset
+        low, high = self.SIZES[self.value()]
+        if high is None:
+            return queryset.filter(member_count__gte=low)
+        return queryset.filter(member_count__range=(low, high))
+
+
 @admin.register(Dwelling)
-class DwellingAdmin(admin.ModelAdmin):
+class DwellingAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = (
         "trust_region",
         "trust_village",
@@ -124,8 +169,17 @@ class HouseholdBankAccountInline(admin.StackedInline):
         return super().has_add_permission(request, obj)
 
 
+class CensusUploadForm(forms.Form):
+    file = forms.FileField(help_text="A .csv or .xlsx census file.")
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        help_text="Validate the file without saving anything.",
+    )
+
+
 @admin.register(Household)
-class HouseholdAdmin(admin.ModelAdmin):
+class HouseholdAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     inlines = [HouseholdBankAccountInline, HeadOfHouseholdInline, MembersInline]
 
     list_display = (
@@ -134,6 +188,9 @@ class HouseholdAdmin(admin.ModelAdmin):
         "dwelling_number_display",
         "household_number",
         "head_of_household_name",
+        "member_count",
+        "adult_count",
+        "child_count",
     )
     search_fields = (
         "head_of_household__first_name",
@@ -144,9 +201,25 @@ class HouseholdAdmin(admin.ModelAdmin):
         "trust_region",
         "trust_village",
         "dwelling_number",
+        HouseholdSizeFilter,
     )
     list_per_page = 50
+    paginator = KeysetPaginator
+    show_full_result_count = False
+    export_fields = (
+        ("Trust Region", "trust_region__name"),
+        ("Trust Village", "trust_village__name"),
+        ("Dwelling Number", "dwelling_number__dwelling_number"),
+        ("Household Number", "household_number"),
+        ("Head First Name", "head_of_household__first_name"),
+        ("Head Last Name", "head_of_household__last_name"),
+        ("Primary Income Source", "primary_income_source"),
+        ("Members", "member_count"),
+        ("Adults", "adult_count"),
+        ("Children", "child_count"),
+    )
     ordering = ("dwelling_number",)
+    readonly_fields = ("member_count", "adult_count", "child_count", "head_count")
 
     fieldsets = (
         (
@@ -161,11 +234,60 @@ class HouseholdAdmin(admin.ModelAdmin):
                 )
             },
         ),
+        (
+            "Members",
+            {"fields": (("member_count", "adult_count", "child_count", "head_count"),)},
+        ),
     )
 
+    def get_urls(self):
+        urls = [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_census_view),
+                name="community_context_household_import",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_census_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        request.current_app = self.admin_site.name
+        form = CensusUploadForm(request.POST or None, request.FILES or None)
+        importer = None
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            importer = CensusImporter(dry_run=form.cleaned_data["dry_run"])
+            try:
+                importer.run(read_rows(upload.file, upload.name))
+            except CensusError as error:
+                form.add_error("file", str(error))
+                importer = None
+            else:
+                summary = ", ".join(
+                    f"{count} {name}" for name, count in importer.created.items()
+                )
+                verb = "Would create" if importer.dry_run else "Created"
+                messages.success(request, f"{verb} {summary}.")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Import census",
+            "form": form,
+            "importer": importer,
+            "columns": COLUMNS,
+        }
+        return TemplateResponse(
+            request, "admin/community_context/household/import_census.html", context
+        )
+
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "dwelling_number":
-            kwargs["widget"] = ModelSelect2(url="dwelling_autocomplete")
+            kwargs["widget"] = ModelSelect2(
+                url="dwelling_autocomplete", forward=["trust_village", "trust_region"]
+            )
             return super().formfield_for_foreignkey(db_field, request, **kwargs)
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
@@ -173,11 +295,13 @@ class HouseholdAdmin(admin.ModelAdmin):
         return obj.trust_village.name if obj.trust_village else None
 
     trust_village_name.short_description = "Trust Village Name"
+    trust_village_name.related = ("trust_village",)
 
     def dwelling_number_display(self, obj):
         return obj.dwelling_number.dwelling_number if obj.dwelling_number else None
 
     dwelling_number_display.short_description = "Dwelling Number"
+    dwelling_number_display.related = ("dwelling_number",)
 
     def head_of_household_name(self, obj):
         if obj.head_of_household:
@@ -187,10 +311,13 @@ class HouseholdAdmin(admin.ModelAdmin):
         return None
 
     head_of_household_name.short_description = "Head of Household"
+    head_of_household_name.related = ("head_of_household",)
 
 
 @admin.register(CommunityPerson)
-class CommunityPersonAdmin(admin.ModelAdmin):
+class CommunityPersonAdmin(
+    TrigramSearchMixin, OptimizedChangeListMixin, admin.ModelAdmin
+):
     list_display = (
         "first_name",
         "last_name",
@@ -208,11 +335,10 @@ class CommunityPersonAdmin(admin.ModelAdmin):
     search_fields = (
         "first_name",
         "last_name",
-        "trust_region__name",
-        "trust_village__name",
-        "dwelling_number__dwelling_number",
-        "household_number__household_number",
+        "=dwelling_number__dwelling_number",
+        "=household_number__household_number",
     )
+    trigram_fields = ("first_name", "last_name")
     list_filter = (
         "sex",
         "relationship_to_head",
@@ -223,6 +349,22 @@ class CommunityPersonAdmin(admin.ModelAdmin):
         "education_level",
     )
     list_per_page = 50
+    paginator = KeysetPaginator
+    show_full_result_count = False
+    export_fields = (
+        ("First Name", "first_name"),
+        ("Last Name", "last_name"),
+        ("Sex", "sex"),
+        ("Relationship to Head", "relationship_to_head"),
+        ("Age Group", "age_group"),
+        ("Date of Birth", "date_of_birth"),
+        ("Trust Region", "trust_region__name"),
+        ("Trust Village", "trust_village__name"),
+        ("Dwelling Number", "dwelling_number__dwelling_number"),
+        ("Household Number", "household_number__household_number"),
+        ("Occupation", "occupation"),
+        ("Education Level", "education_level"),
+    )
     ordering = (
         "trust_region",
         "trust_village",
@@ -264,7 +406,7 @@ class CommunityPersonAdmin(admin.ModelAdmin):
 
 
 @admin.register(HouseholdBankAccount)
-class HouseholdBankAccountAdmin(admin.ModelAdmin):
+class HouseholdBankAccountAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = (
         "account_name",
         "account_number",
@@ -283,6 +425,16 @@ class HouseholdBankAccountAdmin(admin.ModelAdmin):
     )
     list_filter = ("bank_initials", "status", "household")
     list_per_page = 50
+    export_fields = (
+        ("Account Name", "account_name"),
+        ("Account Number", "account_number"),
+        ("Bank", "bank_initials__bank_initials"),
+        ("Branch", "branch"),
+        ("Status", "status"),
+        ("Trust Village", "household__trust_village__name"),
+        ("Dwelling Number", "household__dwelling_number__dwelling_number"),
+        ("Household Number", "household__household_number"),
+    )
     ordering = (
         "account_name",
         "status",
@@ -310,6 +462,133 @@ class HouseholdBankAccountAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(DuplicateCluster)
+class DuplicateClusterAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
+    list_display = ("__str__", "members", "score", "status", "created", "review")
+    list_filter = ("status",)
+    list_per_page = 50
+    ordering = ("-score",)
+    readonly_fields = ("signature", "score", "status", "created")
+    actions = ["dismiss"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<path:object_id>/merge/",
+                self.admin_site.admin_view(self.merge_view),
+                name="community_context_duplicatecluster_merge",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def members(self, obj):
+        return ", ".join(
+            f"{candidate.person} ({candidate.person.trust_village})"
+            for candidate in obj.candidates.all()
+        )
+
+    members.short_description = "Members"
+    members.related = ("candidates__person__trust_village",)
+
+    def review(self, obj):
+        if obj.status != "pending":
+            return ""
+        url = reverse(
+            f"{self.admin_site.name}:community_context_duplicatecluster_merge",
+            args=[obj.pk],
+        )
+        return format_html('<a href="{}">Review</a>', url)
+
+    review.short_description = "Review"
+
+    @admin.action(description="Mark selected clusters as not duplicates")
+    def dismiss(self, request, queryset):
+        queryset.filter(status="pending").update(status="dismissed")
+
+    def merge_view(self, request, object_id):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        request.current_app = self.admin_site.name
+        cluster = get_object_or_404(DuplicateCluster, pk=object_id, status="pending")
+        persons = list(
+            CommunityPerson.objects.filter(duplicate_candidates__cluster=cluster)
+            .select_related("trust_village", "dwelling_number", "household_number")
+            .order_by("pk")
+        )
+        changelist = (
+            f"{self.admin_site.name}:community_context_duplicatecluster_changelist"
+        )
+        if request.method == "POST":
+            if "dismiss" in request.POST:
+                cluster.status = "dismissed"
+                cluster.save(update_fields=["status"])
+                messages.success(request, f"{cluster} marked as not duplicates.")
+                return redirect(changelist)
+            keep = [p for p in persons if str(p.pk) == request.POST.get("survivor")]
+            merge = [p for p in persons if str(p.pk) in request.POST.getlist("merge")]
+            merge = [p for p in merge if p not in keep]
+            if keep and merge:
+                merge_persons(keep[0], merge)
+                cluster.status = "merged"
+                cluster.save(update_fields=["status"])
+                messages.success(
+                    request, f"Merged {len(merge)} records into {keep[0]}."
+                )
+                return redirect(changelist)
+            messages.error(
+                request, "Pick one record to keep and at least one to merge."
+            )
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": f"Review {cluster}",
+            "cluster": cluster,
+            "persons": persons,
+        }
+        return TemplateResponse(
+            request, "admin/community_context/duplicatecluster/merge.html", context
+        )
+
+
+@admin.register(DemographicRollup)
+class DemographicRollupAdmin(admin.ModelAdmin):
+    # The changelist is a dashboard over the rollups; rows are maintained
+    # by signals and refresh_demographic_rollups, never edited by hand.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        request.current_app = self.admin_site.name
+        regions = TrustRegion.objects.order_by("name")
+        region = None
+        if request.GET.get("trust_region", "").isdigit():
+            region = get_object_or_404(regions, pk=request.GET["trust_region"])
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": f"Demographics of {region}" if region else "Demographics",
+            "regions": regions,
+            "region": region,
+            "tables": summary(region),
+            **(extra_context or {}),
+        }
+        return TemplateResponse(
+            request, "admin/community_context/demographicrollup/dashboard.html", context
+        )
+
+
 for model, model_admin in default_site._registry.items():
     if model not in custom_admin_site._registry:
         custom_admin_site.register(model, type(model_admin))
@@ -5,3 +5,6 @@ class CommunityContextConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.community_context"
     verbose_name = "Community Context"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,392 @@
+import csv
+import io
+from datetime import date, datetime
+
+from django.db import transaction
+
+from apps.main.models import Bank, TrustRegion, TrustVillage
+from .counters import rebuild_household_counts
+from .models import (
+    CommunityPerson,
+    Dwelling,
+    Household,
+    HouseholdBankAccount,
+    account_number_error,
+)
+from .rollups import add_persons
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - optional dependency
+    openpyxl = None
+
+
+COLUMNS = (
+    "trust_region",
+    "trust_village",
+    "dwelling_number",
+    "dwelling_type",
+    "construction_year",
+    "household_number",
+    "primary_income_source",
+    "first_name",
+    "last_name",
+    "sex",
+    "relationship_to_head",
+    "age_group",
+    "date_of_birth",
+    "occupation",
+    "education_level",
+    "account_name",
+    "account_number",
+    "bank",
+    "branch",
+    "account_status",
+)
+REQUIRED_COLUMNS = (
+    "trust_village",
+    "dwelling_number",
+    "household_number",
+    "first_name",
+    "last_name",
+    "sex",
+    "relationship_to_head",
+    "age_group",
+)
+
+
+class CensusError(Exception):
+    pass
+
+
+def _header(value):
+    return str(value or "").strip().lower().replace(" ", "_")
+
+
+def read_rows(file, filename):
+    """
+    Yield one dict per data row of a census CSV or XLSX file, keyed by
+    normalised column name. Rows are read lazily so large files stream.
+    """
+    if filename.lower().endswith(".xlsx"):
+        if openpyxl is None:
+            raise CensusError("Install openpyxl to import .xlsx census files.")
+        sheet = openpyxl.load_workbook(file, read_only=True).active
+        yield from _dict_rows(sheet.iter_rows(values_only=True))
+        return
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        yield from _dict_rows(csv.reader(file))
+    except csv.Error as error:
+        raise CensusError(f"Cannot read the CSV file: {error}")
+    except UnicodeDecodeError as error:
+        raise CensusError(
+            f"The CSV file is not UTF-8 text ({error.reason} at byte {error.start})."
+        )
+
+
+def _dict_rows(rows):
+    header = [_header(value) for value in next(rows, ())]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise CensusError(f"Missing columns: {', '.join(missing)}")
+    for row in rows:
+        values = ["" if value is None else str(value).strip() for value in row]
+        if any(values):
+            yield dict(zip(header, values))
+
+
+def _choices(model, field_name):
+    # Accept either the stored value or its label, in any case.
+    mapping = {}
+    for value, label in model._meta.get_field(field_name).choices:
+        mapping[str(value).lower()] = value
+        mapping[str(label).lower()] = value
+    return mapping
+
+
+class CensusImporter:
+    """
+    Load census rows into Dwelling, Household, CommunityPerson and
+    HouseholdBankAccount.
+
+    Names are resolved through lookup maps built once up front. Each trust
+    village is validated as a batch and written with chunked ``bulk_create``
+    inside its own transaction. Invalid rows are skipped and reported in
+    ``errors`` as ``(row_number, message)``.
+    """
+
+    def __init__(self, dry_run=False, batch_size=2000):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.errors = []
+        self.created = {
+            "dwellings": 0,
+            "households": 0,
+            "persons": 0,
+            "bank_accounts": 0,
+        }
+        self.regions = {
+            name.lower(): pk
+            for pk, name in TrustRegion.objects.values_list("pk", "name")
+        }
+        self.villages = {
+            name.lower(): (pk, region_id)
+            for pk, name, region_id in TrustVillage.objects.values_list(
+                "pk", "name", "trust_region_id"
+            )
+        }
+        self.banks = {}
+        for bank in Bank.objects.all():
+            self.banks[bank.bank_initials.lower()] = bank
+            self.banks[bank.bank_name.lower()] = bank
+        self.choices = {
+            name: _choices(CommunityPerson, name)
+            for name in (
+                "sex",
+                "relationship_to_head",
+                "age_group",
+                "occupation",
+                "education_level",
+            )
+        }
+        self.dwelling_types = _choices(Dwelling, "dwelling_type")
+        self.account_statuses = _choices(HouseholdBankAccount, "status")
+
+    def run(self, rows):
+        # Files are not always sorted by village, and each village must be
+        # loaded in one pass, so its rows are gathered first.
+        villages = {}
+        for number, row in enumerate(rows, start=2):  # row 1 is the header
+            village = row.get("trust_village", "").lower()
+            villages.setdefault(village, []).append((number, row))
+        for village, group in villages.items():
+            self.load_village(village, group)
+        self.errors.sort(key=lambda error: error[0])
+        return self
+
+    def load_village(self, village_name, rows):
+        if village_name not in self.villages:
+            message = f"Unknown trust village '{village_name}'"
+            if not village_name:
+                message = "trust_village is required"
+            for number, _ in rows:
+                self.errors.append((number, message))
+            return
+        village_id, village_region_id = self.villages[village_name]
+        records = []
+        for number, row in rows:
+            try:
+                records.append((number, self.clean(row, village_region_id)))
+            except CensusError as error:
+                self.errors.append((number, str(error)))
+
+        with transaction.atomic():
+            self.write(village_id, records)
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+    def clean(self, row, village_region_id):
+        record = {}
+        region_name = row.get("trust_region", "").lower()
+        if region_name:
+            if region_name not in self.regions:
+                raise CensusError(f"Unknown trust region '{row['trust_region']}'")
+            record["trust_region_id"] = self.regions[region_name]
+        else:
+            record["trust_region_id"] = village_region_id
+
+        for name in ("dwelling_number", "household_number"):
+            record[name] = self._integer(row, name, 1, 999)
+        record["construction_year"] = self._integer(
+            row, "construction_year", 1900, date.today().year, required=False
+        )
+        record["dwelling_type"] = self._choice(
+            self.dwelling_types, row, "dwelling_type", required=False
+        )
+        record["primary_income_source"] = row.get("primary_income_source", "")
+
+        for name in ("first_name", "last_name"):
+            if not row.get(name):
+                raise CensusError(f"{name} is required")
+            record[name] = row[name]
+        for name, choices in self.choices.items():
+            required = name not in ("occupation", "education_level")
+            record[name] = self._choice(choices, row, name, required)
+        record["date_of_birth"] = self._date(row.get("date_of_birth", ""))
+
+        record["account"] = None
+        if row.get("account_number"):
+            bank = self.banks.get(row.get("bank", "").lower())
+            if bank is None:
+                raise CensusError(f"Unknown bank '{row.get('bank', '')}'")
+            error = account_number_error(row["account_number"], bank)
+            if error:
+                raise CensusError(error)
+            record["account"] = {
+                "account_name": row.get("account_name") or "No Account",
+                "account_number": row["account_number"],
+                "bank_initials_id": bank.pk,
+                "branch": row.get("branch", ""),
+                "status": self._choice(
+                    self.account_statuses, row, "account_status", required=False
+                ),
+            }
+        return record
+
+    def _integer(self, row, name, low, high, required=True):
+        value = row.get(name, "")
+        if not value:
+            if required:
+                raise CensusError(f"{name} is required")
+            return None
+        try:
+            number = int(float(value))
+        except ValueError:
+            raise CensusError(f"{name} '{value}' is not a number")
+        if not low <= number <= high:
+            raise CensusError(f"{name} must be between {low} and {high}")
+        return number
+
+    def _choice(self, choices, row, name, required=True):
+        value = row.get(name, "")
+        if not value:
+            if required:
+                raise CensusError(f"{name} is required")
+            return ""
+        if value.lower() not in choices:
+            raise CensusError(f"{name} '{value}' is not a valid choice")
+        return choices[value.lower()]
+
+    def _date(self, value):
+        if not value:
+            return None
+        for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"):
+            try:
+                parsed = datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+            if not date(1900, 1, 1) <= parsed <= date.today():
+                raise CensusError(f"date_of_birth {value} is out of range")
+            return parsed
+        raise CensusError(f"date_of_birth '{value}' is not a date")
+
+    def write(self, village_id, records):
+        dwellings = dict(
+            Dwelling.objects.filter(trust_village_id=village_id).values_list(
+                "dwelling_number", "pk"
+            )
+        )
+        new_dwellings = {}
+        for number, record in records:
+            key = record["dwelling_number"]
+            if key in dwellings or key in new_dwellings:
+                continue
+            if record["construction_year"] is None:
+                # Dwelling.construction_year is NOT NULL.
+                continue
+            new_dwellings[key] = Dwelling(
+                trust_region_id=record["trust_region_id"],
+                trust_village_id=village_id,
+                dwelling_number=key,
+                dwelling_type=record["dwelling_type"],
+                construction_year=record["construction_year"],
+            )
+        for dwelling in Dwelling.objects.bulk_create(
+            new_dwellings.values(), batch_size=self.batch_size
+        ):
+            dwellings[dwelling.dwelling_number] = dwelling.pk
+        self.created["dwellings"] += len(new_dwellings)
+
+        households = {
+            (dwelling_id, number): (pk, head_id, has_account)
+            for pk, dwelling_id, number, head_id, has_account in Household.objects.filter(
+                trust_village_id=village_id
+            ).values_list(
+                "pk",
+                "dwelling_number_id",
+                "household_number",
+                "head_of_household_id",
+                "householdbankaccount",
+            )
+        }
+        new_households = {}
+        loadable = []
+        for number, record in records:
+            dwelling_id = dwellings.get(record["dwelling_number"])
+            if dwelling_id is None:
+                self.errors.append(
+                    (number, "construction_year is required for a new dwelling")
+                )
+                continue
+            record["dwelling_id"] = dwelling_id
+            key = (dwelling_id, record["household_number"])
+            loadable.append((number, record))
+            if key not in households and key not in new_households:
+                new_households[key] = Household(
+                    trust_region_id=record["trust_region_id"],
+                    trust_village_id=village_id,
+                    dwelling_number_id=dwelling_id,
+                    household_number=record["household_number"],
+                    primary_income_source=record["primary_income_source"],
+                )
+        for household in Household.objects.bulk_create(
+            new_households.values(), batch_size=self.batch_size
+        ):
+            key = (household.dwelling_number_id, household.household_number)
+            households[key] = (household.pk, None, None)
+        self.created["households"] += len(new_households)
+
+        persons, accounts, heads = [], {}, {}
+        for number, record in loadable:
+            household_id, head_id, has_account = households[
+                (record["dwelling_id"], record["household_number"])
+            ]
+            person = CommunityPerson(
+                first_name=record["first_name"],
+                last_name=record["last_name"],
+                sex=record["sex"],
+                relationship_to_head=record["relationship_to_head"],
+                age_group=record["age_group"],
+                date_of_birth=record["date_of_birth"],
+                occupation=record["occupation"],
+                education_level=record["education_level"],
+                trust_region_id=record["trust_region_id"],
+                trust_village_id=village_id,
+                dwelling_number_id=record["dwelling_id"],
+                household_number_id=household_id,
+            )
+            persons.append(person)
+            if record["relationship_to_head"] == "Head" and head_id is None:
+                heads.setdefault(household_id, person)
+            if record["account"] and not has_account:
+                accounts.setdefault(
+                    household_id,
+                    HouseholdBankAccount(
+                        household_id=household_id, **record["account"]
+                    ),
+                )
+        CommunityPerson.objects.bulk_create(persons, batch_size=self.batch_size)
+        self.created["persons"] += len(persons)
+        # bulk_create skips the signals that keep the counters and rollups.
+        rebuild_household_counts(
+            Household.objects.filter(
+                pk__in={person.household_number_id for person in persons}
+            ),
+            batch_size=self.batch_size,
+        )
+        add_persons(persons)
+
+        Household.objects.bulk_update(
+            [
+                Household(pk=household_id, head_of_household_id=person.pk)
+                for household_id, person in heads.items()
+            ],
+            ["head_of_household"],
+            batch_size=self.batch_size,
+        )
+        HouseholdBankAccount.objects.bulk_create(
+            accounts.values(), batch_size=self.batch_size
+        )
+        self.created["bank_accounts"] += len(accounts)
@@ -0,0 +1,86 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import CommunityPerson, Household
+
+COUNTERS = ("member_count", "adult_count", "child_count", "head_count")
+COUNTED_FIELDS = {"household_number_id", "age_group", "relationship_to_head"}
+ADULT_AGE_GROUPS = ("Young Adult", "Middle-aged Adult", "Old Age")
+
+
+def counted(values):
+    # What a person with these ``COUNTED_FIELDS`` values contributes to their
+    # household's counters.
+    if values is None:
+        return None
+    adult = values["age_group"] in ADULT_AGE_GROUPS
+    return values["household_number_id"], {
+        "member_count": 1,
+        "adult_count": int(adult),
+        "child_count": int(not adult),
+        "head_count": int(values["relationship_to_head"] == "Head"),
+    }
+
+
+@transaction.atomic
+def apply_changes(changes):
+    """
+    Add ``{household_id: {counter: delta}}`` to the stored counters with one
+    UPDATE per household, so concurrent changes never overwrite each other.
+    """
+    for household_id, deltas in changes.items():
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if household_id is None or not deltas:
+            continue
+        Household.objects.filter(pk=household_id).update(
+            **{name: F(name) + delta for name, delta in deltas.items()}
+        )
+
+
+def move(before, after):
+    # Counter deltas for a person going from ``before`` to ``after``, each a
+    # ``counted()`` result or None.
+    changes = defaultdict(Counter)
+    if before is not None:
+        household_id, counts = before
+        changes[household_id].subtract(counts)
+    if after is not None:
+        household_id, counts = after
+        changes[household_id].update(counts)
+    return changes
+
+
+@transaction.atomic
+def rebuild_household_counts(households=None, batch_size=2000):
+    """
+    Recount members for ``households`` (default all) from CommunityPerson and
+    store the counters that drifted. Returns the number of households fixed.
+    Needed after anything that writes people without signals, such as
+    ``bulk_create`` or ``QuerySet.update``.
+    """
+    if households is None:
+        households = Household.objects.all()
+    counts = {
+        row.pop("household_number"): row
+        for row in CommunityPerson.objects.filter(household_number__in=households)
+        .values("household_number")
+        .annotate(
+            member_count=Count("pk"),
+            adult_count=Count("pk", filter=Q(age_group__in=ADULT_AGE_GROUPS)),
+            child_count=Count("pk", filter=~Q(age_group__in=ADULT_AGE_GROUPS)),
+            head_count=Count("pk", filter=Q(relationship_to_head="Head")),
+        )
+        .order_by()
+    }
+    empty = dict.fromkeys(COUNTERS, 0)
+    changed = []
+    for household in households.only("pk", *COUNTERS).iterator(chunk_size=5000):
+        expected = counts.get(household.pk, empty)
+        if any(getattr(household, name) != expected[name] for name in COUNTERS):
+            for name in COUNTERS:
+                setattr(household, name, expected[name])
+            changed.append(household)
+    Household.objects.bulk_update(changed, COUNTERS, batch_size=batch_size)
+    return len(changed)
@@ -0,0 +1,223 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.db import transaction
+
+from .models import CommunityPerson, DuplicateCandidate, DuplicateCluster
+
+THRESHOLD = 0.85
+# Blocks larger than this are compared within a sliding window over the
+# sorted names instead of all pairs, so no block grows quadratically.
+MAX_BLOCK = 200
+WINDOW = 20
+
+SOUNDEX_CODES = {
+    **dict.fromkeys("BFPV", "1"),
+    **dict.fromkeys("CGJKQSXZ", "2"),
+    **dict.fromkeys("DT", "3"),
+    "L": "4",
+    **dict.fromkeys("MN", "5"),
+    "R": "6",
+}
+
+
+def soundex(name):
+    letters = [char for char in name.upper() if char.isalpha()]
+    if not letters:
+        return ""
+    code, last = letters[0], SOUNDEX_CODES.get(letters[0], "")
+    for char in letters[1:]:
+        digit = SOUNDEX_CODES.get(char, "")
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in "HW":
+            last = digit
+    return code.ljust(4, "0")
+
+
+def _normal(name):
+    return " ".join(name.lower().split())
+
+
+def score(a, b):
+    """
+    Similarity of two ``(pk, first_name, last_name, date_of_birth)`` rows,
+    between 0 and 1. Swapped first and last names count as a match, and
+    differing known dates of birth rule a pair out.
+    """
+    if a[3] and b[3] and a[3] != b[3]:
+        return 0.0
+    first = SequenceMatcher(None, _normal(a[1]), _normal(b[1])).ratio()
+    last = SequenceMatcher(None, _normal(a[2]), _normal(b[2])).ratio()
+    swapped = (
+        SequenceMatcher(None, _normal(a[1]), _normal(b[2])).ratio()
+        + SequenceMatcher(None, _normal(a[2]), _normal(b[1])).ratio()
+    ) / 2
+    return max((first + last) / 2, swapped)
+
+
+def block_pairs(block):
+    if len(block) <= MAX_BLOCK:
+        return combinations(block, 2)
+    block = sorted(block, key=lambda row: (_normal(row[2]), _normal(row[1])))
+    return (
+        (row, other)
+        for i, row in enumerate(block)
+        for other in block[i + 1 : i + 1 + WINDOW]
+    )
+
+
+def score_blocks(blocks, threshold=THRESHOLD):
+    # Runs in worker processes: plain tuples in and out, no database access.
+    matches = []
+    for block in blocks:
+        for a, b in block_pairs(block):
+            similarity = score(a, b)
+            if similarity >= threshold:
+                matches.append((a[0], b[0], similarity))
+    return matches
+
+
+def build_blocks(queryset):
+    """
+    Group people by trust village, sex and age group, then by the Soundex of
+    each of their names. A person sits in one block per name, so a
+    misspelling in either name, or names recorded the wrong way round, still
+    meet while every block stays small.
+    """
+    blocks = defaultdict(list)
+    rows = queryset.values_list(
+        "pk",
+        "first_name",
+        "last_name",
+        "date_of_birth",
+        "trust_village_id",
+        "sex",
+        "age_group",
+    ).iterator(chunk_size=5000)
+    for pk, first, last, born, village_id, sex, age_group in rows:
+        row = (pk, first, last, born)
+        base = (village_id, sex, age_group)
+        for code in {soundex(first), soundex(last)}:
+            blocks[(*base, code)].append(row)
+    return [block for block in blocks.values() if len(block) > 1]
+
+
+def _chunks(blocks, count):
+    # Deal blocks out so each worker gets a similar number of comparisons.
+    chunks = [[] for _ in range(count)]
+    loads = [0] * count
+    for block in sorted(blocks, key=len, reverse=True):
+        i = loads.index(min(loads))
+        chunks[i].append(block)
+        loads[i] += min(len(block), MAX_BLOCK) ** 2
+    return [chunk for chunk in chunks if chunk]
+
+
+def find_duplicates(queryset=None, threshold=THRESHOLD, workers=None):
+    """
+    Return ``{frozenset(pks): best_score}`` for each cluster of people that
+    score at least ``threshold`` against one another, directly or through a
+    chain of matches.
+    """
+    if queryset is None:
+        queryset = CommunityPerson.objects.all()
+    blocks = build_blocks(queryset)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        matches = score_blocks(blocks, threshold)
+    else:
+        matches = []
+        with ProcessPoolExecutor(workers) as pool:
+            chunks = _chunks(blocks, workers * 4)
+            for found in pool.map(score_blocks, chunks, [threshold] * len(chunks)):
+                matches.extend(found)
+
+    parent = {}
+
+    def find(pk):
+        while parent.setdefault(pk, pk) != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    best = {}
+    for a, b, similarity in matches:
+        parent[find(a)] = find(b)
+        best[(a, b)] = similarity
+    clusters = defaultdict(set)
+    for pk in parent:
+        clusters[find(pk)].add(pk)
+    scores = defaultdict(float)
+    for (a, b), similarity in best.items():
+        root = find(a)
+        scores[root] = max(scores[root], similarity)
+    return {frozenset(members): scores[root] for root, members in clusters.items()}
+
+
+def signature(pks):
+    return ",".join(str(pk) for pk in sorted(pks))
+
+
+@transaction.atomic
+def save_clusters(clusters, queryset=None):
+    """
+    Replace the pending review queue with ``clusters``, found among the people
+    of ``queryset`` (default everyone): pending clusters with a member outside
+    it were not rechecked and stay. Clusters already dismissed or merged with
+    the same members are not raised again.
+    """
+    pending = DuplicateCluster.objects.filter(status="pending")
+    if queryset is not None:
+        pending = pending.exclude(
+            candidates__person__in=CommunityPerson.objects.exclude(
+                pk__in=queryset.values("pk")
+            )
+        )
+    pending.delete()
+    reviewed = set(DuplicateCluster.objects.values_list("signature", flat=True))
+    new = [
+        DuplicateCluster(signature=signature(pks), score=round(similarity, 3))
+        for pks, similarity in clusters.items()
+        if signature(pks) not in reviewed
+    ]
+    DuplicateCluster.objects.bulk_create(new, batch_size=2000)
+    DuplicateCandidate.objects.bulk_create(
+        (
+            DuplicateCandidate(cluster_id=cluster.pk, person_id=int(pk))
+            for cluster in new
+            for pk in cluster.signature.split(",")
+        ),
+        batch_size=5000,
+    )
+    return len(new)
+
+
+@transaction.atomic
+def merge_persons(survivor, duplicates):
+    """
+    Fold ``duplicates`` into ``survivor``: copy over fields the survivor is
+    missing, repoint every foreign key to them, then delete them.
+    """
+    pks = [person.pk for person in duplicates]
+    for field in ("date_of_birth", "occupation", "education_level"):
+        if not getattr(survivor, field):
+            for person in duplicates:
+                if getattr(person, field):
+                    setattr(survivor, field, getattr(person, field))
+                    break
+    survivor.save()
+    for relation in CommunityPerson._meta.related_objects:
+        if relation.many_to_many or relation.one_to_one or not relation.field.concrete:
+            continue
+        if relation.related_model is DuplicateCandidate:
+            continue
+        relation.related_model._base_manager.filter(
+            **{f"{relation.field.name}__in": pks}
+        ).update(**{relation.field.name: survivor})
+    CommunityPerson.objects.filter(pk__in=pks).delete()
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.community_context.dedup import THRESHOLD, find_duplicates, save_clusters
+from apps.community_context.models import CommunityPerson
+
+
+class Command(BaseCommand):
+    help = (
+        "Find likely duplicate community persons and queue them for review "
+        "under Duplicate Clusters in the admin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threshold", type=float, default=THRESHOLD)
+        parser.add_argument(
+            "--workers", type=int, help="Worker processes; defaults to CPU count."
+        )
+        parser.add_argument(
+            "--trust-village",
+            type=int,
+            action="append",
+            help="Only check this trust village id; repeat for more.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        queryset = CommunityPerson.objects.all()
+        if options["trust_village"]:
+            queryset = queryset.filter(trust_village__in=options["trust_village"])
+        clusters = find_duplicates(queryset, options["threshold"], options["workers"])
+        created = save_clusters(
+            clusters, queryset if options["trust_village"] else None
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Found {len(clusters)} clusters, {created} new for review, "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
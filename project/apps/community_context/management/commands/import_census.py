@@ -0,0 +1,53 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.community_context.census import CensusError, CensusImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import a census CSV or XLSX file of persons, households and dwellings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Census .csv or .xlsx file")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate and load every village, then roll everything back.",
+        )
+        parser.add_argument(
+            "--errors",
+            metavar="PATH",
+            help="Write the per-row error report to this CSV file.",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        importer = CensusImporter(
+            dry_run=options["dry_run"], batch_size=options["batch_size"]
+        )
+        try:
+            with open(options["path"], "rb") as file:
+                importer.run(read_rows(file, options["path"]))
+        except (OSError, CensusError) as error:
+            raise CommandError(error)
+
+        if options["errors"]:
+            with open(options["errors"], "w", newline="") as report:
+                writer = csv.writer(report)
+                writer.writerow(["row", "error"])
+                writer.writerows(importer.errors)
+
+        summary = ", ".join(
+            f"{count} {name}" for name, count in importer.created.items()
+        )
+        verb = "Would create" if options["dry_run"] else "Created"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {summary} in {time.monotonic() - started:.1f}s")
+        )
+        if importer.errors:
+            self.stdout.write(
+                self.style.WARNING(f"{len(importer.errors)} rows were rejected")
+            )
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.community_context.counters import rebuild_household_counts
+from apps.community_context.models import Household
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount household members, adults, children and heads from "
+        "community persons, fixing any counters that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--trust-village",
+            type=int,
+            action="append",
+            help="Only rebuild this trust village id; repeat for more.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        households = Household.objects.all()
+        if options["trust_village"]:
+            households = households.filter(trust_village__in=options["trust_village"])
+        fixed = rebuild_household_counts(households)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt counters for {households.count()} households, "
+                f"{fixed} corrected, in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.community_context.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the demographic rollups from community persons. Saves "
+        "through the admin keep them current; run this after bulk changes."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = refresh_rollups()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {rows} rollup rows in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0002_alter_bank_bank_initials_alter_bank_bank_name"),
+        ("community_context", "0008_alter_householdbankaccount_account_name_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="dwelling",
+            index=models.Index(
+                fields=["trust_region", "dwelling_number"],
+                name="dwelling_region_number_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dwelling",
+            index=models.Index(fields=["dwelling_number"], name="dwelling_number_idx"),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.4 on 2026-10-18 13:30
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# GIN trigram indexes are PostgreSQL-only, so they are created here rather
+# than declared in CommunityPerson.Meta.indexes.
+INDEXES = {
+    "community_person_first_name_trgm": "first_name",
+    "community_person_last_name_trgm": "last_name",
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("community_context", "CommunityPerson")._meta.db_table
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin ("{column}" gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("community_context", "0009_dwelling_region_number_idx_and_more"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("community_context", "0010_communityperson_name_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DuplicateCluster",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "signature",
+                    models.TextField(
+                        help_text="Sorted ids of the people in the cluster.",
+                        verbose_name="Members",
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="Score")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending review"),
+                            ("merged", "Merged"),
+                            ("dismissed", "Not duplicates"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created"),
+                ),
+            ],
+            options={
+                "verbose_name": "Duplicate Cluster",
+                "verbose_name_plural": "Duplicate Clusters",
+            },
+        ),
+        migrations.CreateModel(
+            name="DuplicateCandidate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cluster",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="candidates",
+                        to="community_context.duplicatecluster",
+                        verbose_name="Cluster",
+                    ),
+                ),
+                (
+                    "person",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="duplicate_candidates",
+                        to="community_context.communityperson",
+                        verbose_name="Person",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Duplicate Candidate",
+                "verbose_name_plural": "Duplicate Candidates",
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.4 on 2026-10-18 15:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+ADULT_AGE_GROUPS = ("Young Adult", "Middle-aged Adult", "Old Age")
+
+
+def count_members(apps, schema_editor):
+    Household = apps.get_model("community_context", "Household")
+    CommunityPerson = apps.get_model("community_context", "CommunityPerson")
+    conditions = {
+        "member_count": Q(),
+        "adult_count": Q(age_group__in=ADULT_AGE_GROUPS),
+        "child_count": ~Q(age_group__in=ADULT_AGE_GROUPS),
+        "head_count": Q(relationship_to_head="Head"),
+    }
+    Household.objects.update(
+        **{
+            name: Coalesce(
+                Subquery(
+                    CommunityPerson.objects.filter(
+                        condition, household_number=OuterRef("pk")
+                    )
+                    .values("household_number")
+                    .annotate(count=Count("pk"))
+                    .values("count")
+                ),
+                0,
+            )
+            for name, condition in conditions.items()
+        }
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("community_context", "0011_duplicatecluster_duplicatecandidate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="household",
+            name="adult_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Adults"
+            ),
+        ),
+        migrations.AddField(
+            model_name="household",
+            name="child_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Children"
+            ),
+        ),
+        migrations.AddField(
+            model_name="household",
+            name="head_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Heads"
+            ),
+        ),
+        migrations.AddField(
+            model_name="household",
+            name="member_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Members"
+            ),
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+    ]
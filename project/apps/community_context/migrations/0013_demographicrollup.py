@@ -0,0 +1,106 @@
+# Generated by Django 4.2.4 on 2026-10-18 15:40
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+DIMENSIONS = ("sex", "age_group", "occupation", "education_level")
+
+
+def build_rollups(apps, schema_editor):
+    CommunityPerson = apps.get_model("community_context", "CommunityPerson")
+    DemographicRollup = apps.get_model("community_context", "DemographicRollup")
+    for dimension in DIMENSIONS:
+        grouped = (
+            CommunityPerson.objects.values_list(
+                "trust_region", "trust_village", dimension
+            )
+            .annotate(count=Count("pk"))
+            .order_by()
+        )
+        DemographicRollup.objects.bulk_create(
+            (
+                DemographicRollup(
+                    trust_region_id=region_id,
+                    trust_village_id=village_id,
+                    dimension=dimension,
+                    value=value,
+                    count=count,
+                )
+                for region_id, village_id, value, count in grouped
+            ),
+            batch_size=5000,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0001_initial"),
+        ("community_context", "0012_household_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DemographicRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("sex", "Sex"),
+                            ("age_group", "Age Group"),
+                            ("occupation", "Occupation"),
+                            ("education_level", "Education Level"),
+                        ],
+                        max_length=20,
+                        verbose_name="Dimension",
+                    ),
+                ),
+                (
+                    "value",
+                    models.CharField(blank=True, max_length=255, verbose_name="Value"),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(default=0, verbose_name="Count"),
+                ),
+                (
+                    "trust_region",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="demographic_rollups",
+                        to="main.trustregion",
+                        verbose_name="Trust Region",
+                    ),
+                ),
+                (
+                    "trust_village",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="demographic_rollups",
+                        to="main.trustvillage",
+                        verbose_name="Trust Village",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Demographic Rollup",
+                "verbose_name_plural": "Demographics",
+                "unique_together": {
+                    ("trust_region", "trust_village", "dimension", "value")
+                },
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
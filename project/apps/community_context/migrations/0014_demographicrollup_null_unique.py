@@ -0,0 +1,53 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("community_context", "0013_demographicrollup"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="demographicrollup",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="demographicrollup",
+            constraint=models.UniqueConstraint(
+                fields=("trust_region", "trust_village", "dimension", "value"),
+                name="rollup_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="demographicrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("trust_region__isnull", True), ("trust_village__isnull", False)
+                ),
+                fields=("trust_village", "dimension", "value"),
+                name="rollup_unique_no_region",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="demographicrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("trust_region__isnull", False), ("trust_village__isnull", True)
+                ),
+                fields=("trust_region", "dimension", "value"),
+                name="rollup_unique_no_village",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="demographicrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("trust_region__isnull", True), ("trust_village__isnull", True)
+                ),
+                fields=("dimension", "value"),
+                name="rollup_unique_no_place",
+            ),
+        ),
+    ]
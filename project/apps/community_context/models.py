@@ -222,6 +222,13 @@ class Dwelling(models.Model):
         verbose_name = "Dwelling"
         verbose_name_plural = "Dwellings"
         unique_together = [("trust_village", "dwelling_number")]
+        indexes = [
+            models.Index(
+                fields=["trust_region", "dwelling_number"],
+                name="dwelling_region_number_idx",
+            ),
+            models.Index(fields=["dwelling_number"], name="dwelling_number_idx"),
+        ]
 
 
 class Household(models.Model):
@@ -263,16 +270,12 @@ class Household(models.Model):
         "Primary Income Source", blank=True, max_length=255
     )
 
-    @property
-    def member_count(self):
-        if hasattr(
-            self,
-            "household_by_head_of_household" and self.household_by_head_of_household,
-        ):
-            member_count = self.household_by_head_of_household.count()
-            return member_count
-
-        return None
+    # Kept up to date by the signals in signals.py; rebuild with the
+    # rebuild_household_counts command after bulk loads.
+    member_count = models.PositiveIntegerField("Members", default=0, editable=False)
+    adult_count = models.PositiveIntegerField("Adults", default=0, editable=False)
+    child_count = models.PositiveIntegerField("Children", default=0, editable=False)
+    head_count = models.PositiveIntegerField("Heads", default=0, editable=False)
 
     def __str__(self):
         return str(self.household_number)
@@ -283,6 +286,14 @@ class Household(models.Model):
         unique_together = [("trust_village", "dwelling_number", "household_number")]
 
 
+def account_number_error(account_number, bank):
+    # Shared by HouseholdBankAccount.clean and the bulk loaders, which check
+    # many accounts against banks they have already fetched.
+    if len(account_number) != bank.account_number_length:
+        return f"Account number for {bank} should be {bank.account_number_length} digits long"
+    return None
+
+
 class HouseholdBankAccount(models.Model):
     account_name = models.CharField(
         "Account Name",
@@ -319,11 +330,124 @@ class HouseholdBankAccount(models.Model):
     household = models.ForeignKey(Household, on_delete=models.SET_NULL, null=True)
 
     def clean(self):
-        if len(self.account_number) != self.bank_initials.account_number_length:
-            raise ValidationError(
-                f"Account number for {self.bank_initials} should be {self.bank_initials.account_number_length} digits long"
-            )
+        if self.bank_initials is None:
+            return
+        error = account_number_error(self.account_number, self.bank_initials)
+        if error:
+            raise ValidationError(error)
 
     class Meta:
         verbose_name = "Household Bank Account"
         verbose_name_plural = "Household Bank Accounts"
+
+
+class DuplicateCluster(models.Model):
+    signature = models.TextField(
+        "Members", help_text="Sorted ids of the people in the cluster."
+    )
+    score = models.FloatField("Score")
+    status = models.CharField(
+        "Status",
+        max_length=10,
+        default="pending",
+        db_index=True,
+        choices=[
+            ("pending", "Pending review"),
+            ("merged", "Merged"),
+            ("dismissed", "Not duplicates"),
+        ],
+    )
+    created = models.DateTimeField("Created", auto_now_add=True)
+
+    def __str__(self):
+        return f"Cluster {self.pk} ({self.score:.2f})"
+
+    class Meta:
+        verbose_name = "Duplicate Cluster"
+        verbose_name_plural = "Duplicate Clusters"
+
+
+class DuplicateCandidate(models.Model):
+    cluster = models.ForeignKey(
+        DuplicateCluster,
+        on_delete=models.CASCADE,
+        related_name="candidates",
+        verbose_name="Cluster",
+    )
+    person = models.ForeignKey(
+        CommunityPerson,
+        on_delete=models.CASCADE,
+        related_name="duplicate_candidates",
+        verbose_name="Person",
+    )
+
+    class Meta:
+        verbose_name = "Duplicate Candidate"
+        verbose_name_plural = "Duplicate Candidates"
+
+
+class DemographicRollup(models.Model):
+    # Maintained by the signals in signals.py; rebuild with the
+    # refresh_demographic_rollups command.
+    trust_region = models.ForeignKey(
+        TrustRegion,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="demographic_rollups",
+        verbose_name="Trust Region",
+    )
+    trust_village = models.ForeignKey(
+        TrustVillage,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="demographic_rollups",
+        verbose_name="Trust Village",
+    )
+    dimension = models.CharField(
+        "Dimension",
+        max_length=20,
+        choices=[
+            ("sex", "Sex"),
+            ("age_group", "Age Group"),
+            ("occupation", "Occupation"),
+            ("education_level", "Education Level"),
+        ],
+    )
+    value = models.CharField("Value", max_length=255, blank=True)
+    count = models.PositiveIntegerField("Count", default=0)
+
+    def __str__(self):
+        return f"{self.trust_village} {self.dimension}={self.value}: {self.count}"
+
+    class Meta:
+        verbose_name = "Demographic Rollup"
+        verbose_name_plural = "Demographics"
+        # NULLs never collide in a unique index, so each combination of a
+        # missing region or village gets its own partial one.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["trust_region", "trust_village", "dimension", "value"],
+                name="rollup_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["trust_village", "dimension", "value"],
+                condition=models.Q(
+                    trust_region__isnull=True, trust_village__isnull=False
+                ),
+                name="rollup_unique_no_region",
+            ),
+            models.UniqueConstraint(
+                fields=["trust_region", "dimension", "value"],
+                condition=models.Q(
+                    trust_region__isnull=False, trust_village__isnull=True
+                ),
+                name="rollup_unique_no_village",
+            ),
+            models.UniqueConstraint(
+                fields=["dimension", "value"],
+                condition=models.Q(
+                    trust_region__isnull=True, trust_village__isnull=True
+                ),
+                name="rollup_unique_no_place",
+            ),
+        ]
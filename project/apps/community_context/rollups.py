@@ -0,0 +1,147 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import CommunityPerson, DemographicRollup
+
+DIMENSIONS = [
+    name for name, _ in DemographicRollup._meta.get_field("dimension").choices
+]
+ROLLUP_FIELDS = {"trust_region_id", "trust_village_id", *DIMENSIONS}
+
+
+def rolled(values):
+    # The rollup rows a person with these ``ROLLUP_FIELDS`` values counts
+    # towards.
+    if values is None:
+        return Counter()
+    return Counter(
+        (values["trust_region_id"], values["trust_village_id"], name, values[name])
+        for name in DIMENSIONS
+    )
+
+
+def _add(key, delta):
+    region_id, village_id, dimension, value = key
+    fields = {
+        "trust_region_id": region_id,
+        "trust_village_id": village_id,
+        "dimension": dimension,
+        "value": value,
+    }
+    rows = DemographicRollup.objects.filter(**fields)
+    if rows.update(count=F("count") + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            DemographicRollup.objects.create(count=delta, **fields)
+    except IntegrityError:
+        # Created by a concurrent save since the UPDATE.
+        rows.update(count=F("count") + delta)
+
+
+@transaction.atomic
+def apply_rollup_changes(changes):
+    """
+    Add ``{(region_id, village_id, dimension, value): delta}`` to the
+    rollups, creating rows on first use.
+    """
+    for key, delta in changes.items():
+        if delta:
+            _add(key, delta)
+
+
+def add_persons(persons):
+    # For loaders that bulk_create people and so bypass the signals.
+    changes = Counter()
+    for person in persons:
+        changes.update(rolled({name: getattr(person, name) for name in ROLLUP_FIELDS}))
+    apply_rollup_changes(changes)
+
+
+@transaction.atomic
+def refresh_rollups(batch_size=5000):
+    """
+    Recompute every rollup row from CommunityPerson with one GROUP BY per
+    dimension. Readers keep seeing the previous rows until the transaction
+    commits, so the dashboard never shows a half-built summary.
+    """
+    DemographicRollup.objects.all().delete()
+    rows = []
+    for dimension in DIMENSIONS:
+        grouped = (
+            CommunityPerson.objects.values_list(
+                "trust_region", "trust_village", dimension
+            )
+            .annotate(count=Count("pk"))
+            .order_by()
+        )
+        rows.extend(
+            DemographicRollup(
+                trust_region_id=region_id,
+                trust_village_id=village_id,
+                dimension=dimension,
+                value=value,
+                count=count,
+            )
+            for region_id, village_id, value, count in grouped
+        )
+    DemographicRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def summary(trust_region=None):
+    """
+    Counts per dimension value for each village of ``trust_region``, or for
+    each trust region when none is given, read from the rollups alone.
+    Returns one table per dimension.
+    """
+    rollups = DemographicRollup.objects.filter(count__gt=0)
+    group = "trust_region__name"
+    if trust_region is not None:
+        rollups = rollups.filter(trust_region=trust_region)
+        group = "trust_village__name"
+    counts = {}
+    for name, dimension, value, total in (
+        rollups.values_list(group, "dimension", "value")
+        .annotate(total=Sum("count"))
+        .order_by()
+    ):
+        counts.setdefault(dimension, {}).setdefault(name or "Unassigned", {})[
+            value
+        ] = total
+
+    tables = []
+    for dimension, label in DemographicRollup._meta.get_field("dimension").choices:
+        rows = counts.get(dimension, {})
+        present = {value for row in rows.values() for value in row}
+        columns = [
+            (value, text)
+            for value, text in CommunityPerson._meta.get_field(dimension).choices
+            if value in present
+        ]
+        columns += [
+            (value, value or "Not recorded")
+            for value in sorted(present - {value for value, _ in columns})
+        ]
+        tables.append(
+            {
+                "title": label,
+                "columns": [text for _, text in columns],
+                "rows": [
+                    (
+                        name,
+                        [row.get(value, 0) for value, _ in columns],
+                        sum(row.values()),
+                    )
+                    for name, row in sorted(rows.items())
+                ],
+                "totals": [
+                    sum(row.get(value, 0) for row in rows.values())
+                    for value, _ in columns
+                ],
+                "total": sum(sum(row.values()) for row in rows.values()),
+            }
+        )
+    return tables
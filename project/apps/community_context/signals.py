@@ -0,0 +1,64 @@
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+
+from .counters import COUNTED_FIELDS, apply_changes, counted, move
+from .models import CommunityPerson
+from .rollups import ROLLUP_FIELDS, apply_rollup_changes, rolled
+
+TRACKED_FIELDS = COUNTED_FIELDS | ROLLUP_FIELDS
+
+
+def tracked(instance):
+    return {name: getattr(instance, name) for name in TRACKED_FIELDS}
+
+
+def remember_tracked(sender, instance, **kwargs):
+    # What the row looked like when it was loaded. Rows loaded with those
+    # fields deferred are looked up in pre_save/pre_delete instead.
+    if instance.pk is None:
+        instance._tracked = None
+    elif not TRACKED_FIELDS & instance.get_deferred_fields():
+        instance._tracked = tracked(instance)
+
+
+def load_tracked(sender, instance, raw=False, **kwargs):
+    if raw or hasattr(instance, "_tracked"):
+        return
+    stored = (
+        CommunityPerson.objects.filter(pk=instance.pk).only(*TRACKED_FIELDS).first()
+    )
+    instance._tracked = stored._tracked if stored else None
+
+
+def apply_tracked(before, after):
+    old, new = counted(before), counted(after)
+    if old != new:
+        apply_changes(move(old, new))
+    changes = rolled(after)
+    changes.subtract(rolled(before))
+    apply_rollup_changes(changes)
+
+
+def update_tracked(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    after = tracked(instance)
+    apply_tracked(instance._tracked, after)
+    instance._tracked = after
+
+
+def release_tracked(sender, instance, **kwargs):
+    apply_tracked(instance._tracked, None)
+    instance._tracked = None
+
+
+post_init.connect(remember_tracked, sender=CommunityPerson)
+pre_save.connect(load_tracked, sender=CommunityPerson)
+pre_delete.connect(load_tracked, sender=CommunityPerson)
+post_save.connect(update_tracked, sender=CommunityPerson)
+post_delete.connect(release_tracked, sender=CommunityPerson)
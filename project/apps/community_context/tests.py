@@ -1,3 +1,514 @@
-from django.test import TestCase
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.main.models import Bank, TrustRegion, TrustVillage
+from apps.main.paginators import KeysetPaginator
+from apps.main.tests import ChangeListQueryBudgetMixin
+from .census import CensusError, CensusImporter, read_rows
+from .counters import rebuild_household_counts
+from .rollups import refresh_rollups
+from .dedup import find_duplicates, merge_persons, save_clusters
+from .models import (
+    CommunityPerson,
+    DemographicRollup,
+    DuplicateCluster,
+    Dwelling,
+    Household,
+    HouseholdBankAccount,
+)
 
 # Create your tests here.
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class CommunityChangeListQueryTests(ChangeListQueryBudgetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.region = TrustRegion.objects.create(name="Upper Porgera")
+        self.village = TrustVillage.objects.create(
+            name="Yarik", trust_region=self.region
+        )
+        self.created = 0
+
+    def add_households(self, count):
+        for _ in range(count):
+            self.created += 1
+            dwelling = Dwelling.objects.create(
+                trust_region=self.region,
+                trust_village=self.village,
+                dwelling_number=self.created,
+                construction_year=2000,
+            )
+            household = Household.objects.create(
+                trust_region=self.region,
+                trust_village=self.village,
+                dwelling_number=dwelling,
+                household_number=1,
+            )
+            household.head_of_household = CommunityPerson.objects.create(
+                first_name="Head",
+                last_name=str(self.created),
+                sex="M",
+                relationship_to_head="Head",
+                age_group="Young Adult",
+                trust_region=self.region,
+                trust_village=self.village,
+                dwelling_number=dwelling,
+                household_number=household,
+            )
+            household.save()
+
+    def test_household_changelist(self):
+        self.assertChangeListWithinBudget(
+            reverse("crs:community_context_household_changelist"),
+            self.add_households,
+        )
+
+    def test_community_person_changelist(self):
+        self.assertChangeListWithinBudget(
+            reverse("crs:community_context_communityperson_changelist"),
+            self.add_households,
+        )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        regions = [TrustRegion.objects.create(name=n) for n in ("Ipili", "Tuanda")]
+        regions.append(None)
+        CommunityPerson.objects.bulk_create(
+            CommunityPerson(
+                first_name=f"Person {i % 7}",
+                last_name=f"Family {i % 5}",
+                sex="F",
+                relationship_to_head="Daughter",
+                age_group="Child",
+                trust_region=regions[i % 3],
+            )
+            for i in range(53)
+        )
+        self.queryset = CommunityPerson.objects.order_by(
+            "trust_region", "last_name", "first_name", "-pk"
+        )
+
+    def test_pages_match_a_full_ordered_scan(self):
+        paginator = KeysetPaginator(self.queryset, 10)
+        expected = [person.pk for person in paginator.ordered_list]
+        seen = []
+        for number in paginator.page_range:
+            seen.extend(person.pk for person in paginator.page(number))
+        self.assertEqual(seen, expected)
+
+    def test_next_page_seeks_instead_of_offset(self):
+        KeysetPaginator(self.queryset, 10).page(1)
+        with CaptureQueriesContext(connection) as queries:
+            list(KeysetPaginator(self.queryset, 10).page(2))
+        self.assertNotIn("OFFSET", queries[-1]["sql"])
+
+
+CENSUS = """Trust Village,Dwelling Number,Construction Year,Household Number,First Name,Last Name,Sex,Relationship to Head,Age Group,Account Number,Bank
+Yarik,1,2001,1,Kewa,Pato,M,Head,Middle-aged Adult,1234567890,BSP
+Yarik,1,2001,1,Maria,Pato,F,Wife,Young Adult,,
+Yarik,1,2001,2,Joe,Pato,M,Head,Young Adult,123,BSP
+Yarik,2,,1,Ken,Tom,M,Head,Old Age,,
+Nowhere,1,2001,1,Lost,Person,F,Head,Child,,
+"""
+
+
+class CensusImporterTests(TestCase):
+    def setUp(self):
+        region = TrustRegion.objects.create(name="Upper Porgera")
+        TrustVillage.objects.create(name="Yarik", trust_region=region)
+        Bank.objects.create(
+            bank_name="Bank of South Pacific",
+            bank_initials="BSP",
+            account_number_length=10,
+        )
+
+    def run_import(self, dry_run=False):
+        rows = read_rows(io.BytesIO(CENSUS.encode()), "census.csv")
+        return CensusImporter(dry_run=dry_run).run(rows)
+
+    def test_loads_valid_rows_and_reports_the_rest(self):
+        importer = self.run_import()
+        self.assertEqual(CommunityPerson.objects.count(), 2)
+        household = Household.objects.get()
+        self.assertEqual(household.head_of_household.first_name, "Kewa")
+        self.assertEqual(HouseholdBankAccount.objects.get().household, household)
+        self.assertEqual([row for row, _ in importer.errors], [4, 5, 6])
+
+    def test_rows_of_a_village_load_together_in_any_order(self):
+        TrustVillage.objects.create(name="Tipinini")
+        census = (
+            "Trust Village,Dwelling Number,Construction Year,Household Number,"
+            "First Name,Last Name,Sex,Relationship to Head,Age Group\n"
+            "Yarik,1,2001,1,Kewa,Pato,M,Head,Middle-aged Adult\n"
+            "Tipinini,1,2001,1,Ken,Tom,M,Head,Old Age\n"
+            "Yarik,1,2001,1,Maria,Pato,F,Wife,Young Adult\n"
+            "Nowhere,1,2001,1,Lost,Person,F,Head,Child\n"
+            "Yarik,1,2001,1,,Pato,F,Daughter,Child\n"
+        )
+        for dry_run in (True, False):
+            importer = CensusImporter(dry_run=dry_run).run(
+                read_rows(io.BytesIO(census.encode()), "census.csv")
+            )
+            # Split rows would count Yarik's dwelling and household twice.
+            self.assertEqual(
+                importer.created,
+                {"dwellings": 2, "households": 2, "persons": 3, "bank_accounts": 0},
+            )
+            self.assertEqual([row for row, _ in importer.errors], [5, 6])
+        household = Household.objects.get(trust_village__name="Yarik")
+        self.assertEqual(
+            sorted(
+                household.community_persons_by_household_number.values_list(
+                    "first_name", flat=True
+                )
+            ),
+            ["Kewa", "Maria"],
+        )
+        self.assertEqual(Dwelling.objects.count(), 2)
+
+    def test_unreadable_files_are_census_errors(self):
+        for content, message in (
+            (CENSUS.replace("Kewa", "Kéwa").encode("latin-1"), "not UTF-8 text"),
+            (CENSUS.replace("Lost", "x" * 200000).encode(), "Cannot read the CSV"),
+        ):
+            with self.assertRaisesMessage(CensusError, message):
+                CensusImporter().run(read_rows(io.BytesIO(content), "census.csv"))
+        self.assertFalse(CommunityPerson.objects.exists())
+
+    def test_dry_run_saves_nothing(self):
+        importer = self.run_import(dry_run=True)
+        self.assertEqual(importer.created["persons"], 2)
+        self.assertFalse(CommunityPerson.objects.exists())
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class CommunityPersonChangeListTests(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        for name in ("Yarik", "Tipinini"):
+            village = TrustVillage.objects.create(name=name)
+            CommunityPerson.objects.create(
+                first_name="Kewa",
+                last_name=name,
+                sex="M",
+                relationship_to_head="Head",
+                age_group="Old Age",
+                trust_village=village,
+            )
+
+    def test_name_search_matches_every_word(self):
+        response = self.client.get(
+            reverse("crs:community_context_communityperson_changelist"),
+            {"q": "kewa yar"},
+        )
+        self.assertEqual(
+            [p.last_name for p in response.context["cl"].result_list], ["Yarik"]
+        )
+
+    def test_search_matches_dwelling_and_household_numbers(self):
+        person = CommunityPerson.objects.get(last_name="Tipinini")
+        person.dwelling_number = Dwelling.objects.create(
+            trust_village=person.trust_village,
+            dwelling_number=12,
+            construction_year=2000,
+        )
+        person.save()
+        for q, names in (("12", ["Tipinini"]), ("1", []), ("kewa", None)):
+            response = self.client.get(
+                reverse("crs:community_context_communityperson_changelist"),
+                {"q": q},
+            )
+            self.assertEqual(
+                sorted(p.last_name for p in response.context["cl"].result_list),
+                ["Tipinini", "Yarik"] if names is None else names,
+            )
+
+    def test_export_streams_filtered_changelist(self):
+        village = TrustVillage.objects.get(name="Yarik")
+        response = self.client.get(
+            reverse("crs:export", args=["community_context", "communityperson"]),
+            {"trust_village__id__exact": village.pk},
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Yarik", lines[1])
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class DwellingAutocompleteTests(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        self.yarik, self.tipinini = (
+            TrustVillage.objects.create(name=name) for name in ("Yarik", "Tipinini")
+        )
+        Dwelling.objects.bulk_create(
+            Dwelling(
+                trust_village=village, dwelling_number=number, construction_year=2000
+            )
+            for village in (self.yarik, self.tipinini)
+            for number in range(1, 131)
+        )
+
+    def search(self, q="", **params):
+        forward = json.dumps({"trust_village": str(self.yarik.pk)})
+        response = self.client.get(
+            reverse("dwelling_autocomplete"), {"q": q, "forward": forward, **params}
+        )
+        return response.json()
+
+    def test_prefix_matches_within_the_forwarded_village(self):
+        results = self.search("12")["results"]
+        self.assertEqual(
+            [r["text"] for r in results], ["12"] + [str(n) for n in range(120, 130)]
+        )
+
+    def test_pages_seek_by_cursor(self):
+        first = self.search()
+        self.assertTrue(first["pagination"]["more"])
+        with CaptureQueriesContext(connection) as queries:
+            second = self.search(cursor=first["pagination"]["cursor"])
+        self.assertNotIn("OFFSET", queries[-1]["sql"])
+        self.assertNotIn("COUNT", " ".join(q["sql"] for q in queries))
+        self.assertEqual(second["results"][0]["text"], "21")
+        self.assertEqual(self.search(page=2)["results"], second["results"])
+
+    def test_malformed_cursor_and_forward_are_ignored(self):
+        first = self.search()["results"]
+        for cursor in ("5", '{"a": 1}', '["x", "y", "z"]', '["x", "y"]'):
+            self.assertEqual(self.search(cursor=cursor)["results"], first)
+        response = self.client.get(
+            reverse("dwelling_autocomplete"),
+            {"forward": json.dumps({"trust_village": "abc"})},
+        )
+        self.assertEqual(response.json()["results"], [])
+
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        village = TrustVillage.objects.create(name="Yarik")
+        names = [
+            ("Kewa", "Pato"),
+            ("Kewa", "Patto"),
+            ("Pato", "Kewa"),
+            ("Maria", "Tom"),
+        ]
+        self.persons = [
+            CommunityPerson.objects.create(
+                first_name=first,
+                last_name=last,
+                sex="M",
+                relationship_to_head="Head",
+                age_group="Young Adult",
+                trust_village=village,
+            )
+            for first, last in names
+        ]
+
+    def test_clusters_similar_names_within_a_block(self):
+        clusters = find_duplicates(workers=1)
+        self.assertEqual(list(clusters), [frozenset(p.pk for p in self.persons[:3])])
+        self.assertEqual(save_clusters(clusters), 1)
+        self.assertEqual(save_clusters(clusters), 1)
+        DuplicateCluster.objects.update(status="dismissed")
+        self.assertEqual(save_clusters(clusters), 0)
+
+    def test_scoped_pass_keeps_other_villages_pending(self):
+        other = TrustVillage.objects.create(name="Kulapi")
+        for last in ("Aki", "Akki"):
+            CommunityPerson.objects.create(
+                first_name="Jon",
+                last_name=last,
+                sex="M",
+                relationship_to_head="Head",
+                age_group="Young Adult",
+                trust_village=other,
+            )
+        self.assertEqual(save_clusters(find_duplicates(workers=1)), 2)
+        scope = CommunityPerson.objects.filter(trust_village=other)
+        self.assertEqual(save_clusters(find_duplicates(scope, workers=1), scope), 1)
+        self.assertEqual(DuplicateCluster.objects.filter(status="pending").count(), 2)
+
+    def test_merge_repoints_household_heads(self):
+        survivor, duplicate = self.persons[:2]
+        household = Household.objects.create(
+            household_number=1, head_of_household=duplicate
+        )
+        merge_persons(survivor, [duplicate])
+        household.refresh_from_db()
+        self.assertEqual(household.head_of_household, survivor)
+        self.assertFalse(CommunityPerson.objects.filter(pk=duplicate.pk).exists())
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class HouseholdCounterTests(TestCase):
+    def setUp(self):
+        self.first = Household.objects.create(household_number=1)
+        self.second = Household.objects.create(household_number=2)
+
+    def add_person(self, household, age_group="Young Adult", relationship="Head"):
+        return CommunityPerson.objects.create(
+            first_name="Kewa",
+            last_name="Pato",
+            sex="M",
+            relationship_to_head=relationship,
+            age_group=age_group,
+            household_number=household,
+        )
+
+    def counts(self, household):
+        household.refresh_from_db()
+        return (
+            household.member_count,
+            household.adult_count,
+            household.child_count,
+            household.head_count,
+        )
+
+    def test_signals_keep_counters(self):
+        head = self.add_person(self.first)
+        child = self.add_person(self.first, "Child", "Son")
+        self.assertEqual(self.counts(self.first), (2, 1, 1, 1))
+
+        child.household_number = self.second
+        child.save()
+        self.assertEqual(self.counts(self.first), (1, 1, 0, 1))
+        self.assertEqual(self.counts(self.second), (1, 0, 1, 0))
+
+        # Deferred fields are read back before the save.
+        child = CommunityPerson.objects.only("pk").get(pk=child.pk)
+        child.age_group = "Old Age"
+        child.save()
+        self.assertEqual(self.counts(self.second), (1, 1, 0, 0))
+
+        CommunityPerson.objects.filter(pk=head.pk).delete()
+        self.assertEqual(self.counts(self.first), (0, 0, 0, 0))
+
+    def test_rebuild_fixes_drift(self):
+        self.add_person(self.first)
+        self.add_person(self.first, "Baby", "Daughter")
+        Household.objects.filter(pk=self.first.pk).update(member_count=7, child_count=0)
+        self.assertEqual(rebuild_household_counts(), 1)
+        self.assertEqual(self.counts(self.first), (2, 1, 1, 1))
+        call_command("rebuild_household_counts", stdout=io.StringIO())
+        self.assertEqual(rebuild_household_counts(), 0)
+
+    def test_changelist_filters_by_size(self):
+        self.add_person(self.first)
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "password")
+        )
+        response = self.client.get(
+            reverse("crs:community_context_household_changelist"),
+            {"size": "1", "o": "7"},
+        )
+        self.assertEqual(
+            [household.pk for household in response.context["cl"].result_list],
+            [self.first.pk],
+        )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class DemographicRollupTests(TestCase):
+    def setUp(self):
+        self.region = TrustRegion.objects.create(name="Upper Porgera")
+        self.village = TrustVillage.objects.create(
+            name="Yarik", trust_region=self.region
+        )
+        self.other = TrustVillage.objects.create(
+            name="Tipinini", trust_region=self.region
+        )
+        self.persons = [
+            CommunityPerson.objects.create(
+                first_name="Kewa",
+                last_name="Pato",
+                sex=sex,
+                relationship_to_head="Head",
+                age_group="Young Adult",
+                occupation="Farmer",
+                trust_region=self.region,
+                trust_village=self.village,
+            )
+            for sex in "MFF"
+        ]
+
+    def rollups(self):
+        return set(
+            DemographicRollup.objects.filter(count__gt=0).values_list(
+                "trust_village__name", "dimension", "value", "count"
+            )
+        )
+
+    def test_signals_match_a_full_refresh(self):
+        person = self.persons[0]
+        person.trust_village = self.other
+        person.occupation = ""
+        person.save()
+        self.persons[1].delete()
+        self.assertIn(("Yarik", "sex", "F", 1), self.rollups())
+        self.assertIn(("Tipinini", "occupation", "", 1), self.rollups())
+        maintained = self.rollups()
+        refresh_rollups()
+        self.assertEqual(self.rollups(), maintained)
+
+    def test_people_without_a_village_share_one_row(self):
+        for region in (None, None, self.region):
+            CommunityPerson.objects.create(
+                first_name="Kewa",
+                last_name="Pato",
+                sex="M",
+                relationship_to_head="Head",
+                age_group="Old Age",
+                trust_region=region,
+            )
+        rows = DemographicRollup.objects.filter(
+            trust_village=None, dimension="sex", value="M"
+        )
+        self.assertEqual(
+            set(rows.values_list("trust_region", "count")),
+            {(None, 2), (self.region.pk, 1)},
+        )
+        for region in (None, self.region):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                DemographicRollup.objects.create(
+                    trust_region=region, dimension="sex", value="M"
+                )
+
+    def test_dashboard_reads_only_rollups(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "password")
+        )
+        url = reverse("crs:community_context_demographicrollup_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"trust_region": self.region.pk})
+        self.assertContains(response, "Yarik")
+        self.assertContains(response, "Young Adult (20-34)")
+        self.assertFalse(
+            any("community_context_communityperson" in q["sql"] for q in queries)
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -1,15 +1,96 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MaxValueValidator
+from django.db.models import Q
+from django.http import JsonResponse
 from django.shortcuts import render
 from dal import autocomplete
+from apps.main.paginators import KeysetCursorPaginator
 from .models import Dwelling
 
 # Create your views here.
 
+DWELLING_NUMBER_MAX = min(
+    validator.limit_value
+    for validator in Dwelling._meta.get_field("dwelling_number").validators
+    if isinstance(validator, MaxValueValidator)
+)
+
+
+def number_prefix_filter(field_name, text, maximum):
+    """
+    Match integers whose decimal form starts with ``text`` as a handful of
+    index range scans: "12" with a maximum of 999 is 12, 120-129.
+    """
+    prefix = int(text)
+    condition = Q(**{field_name: prefix})
+    low = prefix * 10
+    width = 10
+    while 0 < low <= maximum:
+        condition |= Q(**{f"{field_name}__range": (low, low + width - 1)})
+        low *= 10
+        width *= 10
+    return condition
+
 
 class DwellingAutocomplete(autocomplete.Select2QuerySetView):
+    """
+    Dwellings in the trust village (or else trust region) picked on the form,
+    matched by dwelling number prefix and paged by keyset.
+    """
+
+    paginate_by = 20
+    paginator_class = KeysetCursorPaginator
+
     def get_queryset(self):
-        qs = Dwelling.objects.all().order_by("dwelling_number")
+        qs = Dwelling.objects.select_related("trust_village").order_by(
+            "dwelling_number", "pk"
+        )
+        for name in ("trust_village", "trust_region"):
+            if self.forwarded.get(name):
+                try:
+                    qs = qs.filter(**{name: int(self.forwarded[name])})
+                except (TypeError, ValueError):
+                    return qs.none()
+                break
 
         if self.q:
-            qs = qs.filter(dwelling_number__icontains=self.q)
-
+            if not self.q.strip().isdigit():
+                return qs.none()
+            qs = qs.filter(
+                number_prefix_filter(
+                    "dwelling_number", self.q.strip(), DWELLING_NUMBER_MAX
+                )
+            )
         return qs
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        # The cursor is the (dwelling_number, pk) of the last row shown;
+        # anything else starts from the first page.
+        after = None
+        if self.request.GET.get("cursor"):
+            try:
+                after = json.loads(self.request.GET["cursor"])
+                number, pk = after
+                after = [int(number), int(pk)]
+            except (TypeError, ValueError):
+                after = None
+        return self.paginator_class(queryset, per_page, after=after, **kwargs)
+
+    def get_result_label(self, result):
+        if self.forwarded.get("trust_village") or result.trust_village is None:
+            return str(result)
+        return f"{result} ({result.trust_village.name})"
+
+    def render_to_response(self, context):
+        cursor = context["paginator"].cursor if context["paginator"] else None
+        return JsonResponse(
+            {
+                "results": self.get_results(context),
+                "pagination": {
+                    "more": self.has_more(context),
+                    "cursor": cursor and json.dumps(cursor, cls=DjangoJSONEncoder),
+                },
+            }
+        )
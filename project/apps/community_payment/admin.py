@@ -1,3 +1,91 @@
 from django.contrib import admin
+from django.contrib.admin.sites import site as default_site
+from apps.main.admin import custom_admin_site, OptimizedChangeListMixin
+from .models import AllocationDistribution, PaymentBatch
 
 # Register your models here.
+
+
+@admin.register(AllocationDistribution)
+class AllocationDistributionAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
+    list_display = (
+        "benefit_allocation_display",
+        "trust_village",
+        "household",
+        "formatted_amount",
+        "rule",
+    )
+    search_fields = ("trust_village__name", "benefit_category__name")
+    list_filter = ("rule", "benefit_category", "trust_region", "trust_village")
+    list_per_page = 25
+    ordering = ("benefit_allocation", "household")
+
+    fieldsets = (
+        (
+            None,
+            {
+                "fields": (
+                    "benefit_category",
+                    "benefit_allocation",
+                    "trust_region",
+                    "trust_village",
+                    "household",
+                    "amount",
+                    "rule",
+                )
+            },
+        ),
+    )
+
+    def benefit_allocation_display(self, obj):
+        return obj.benefit_allocation
+
+    benefit_allocation_display.short_description = "Benefit Allocation"
+    benefit_allocation_display.related = (
+        "benefit_allocation__community_benefit_category",
+        "benefit_allocation__trust_region",
+    )
+
+    def formatted_amount(self, obj):
+        return "{:,.2f}".format(obj.amount)
+
+    formatted_amount.short_description = "Amount (PGK)"
+
+
+@admin.register(PaymentBatch)
+class PaymentBatchAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
+    list_display = (
+        "file_name",
+        "bank",
+        "file_format",
+        "status",
+        "record_count",
+        "control_total",
+        "completed",
+    )
+    search_fields = ("file_name", "checksum")
+    list_filter = ("status", "file_format", "bank")
+    list_per_page = 25
+    ordering = ("-created",)
+    readonly_fields = (
+        "benefit_allocation",
+        "bank",
+        "file_format",
+        "file_name",
+        "status",
+        "record_count",
+        "control_total",
+        "hash_total",
+        "checksum",
+        "fingerprint",
+        "created",
+        "completed",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
+for model, model_admin in default_site._registry.items():
+    if model not in custom_admin_site._registry:
+        custom_admin_site.register(model, type(model_admin))
@@ -0,0 +1,278 @@
+import csv
+import hashlib
+import os
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.main.exports import Echo
+from apps.main.models import Bank
+from apps.community_context.models import account_number_error
+from .models import AllocationDistribution, PaymentBatch
+
+CHUNK_SIZE = 2000
+RECORD_LENGTH = 80
+HASH_MODULUS = 10**15
+
+
+class BatchError(Exception):
+    pass
+
+
+class BatchFile:
+    """
+    One bank's payment file, written line by line to ``<path>.part`` and
+    moved into place on ``close()``. Control totals and the SHA-256 of the
+    bytes written are kept as it goes.
+    """
+
+    extension = "csv"
+    encoding = "utf-8"
+    max_account_length = None
+
+    def __init__(self, batch, path):
+        self.batch = batch
+        self.path = path
+        self.count = 0
+        self.toea = 0
+        self.hash_total = 0
+        self.digest = hashlib.sha256()
+        self.rows = hashlib.sha256()
+        self.file = open(
+            f"{path}.part", "w", encoding=self.encoding, errors="replace", newline=""
+        )
+        self.write(self.header())
+
+    def write(self, line):
+        data = f"{line}\r\n"
+        self.digest.update(data.encode(self.encoding, "replace"))
+        self.file.write(data)
+
+    def add(self, reference, account_name, account_number, amount):
+        self.count += 1
+        self.toea += int(amount * 100)
+        self.hash_total = (self.hash_total + int(account_number)) % HASH_MODULUS
+        self.rows.update(_row_key(reference, account_number, amount))
+        self.write(self.detail(reference, account_name, account_number, amount))
+
+    def close(self):
+        self.write(self.trailer())
+        self.file.close()
+        os.replace(f"{self.path}.part", self.path)
+
+    @property
+    def control_total(self):
+        return Decimal(self.toea) / 100
+
+    def header(self):
+        return self.row(
+            "HEADER",
+            self.batch.bank.bank_initials,
+            self.batch.benefit_allocation_id,
+            f"{self.batch.created:%Y%m%d}",
+        )
+
+    def detail(self, reference, account_name, account_number, amount):
+        return self.row("DETAIL", account_number, account_name, amount, reference)
+
+    def trailer(self):
+        return self.row("TRAILER", self.count, self.control_total, self.hash_total)
+
+    def row(self, *values):
+        return csv.writer(Echo(), lineterminator="").writerow(values)
+
+
+class FixedWidthBatchFile(BatchFile):
+    # H/D/T records, RECORD_LENGTH characters each, amounts in toea.
+    extension = "txt"
+    encoding = "ascii"
+    max_account_length = 10
+
+    def write(self, line):
+        if len(line) > RECORD_LENGTH:
+            raise BatchError(f"Record longer than {RECORD_LENGTH} characters: {line}")
+        super().write(line.ljust(RECORD_LENGTH))
+
+    def header(self):
+        return (
+            f"H{self.batch.bank.bank_initials:<3}"
+            f"{self.batch.benefit_allocation_id:010d}"
+            f"{self.batch.created:%Y%m%d}"
+        )
+
+    def detail(self, reference, account_name, account_number, amount):
+        name = account_name.encode("ascii", "replace").decode()[:30]
+        return (
+            f"D{account_number:<10}{name:<30}{int(amount * 100):013d}{reference:010d}"
+        )
+
+    def trailer(self):
+        return f"T{self.count:07d}{self.toea:015d}{self.hash_total:015d}"
+
+
+BATCH_FILES = {"csv": BatchFile, "fixed": FixedWidthBatchFile}
+
+
+def _file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _row_key(pk, account_number, amount):
+    return f"{pk}:{account_number}:{amount}\n".encode()
+
+
+def _is_complete(batch, directory, fingerprint):
+    # A finished batch is skipped only while it pays the current rows and its
+    # file is still the one we wrote.
+    path = os.path.join(directory, batch.file_name)
+    return (
+        batch.status == "complete"
+        and batch.fingerprint == fingerprint
+        and os.path.exists(path)
+        and _file_checksum(path) == batch.checksum
+    )
+
+
+def payment_rows(allocation):
+    """
+    Yield ``(distribution_pk, account_name, account_number, bank_id, amount)``
+    for each paid distribution of ``allocation``, using its household's first
+    bank account, in one streamed query.
+    """
+    rows = (
+        AllocationDistribution.objects.filter(
+            benefit_allocation=allocation, amount__gt=0
+        )
+        .order_by("pk", "household__householdbankaccount__id")
+        .values_list(
+            "pk",
+            "household__householdbankaccount__account_name",
+            "household__householdbankaccount__account_number",
+            "household__householdbankaccount__bank_initials_id",
+            "amount",
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    last = None
+    for row in rows:
+        if row[0] != last:
+            last = row[0]
+            yield row
+
+
+def _payable_rows(allocation, banks, batch_class, rejected):
+    # The payment rows a bank file can take; the rest go to ``rejected``.
+    for pk, name, number, bank_id, amount in payment_rows(allocation):
+        bank = banks.get(bank_id)
+        if bank is None or bank.bank_initials == "Nil":
+            rejected.append((pk, "Household has no bank account"))
+            continue
+        error = account_number_error(number, bank)
+        if error is None and not number.isdigit():
+            error = f"Account number {number} is not numeric"
+        longest = batch_class.max_account_length
+        if error is None and longest and len(number) > longest:
+            error = (
+                f"Account number {number} is longer than the "
+                f"{longest} digits of the file format"
+            )
+        if error:
+            rejected.append((pk, error))
+            continue
+        yield pk, name, number, bank_id, amount
+
+
+def _fingerprints(allocation, banks, batch_class):
+    # SHA-256 per bank of the rows its file would pay.
+    digests = {}
+    for pk, _, number, bank_id, amount in _payable_rows(
+        allocation, banks, batch_class, []
+    ):
+        digests.setdefault(bank_id, hashlib.sha256()).update(
+            _row_key(pk, number, amount)
+        )
+    return {bank_id: digest.hexdigest() for bank_id, digest in digests.items()}
+
+
+def generate_batches(allocation, file_format="csv", directory=None, force=False):
+    """
+    Write one payment file per bank for ``allocation``'s distributions.
+
+    Returns ``(batches, rejected)``: the PaymentBatch rows written this run
+    and ``(distribution_pk, message)`` pairs for rows that cannot be paid.
+    Banks whose file is already complete, unchanged on disk and paying the
+    same rows are skipped, so an interrupted run can simply be started
+    again; files are rebuilt in the same order with the same header date,
+    so reruns are byte-identical.
+    """
+    if file_format not in BATCH_FILES:
+        raise BatchError(f"Unknown batch file format '{file_format}'")
+    directory = directory or settings.PAYMENT_BATCH_ROOT
+    os.makedirs(directory, exist_ok=True)
+
+    banks = Bank.objects.in_bulk()
+    batches = {
+        batch.bank_id: batch
+        for batch in PaymentBatch.objects.filter(
+            benefit_allocation=allocation, file_format=file_format
+        )
+    }
+    batch_class = BATCH_FILES[file_format]
+    done = set()
+    if not force and any(batch.status == "complete" for batch in batches.values()):
+        fingerprints = _fingerprints(allocation, banks, batch_class)
+        done = {
+            bank_id
+            for bank_id, batch in batches.items()
+            if _is_complete(batch, directory, fingerprints.get(bank_id))
+        }
+    files, rejected = {}, []
+    try:
+        for pk, name, number, bank_id, amount in _payable_rows(
+            allocation, banks, batch_class, rejected
+        ):
+            if bank_id in done:
+                continue
+            if bank_id not in files:
+                files[bank_id] = _open(
+                    allocation, banks[bank_id], file_format, batches, directory
+                )
+            files[bank_id].add(pk, name, number, amount)
+    except BaseException:
+        for batch_file in files.values():
+            batch_file.file.close()
+        raise
+
+    written = []
+    for batch_file in files.values():
+        batch_file.close()
+        batch = batch_file.batch
+        batch.status = "complete"
+        batch.record_count = batch_file.count
+        batch.control_total = batch_file.control_total
+        batch.hash_total = batch_file.hash_total
+        batch.checksum = batch_file.digest.hexdigest()
+        batch.fingerprint = batch_file.rows.hexdigest()
+        batch.completed = timezone.now()
+        batch.save()
+        written.append(batch)
+    return written, rejected
+
+
+def _open(allocation, bank, file_format, batches, directory):
+    batch_class = BATCH_FILES[file_format]
+    batch = batches.get(bank.pk)
+    if batch is None:
+        batch = PaymentBatch.objects.create(
+            benefit_allocation=allocation, bank=bank, file_format=file_format
+        )
+    batch.bank = bank
+    batch.status = "pending"
+    batch.file_name = f"{allocation.pk}-{bank.bank_initials}.{batch_class.extension}"
+    batch.save(update_fields=["status", "file_name"])
+    return batch_class(batch, os.path.join(directory, batch.file_name))
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from apps.community_context.models import CommunityPerson, Household
+from .models import AllocationDistribution, PaymentBatch
+
+RULES = dict(AllocationDistribution._meta.get_field("rule").choices)
+
+# Relative weights; override per rule with settings.CRS_DISTRIBUTION_WEIGHTS.
+DEFAULT_WEIGHTS = {
+    "age_group": {
+        "Baby": 0.5,
+        "Child": 0.5,
+        "Teenage": 0.75,
+        "Young Adult": 1,
+        "Middle-aged Adult": 1,
+        "Old Age": 1.5,
+    },
+    "dwelling_type": {
+        "Permanent": 1,
+        "Semi-Permanent": 1,
+        "Traditional": 1.25,
+        "": 1,
+    },
+}
+
+
+class DistributionError(Exception):
+    pass
+
+
+def get_weights(rule):
+    weights = dict(DEFAULT_WEIGHTS.get(rule, {}))
+    weights.update(getattr(settings, "CRS_DISTRIBUTION_WEIGHTS", {}).get(rule, {}))
+    return weights
+
+
+def household_weights(households, rule, trust_region_id, weights=None):
+    """
+    Return one weight per household in ``households``, a list of
+    ``(pk, trust_village_id, dwelling_type)`` rows of the households in
+    ``trust_region_id``.
+
+    Person-based rules read every member count in the region in a single
+    GROUP BY.
+    """
+    if rule not in RULES:
+        raise DistributionError(f"Unknown distribution rule '{rule}'")
+    weights = weights or get_weights(rule)
+    if rule == "household":
+        return [1] * len(households)
+    if rule == "dwelling_type":
+        return [
+            weights.get(dwelling_type or "", 1) for _, _, dwelling_type in households
+        ]
+
+    per_household = defaultdict(float)
+    members = (
+        CommunityPerson.objects.filter(household_number__trust_region=trust_region_id)
+        .values_list("household_number", "age_group")
+        .annotate(members=Count("pk"))
+        .order_by()
+    )
+    for household_id, age_group, count in members:
+        if rule == "capita":
+            per_household[household_id] += count
+        else:
+            per_household[household_id] += weights.get(age_group, 1) * count
+    return [per_household[pk] for pk, _, _ in households]
+
+
+def split_amount(amount, weights):
+    """
+    Split ``amount`` kina in proportion to ``weights``, in whole toea.
+
+    Every share is rounded down and the toea left over go to the largest
+    remainders, so the shares always add up to exactly ``amount``.
+    """
+    total = sum(weights)
+    if total <= 0:
+        raise DistributionError("Nothing to distribute to: all weights are zero")
+    toea = int((Decimal(amount) * 100).to_integral_value())
+    quotas = [toea * weight / total for weight in weights]
+    shares = [int(quota) for quota in quotas]
+    leftover = toea - sum(shares)
+    by_remainder = sorted(range(len(weights)), key=lambda i: (shares[i] - quotas[i], i))
+    for i in by_remainder[:leftover]:
+        shares[i] += 1
+    return [Decimal(share) / 100 for share in shares]
+
+
+def distribute_allocation(allocation, rule, weights=None, batch_size=5000):
+    """
+    Replace ``allocation``'s distributions with one row per household in its
+    trust region, split according to ``rule``. Its payment batches pay the
+    old rows, so they are marked stale. Returns the rows written.
+    """
+    households = list(
+        Household.objects.filter(trust_region=allocation.trust_region_id)
+        .order_by("pk")
+        .values_list("pk", "trust_village_id", "dwelling_number__dwelling_type")
+    )
+    if not households:
+        raise DistributionError(f"{allocation.trust_region} has no households")
+    shares = split_amount(
+        allocation.amount,
+        household_weights(households, rule, allocation.trust_region_id, weights),
+    )
+
+    rows = [
+        AllocationDistribution(
+            trust_region_id=allocation.trust_region_id,
+            trust_village_id=village_id,
+            benefit_category_id=allocation.community_benefit_category_id,
+            benefit_allocation=allocation,
+            household_id=household_id,
+            amount=share,
+            rule=rule,
+        )
+        for (household_id, village_id, _), share in zip(households, shares)
+        if share
+    ]
+    with transaction.atomic():
+        AllocationDistribution.objects.filter(benefit_allocation=allocation).delete()
+        AllocationDistribution.objects.bulk_create(rows, batch_size=batch_size)
+        PaymentBatch.objects.filter(benefit_allocation=allocation).update(
+            status="stale"
+        )
+    return rows
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.community_benefit.models import CommunityBenefitAllocation
+from apps.community_payment.distribution import (
+    RULES,
+    DistributionError,
+    distribute_allocation,
+)
+
+
+class Command(BaseCommand):
+    help = "Split a community benefit allocation across its trust region's households."
+
+    def add_arguments(self, parser):
+        parser.add_argument("allocation_ids", nargs="+", type=int)
+        parser.add_argument("--rule", choices=list(RULES), default="household")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        allocations = CommunityBenefitAllocation.objects.select_related(
+            "community_benefit_category", "trust_region"
+        ).in_bulk(options["allocation_ids"])
+        for allocation_id in options["allocation_ids"]:
+            if allocation_id not in allocations:
+                raise CommandError(f"No allocation with id {allocation_id}")
+            started = time.monotonic()
+            try:
+                rows = distribute_allocation(
+                    allocations[allocation_id],
+                    options["rule"],
+                    batch_size=options["batch_size"],
+                )
+            except DistributionError as error:
+                raise CommandError(error)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Distributed allocation {allocation_id} to {len(rows)} "
+                    f"households in {time.monotonic() - started:.1f}s"
+                )
+            )
@@ -0,0 +1,69 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.community_benefit.models import CommunityBenefitAllocation
+from apps.community_payment.batches import BATCH_FILES, BatchError, generate_batches
+
+
+class Command(BaseCommand):
+    help = "Write per-bank payment batch files for distributed allocations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("allocation_ids", nargs="+", type=int)
+        parser.add_argument("--format", choices=list(BATCH_FILES), default="csv")
+        parser.add_argument(
+            "--output", metavar="DIR", help="Defaults to PAYMENT_BATCH_ROOT."
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rewrite batches that are already complete.",
+        )
+        parser.add_argument(
+            "--errors",
+            metavar="PATH",
+            help="Write the rejected distributions to this CSV file.",
+        )
+
+    def handle(self, *args, **options):
+        allocations = CommunityBenefitAllocation.objects.in_bulk(
+            options["allocation_ids"]
+        )
+        rejected = []
+        for allocation_id in options["allocation_ids"]:
+            if allocation_id not in allocations:
+                raise CommandError(f"No allocation with id {allocation_id}")
+            started = time.monotonic()
+            try:
+                batches, errors = generate_batches(
+                    allocations[allocation_id],
+                    options["format"],
+                    options["output"],
+                    options["force"],
+                )
+            except (OSError, BatchError) as error:
+                raise CommandError(error)
+            rejected.extend(errors)
+            for batch in batches:
+                self.stdout.write(
+                    f"{batch.file_name}: {batch.record_count} payments, "
+                    f"{batch.control_total:,.2f} PGK, sha256 {batch.checksum}"
+                )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Allocation {allocation_id}: wrote {len(batches)} batches "
+                    f"in {time.monotonic() - started:.1f}s"
+                )
+            )
+
+        if options["errors"]:
+            with open(options["errors"], "w", newline="") as report:
+                writer = csv.writer(report)
+                writer.writerow(["distribution", "error"])
+                writer.writerows(rejected)
+        if rejected:
+            self.stdout.write(
+                self.style.WARNING(f"{len(rejected)} distributions were rejected")
+            )
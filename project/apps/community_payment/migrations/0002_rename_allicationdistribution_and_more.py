@@ -0,0 +1,55 @@
+# Generated by Django 4.2.4 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("community_context", "0008_alter_householdbankaccount_account_name_and_more"),
+        ("community_payment", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name="AllicationDistribution",
+            new_name="AllocationDistribution",
+        ),
+        migrations.AddField(
+            model_name="allocationdistribution",
+            name="household",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="allocation_distributions_by_household",
+                to="community_context.household",
+                verbose_name="Household",
+            ),
+        ),
+        migrations.AddField(
+            model_name="allocationdistribution",
+            name="amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Amount in PNG kina.",
+                max_digits=12,
+                verbose_name="Amount (PGK)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="allocationdistribution",
+            name="rule",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("household", "Equal per household"),
+                    ("capita", "Per capita"),
+                    ("age_group", "Weighted by age group"),
+                    ("dwelling_type", "Weighted by dwelling type"),
+                ],
+                max_length=20,
+                verbose_name="Distribution Rule",
+            ),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.2.4 on 2026-10-18 10:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0002_alter_bank_bank_initials_alter_bank_bank_name"),
+        ("community_benefit", "0004_communitybenefitallocation_trust_region"),
+        ("community_payment", "0002_rename_allicationdistribution_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "file_format",
+                    models.CharField(
+                        choices=[("csv", "CSV"), ("fixed", "Fixed width")],
+                        max_length=10,
+                        verbose_name="File Format",
+                    ),
+                ),
+                (
+                    "file_name",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="File Name"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "Pending"), ("complete", "Complete")],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "record_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Records"),
+                ),
+                (
+                    "control_total",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Control Total (PGK)",
+                    ),
+                ),
+                (
+                    "hash_total",
+                    models.PositiveBigIntegerField(
+                        default=0,
+                        help_text="Sum of the account numbers, modulo 10^15.",
+                        verbose_name="Hash Total",
+                    ),
+                ),
+                (
+                    "checksum",
+                    models.CharField(blank=True, max_length=64, verbose_name="SHA-256"),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created"),
+                ),
+                (
+                    "completed",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Completed"
+                    ),
+                ),
+                (
+                    "bank",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="payment_batches_by_bank",
+                        to="main.bank",
+                        verbose_name="Bank",
+                    ),
+                ),
+                (
+                    "benefit_allocation",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="payment_batches_by_benefit_allocation",
+                        to="community_benefit.communitybenefitallocation",
+                        verbose_name="Benefit Allocation",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Payment Batch",
+                "verbose_name_plural": "Payment Batches",
+                "unique_together": {("benefit_allocation", "bank", "file_format")},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("community_payment", "0003_paymentbatch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paymentbatch",
+            name="fingerprint",
+            field=models.CharField(
+                blank=True,
+                help_text="Of the distribution, account number and amount of each record.",
+                max_length=64,
+                verbose_name="Rows SHA-256",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="paymentbatch",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("complete", "Complete"),
+                    ("stale", "Stale"),
+                ],
+                default="pending",
+                help_text="Stale once the allocation is distributed again.",
+                max_length=10,
+                verbose_name="Status",
+            ),
+        ),
+    ]
@@ -41,8 +41,92 @@ class AllocationDistribution(models.Model):
         related_name="allocation_distributions_by_benefit_allocation",
         verbose_name="Benefit Allocation",
     )
-    # amount
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="allocation_distributions_by_household",
+        verbose_name="Household",
+    )
+    amount = models.DecimalField(
+        "Amount (PGK)",
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Amount in PNG kina.",
+    )
+    rule = models.CharField(
+        "Distribution Rule",
+        max_length=20,
+        blank=True,
+        choices=[
+            ("household", "Equal per household"),
+            ("capita", "Per capita"),
+            ("age_group", "Weighted by age group"),
+            ("dwelling_type", "Weighted by dwelling type"),
+        ],
+    )
 
     class Meta:
         verbose_name = "Allocation Distribution"
         verbose_name_plural = "Allocation Distributions"
+
+
+class PaymentBatch(models.Model):
+    benefit_allocation = models.ForeignKey(
+        CommunityBenefitAllocation,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="payment_batches_by_benefit_allocation",
+        verbose_name="Benefit Allocation",
+    )
+    bank = models.ForeignKey(
+        Bank,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="payment_batches_by_bank",
+        verbose_name="Bank",
+    )
+    file_format = models.CharField(
+        "File Format",
+        max_length=10,
+        choices=[("csv", "CSV"), ("fixed", "Fixed width")],
+    )
+    file_name = models.CharField("File Name", max_length=255, blank=True)
+    status = models.CharField(
+        "Status",
+        max_length=10,
+        default="pending",
+        choices=[
+            ("pending", "Pending"),
+            ("complete", "Complete"),
+            ("stale", "Stale"),
+        ],
+        help_text="Stale once the allocation is distributed again.",
+    )
+    record_count = models.PositiveIntegerField("Records", default=0)
+    control_total = models.DecimalField(
+        "Control Total (PGK)", max_digits=14, decimal_places=2, default=0
+    )
+    hash_total = models.PositiveBigIntegerField(
+        "Hash Total",
+        default=0,
+        help_text="Sum of the account numbers, modulo 10^15.",
+    )
+    checksum = models.CharField("SHA-256", max_length=64, blank=True)
+    fingerprint = models.CharField(
+        "Rows SHA-256",
+        max_length=64,
+        blank=True,
+        help_text="Of the distribution, account number and amount of each record.",
+    )
+    created = models.DateTimeField("Created", auto_now_add=True)
+    completed = models.DateTimeField("Completed", null=True, blank=True)
+
+    def __str__(self):
+        return self.file_name or f"{self.bank} {self.file_format} batch"
+
+    class Meta:
+        verbose_name = "Payment Batch"
+        verbose_name_plural = "Payment Batches"
+        unique_together = [("benefit_allocation", "bank", "file_format")]
@@ -1,3 +1,162 @@
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
 from django.test import TestCase
 
+from apps.community_benefit.models import (
+    CommunityBenefitAllocation,
+    CommunityBenefitCategory,
+)
+from apps.community_context.models import (
+    CommunityPerson,
+    Dwelling,
+    Household,
+    HouseholdBankAccount,
+)
+from apps.main.models import Bank, TrustRegion, TrustVillage
+from .batches import generate_batches
+from .distribution import distribute_allocation, split_amount
+from .models import AllocationDistribution, PaymentBatch
+
 # Create your tests here.
+
+
+class AllocationTestMixin:
+    # Three households of 1, 2 and 4 members sharing a 100 kina allocation.
+    def setUp(self):
+        region = TrustRegion.objects.create(name="Upper Porgera")
+        village = TrustVillage.objects.create(name="Yarik", trust_region=region)
+        for number, members in enumerate((1, 2, 4), start=1):
+            dwelling = Dwelling.objects.create(
+                trust_region=region,
+                trust_village=village,
+                dwelling_number=number,
+                construction_year=2000,
+            )
+            household = Household.objects.create(
+                trust_region=region,
+                trust_village=village,
+                dwelling_number=dwelling,
+                household_number=1,
+            )
+            for _ in range(members):
+                CommunityPerson.objects.create(
+                    first_name="Kewa",
+                    last_name=str(number),
+                    sex="M",
+                    relationship_to_head="Head",
+                    age_group="Young Adult",
+                    household_number=household,
+                )
+        self.allocation = CommunityBenefitAllocation.objects.create(
+            community_benefit_category=CommunityBenefitCategory.objects.create(
+                name="Education", trust_region=region
+            ),
+            trust_region=region,
+            amount=Decimal("100.00"),
+        )
+
+
+class DistributionTests(AllocationTestMixin, TestCase):
+    def test_split_amount_adds_up_to_the_toea(self):
+        shares = split_amount(Decimal("100.00"), [1, 1, 1])
+        self.assertEqual(sum(shares), Decimal("100.00"))
+        self.assertEqual(sorted(shares), [Decimal("33.33")] * 2 + [Decimal("33.34")])
+
+    def test_per_capita_replaces_previous_distribution(self):
+        distribute_allocation(self.allocation, "household")
+        distribute_allocation(self.allocation, "capita")
+        amounts = AllocationDistribution.objects.order_by("household").values_list(
+            "amount", flat=True
+        )
+        self.assertEqual(
+            list(amounts), [Decimal("14.29"), Decimal("28.57"), Decimal("57.14")]
+        )
+
+
+class PaymentBatchTests(AllocationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        bsp = Bank.objects.create(
+            bank_name="Bank of South Pacific",
+            bank_initials="BSP",
+            account_number_length=10,
+        )
+        kina = Bank.objects.create(
+            bank_name="Kina Bank", bank_initials="KB", account_number_length=8
+        )
+        accounts = [(bsp, "1000000001"), (kina, "20000002"), (kina, "123")]
+        for household, (bank, number) in zip(
+            Household.objects.order_by("pk"), accounts
+        ):
+            HouseholdBankAccount.objects.create(
+                household=household,
+                account_name=f"Household {household.pk}",
+                account_number=number,
+                bank_initials=bank,
+            )
+        distribute_allocation(self.allocation, "capita")
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_writes_one_file_per_bank_with_control_totals(self):
+        batches, rejected = generate_batches(self.allocation, "fixed", self.directory)
+        self.assertEqual(len(rejected), 1)
+        totals = {batch.bank.bank_initials: batch for batch in batches}
+        self.assertEqual(totals["KB"].control_total, Decimal("28.57"))
+        with open(os.path.join(self.directory, totals["KB"].file_name)) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[-1].rstrip(), "T0000001000000000002857000000020000002")
+
+    def test_rerun_skips_complete_batches(self):
+        first, _ = generate_batches(self.allocation, "csv", self.directory)
+        second, _ = generate_batches(self.allocation, "csv", self.directory)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(second, [])
+        third, _ = generate_batches(self.allocation, "csv", self.directory, force=True)
+        self.assertEqual(
+            sorted(batch.checksum for batch in first),
+            sorted(batch.checksum for batch in third),
+        )
+
+    def test_redistributing_regenerates_the_batches(self):
+        first, _ = generate_batches(self.allocation, "csv", self.directory)
+        distribute_allocation(self.allocation, "household")
+        self.assertEqual(
+            set(PaymentBatch.objects.values_list("status", flat=True)), {"stale"}
+        )
+        second, _ = generate_batches(self.allocation, "csv", self.directory)
+        self.assertEqual(len(second), 2)
+        with open(os.path.join(self.directory, second[0].file_name)) as file:
+            self.assertIn("33.3", file.read())
+
+        # Rows changed behind the batches' back are caught by the fingerprint.
+        AllocationDistribution.objects.filter(amount=Decimal("33.34")).update(
+            amount=Decimal("33.35")
+        )
+        third, _ = generate_batches(self.allocation, "csv", self.directory)
+        self.assertEqual(len(third), 1)
+        self.assertEqual(
+            generate_batches(self.allocation, "csv", self.directory)[0], []
+        )
+
+    def test_fixed_width_rejects_accounts_wider_than_the_field(self):
+        bank = Bank.objects.create(
+            bank_name="Westpac", bank_initials="WBC", account_number_length=12
+        )
+        HouseholdBankAccount.objects.filter(account_number="123").update(
+            bank_initials=bank, account_number="123456789012"
+        )
+        _, rejected = generate_batches(self.allocation, "fixed", self.directory)
+        self.assertEqual(
+            [message for _, message in rejected],
+            [
+                "Account number 123456789012 is longer than the 10 digits of the "
+                "file format"
+            ],
+        )
+        batches, rejected = generate_batches(self.allocation, "csv", self.directory)
+        self.assertEqual((len(batches), rejected), (3, []))
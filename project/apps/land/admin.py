@@ -1,6 +1,25 @@
-from django.contrib import admin
+from datetime import date
+
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.admin.sites import site as default_site
-from apps.main.admin import custom_admin_site
+from django.contrib.admin.utils import unquote
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.dateparse import parse_date
+from django.utils.html import format_html
+from apps.main.admin import custom_admin_site, OptimizedChangeListMixin
+from apps.main.exports import FORMATS as EXPORT_FORMATS
+from apps.main.exports import table_response
+from apps.main.search import TrigramSearchMixin
+from .geometry import GEOMETRY_FIELDS
+from .ledger import COMPANY_EXPORT, TENEMENT_EXPORT, ledger
+from .pointimport import FORMATS, PointImporter, PointImportError, read_points
+from .reconcile import FORMATS as STATEMENT_FORMATS
+from .reconcile import RentalReconciler, StatementError, read_statement
 from .models import (
     LandOwners,
     LandTenement,
@@ -13,13 +32,277 @@ from .models import (
     MiningTenementRental,
     MiningTenementSurvey,
     MiningTenementSurveyPoint,
+    PortfolioTenement,
 )
 
 # Register your models here.
 
 
+class RentalDueFilter(admin.SimpleListFilter):
+    title = "rental due"
+    parameter_name = "rental_due"
+
+    def lookups(self, request, model_admin):
+        return (
+            ("overdue", "Overdue"),
+            ("30", "Due in 30 days"),
+            ("90", "Due in 90 days"),
+            ("none", "No due date set"),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == "overdue":
+            return queryset.overdue()
+        if self.value() in ("30", "90"):
+            return queryset.due_within(int(self.value()))
+        if self.value() == "none":
+            return queryset.filter(rental_due_date__isnull=True)
+        return queryset
+
+
+class SurveyGeometryAdminMixin:
+    # The geometry is measured from the survey's points on every point save.
+    geometry_fieldset = (
+        "Geometry",
+        {
+            "fields": (
+                ("point_count", "area_m2", "perimeter_m"),
+                ("centroid_latitude", "centroid_longitude"),
+                ("min_latitude", "min_longitude", "max_latitude", "max_longitude"),
+            )
+        },
+    )
+
+    def get_readonly_fields(self, request, obj=None):
+        return [*super().get_readonly_fields(request, obj), *GEOMETRY_FIELDS]
+
+    def get_fieldsets(self, request, obj=None):
+        return [*super().get_fieldsets(request, obj), self.geometry_fieldset]
+
+    def area_hectares(self, obj):
+        return None if obj.area_m2 is None else round(obj.area_m2 / 10000, 2)
+
+    area_hectares.short_description = "Area (ha)"
+    area_hectares.admin_order_field = "area_m2"
+
+
+class RentalLedgerMixin:
+    change_list_template = "admin/land/acquisition_change_list.html"
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        urls = [
+            path(
+                "ledger/",
+                self.admin_site.admin_view(self.ledger_view),
+                name="%s_%s_ledger" % info,
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def has_ledger_permission(self, request):
+        # The ledger lists land and mining acquisitions together.
+        return all(
+            model in self.admin_site._registry
+            and self.admin_site._registry[model].has_view_permission(request)
+            for model in (LandTenementAcquisition, MiningTenementAcquisition)
+        )
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            "has_ledger_permission": self.has_ledger_permission(request),
+            **(extra_context or {}),
+        }
+        return super().changelist_view(request, extra_context)
+
+    def ledger_view(self, request):
+        if not self.has_ledger_permission(request):
+            raise PermissionDenied
+        request.current_app = self.admin_site.name
+        try:
+            as_of = parse_date(request.GET.get("as_of", "")) or date.today()
+        except ValueError:
+            as_of = date.today()
+        by_company = request.GET.get("by") == "company"
+        report = ledger(as_of)
+        rows = report["companies"] if by_company else report["tenements"]
+        columns = COMPANY_EXPORT if by_company else TENEMENT_EXPORT
+
+        if "format" in request.GET:
+            return table_response(
+                [header for header, _ in columns],
+                ([row[key] for _, key in columns] for row in rows),
+                f"rental_ledger_{as_of:%Y%m%d}",
+                request.GET["format"],
+            )
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": f"Rental ledger as of {as_of:%d %B %Y}",
+            "as_of": as_of,
+            "by_company": by_company,
+            "headers": [header for header, _ in columns],
+            "rows": [[row[key] for _, key in columns] for row in rows[:500]],
+            "count": len(rows),
+            "totals": report["totals"],
+            "export_formats": EXPORT_FORMATS,
+        }
+        return TemplateResponse(request, "admin/land/rental_ledger.html", context)
+
+
+class StatementUploadForm(forms.Form):
+    file = forms.FileField(help_text="A .csv, .ofx or .mt940 (.sta) bank statement.")
+    window_days = forms.IntegerField(
+        initial=7,
+        min_value=0,
+        help_text="Days either side of the payment date within which a "
+        "credit of the same amount matches a rental without a receipt number.",
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        help_text="Match the statement without marking anything Completed.",
+    )
+
+
+class RentalReconcileMixin:
+    change_list_template = "admin/land/rental_change_list.html"
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        urls = [
+            path(
+                "reconcile/",
+                self.admin_site.admin_view(self.reconcile_view),
+                name="%s_%s_reconcile" % info,
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def reconcile_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        request.current_app = self.admin_site.name
+        form = StatementUploadForm(request.POST or None, request.FILES or None)
+        reconciler = None
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            reconciler = RentalReconciler(
+                form.cleaned_data["window_days"], form.cleaned_data["dry_run"]
+            )
+            try:
+                reconciler.run(read_statement(upload.file, upload.name))
+            except StatementError as error:
+                form.add_error("file", str(error))
+                reconciler = None
+            else:
+                verb = "Would complete" if reconciler.dry_run else "Completed"
+                messages.success(
+                    request,
+                    f"{verb} {sum(reconciler.matched.values())} rentals: "
+                    f"{reconciler.matched['receipt']} by receipt number, "
+                    f"{reconciler.matched['date window']} by amount and date.",
+                )
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Reconcile rentals",
+            "form": form,
+            "reconciler": reconciler,
+            "formats": STATEMENT_FORMATS,
+        }
+        return TemplateResponse(request, "admin/land/reconcile_rentals.html", context)
+
+
+class PointUploadForm(forms.Form):
+    file = forms.FileField(
+        help_text="A .csv (latitude and longitude columns), .gpx or .kml file, "
+        "with the points in boundary order."
+    )
+    replace = forms.BooleanField(
+        required=False,
+        help_text="Delete the survey's current points first. Otherwise the file "
+        "is added after them.",
+    )
+
+
+class SurveyPointImportMixin:
+    change_form_template = "admin/land/survey_change_form.html"
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        urls = [
+            path(
+                "<path:object_id>/import-points/",
+                self.admin_site.admin_view(self.import_points_view),
+                name="%s_%s_import_points" % info,
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_points_view(self, request, object_id):
+        survey = self.get_object(request, unquote(object_id))
+        if survey is None:
+            raise Http404
+        if not self.has_change_permission(request, survey):
+            raise PermissionDenied
+        request.current_app = self.admin_site.name
+        form = PointUploadForm(request.POST or None, request.FILES or None)
+        importer = None
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            importer = PointImporter(survey, replace=form.cleaned_data["replace"])
+            try:
+                importer.run(read_points(upload.file, upload.name))
+            except PointImportError as error:
+                form.add_error("file", str(error))
+                importer = None
+            else:
+                if not importer.errors:
+                    messages.success(
+                        request, f"Imported {importer.created} points into {survey}."
+                    )
+                    return redirect(
+                        f"{self.admin_site.name}:%s_%s_change"
+                        % (self.model._meta.app_label, self.model._meta.model_name),
+                        survey.pk,
+                    )
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "original": survey,
+            "title": f"Import points into {survey}",
+            "form": form,
+            "importer": importer,
+            "formats": FORMATS,
+        }
+        return TemplateResponse(request, "admin/land/import_points.html", context)
+
+
+class RentalDueAdminMixin:
+    # Annotates the acquisition's due date so it sorts and filters in SQL.
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_rental_due()
+
+    def days_until_rental_due_alert(self, obj):
+        days = obj.days_until_rental_due
+        if days is not None:
+            if days < 0:
+                return f"Overdue by {-days} days"
+            elif days == 0:
+                return "Due today"
+            else:
+                return f"Due in {days} days"
+        return "No due date set"
+
+    days_until_rental_due_alert.short_description = "Rental Due Alert"
+    days_until_rental_due_alert.admin_order_field = "rental_due_date"
+
+
 @admin.register(LandOwners)
-class LandOwnersAdmin(admin.ModelAdmin):
+class LandOwnersAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = ["name"]
     search_fields = ["name"]
     list_per_page = 50
@@ -27,7 +310,9 @@ class LandOwnersAdmin(admin.ModelAdmin):
 
 
 @admin.register(LandTenement)
-class LandTenementAdmin(admin.ModelAdmin):
+class LandTenementAdmin(
+    RentalDueAdminMixin, OptimizedChangeListMixin, admin.ModelAdmin
+):
     list_display = [
         "land_name",
         "title",
@@ -38,7 +323,13 @@ class LandTenementAdmin(admin.ModelAdmin):
         "days_until_rental_due_alert",
     ]
     search_fields = ["land_name", "type_of_tenement"]
-    list_filter = ["type_of_tenement", "province", "district", "llg"]
+    list_filter = [
+        RentalDueFilter,
+        "type_of_tenement",
+        "province",
+        "district",
+        "llg",
+    ]
     list_per_page = 50
     ordering = ["title"]
     fieldsets = (
@@ -64,22 +355,11 @@ class LandTenementAdmin(admin.ModelAdmin):
         ),
     )
 
-    def days_until_rental_due_alert(self, obj):
-        days = obj.days_until_rental_due
-        if days is not None:
-            if days < 0:
-                return f"Overdue by {-days} days"
-            elif days == 0:
-                return "Due today"
-            else:
-                return f"Due in {days} days"
-        return "No due date set"
-
-    days_until_rental_due_alert.short_description = "Rental Due Alert"
-
 
 @admin.register(LandTenementAcquisition)
-class LandTenementAcquisitionAdmin(admin.ModelAdmin):
+class LandTenementAcquisitionAdmin(
+    RentalLedgerMixin, OptimizedChangeListMixin, admin.ModelAdmin
+):
     list_display = [
         "land_tenement",
         "purchase_price",
@@ -111,7 +391,9 @@ class LandTenementAcquisitionAdmin(admin.ModelAdmin):
 
 
 @admin.register(LandTenementRental)
-class LandTenementRentalAdmin(admin.ModelAdmin):
+class LandTenementRentalAdmin(
+    RentalReconcileMixin, OptimizedChangeListMixin, admin.ModelAdmin
+):
     list_display = ["land_tenement", "payment_date", "amount_paid", "payment_method"]
     search_fields = ["land_tenement__land_name"]
     list_filter = ["payment_method", "payment_status"]
@@ -137,8 +419,19 @@ class LandTenementRentalAdmin(admin.ModelAdmin):
 
 
 @admin.register(LandTenementSurvey)
-class LandTenementSurveyAdmin(admin.ModelAdmin):
-    list_display = ["land_tenement", "survey_date", "surveyor_name"]
+class LandTenementSurveyAdmin(
+    SurveyPointImportMixin,
+    SurveyGeometryAdminMixin,
+    OptimizedChangeListMixin,
+    admin.ModelAdmin,
+):
+    list_display = [
+        "land_tenement",
+        "survey_date",
+        "surveyor_name",
+        "point_count",
+        "area_hectares",
+    ]
     search_fields = ["land_tenement__land_name", "surveyor_name"]
     list_filter = ["survey_date"]
     list_per_page = 50
@@ -150,19 +443,21 @@ class LandTenementSurveyAdmin(admin.ModelAdmin):
 
 
 @admin.register(LandTenementSurveyPoint)
-class LandTenementSurveyPointAdmin(admin.ModelAdmin):
-    list_display = ["land_tenement_survey", "latitude", "longitude"]
+class LandTenementSurveyPointAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
+    list_display = ["land_tenement_survey", "sequence", "latitude", "longitude"]
     search_fields = ["land_tenement_survey__land_tenement__land_name"]
     list_per_page = 50
-    ordering = ["land_tenement_survey"]
+    ordering = ["land_tenement_survey", "sequence"]
     fieldsets = (
         ("Land Tenement Survey Info", {"fields": ("land_tenement_survey",)}),
-        ("Point Details", {"fields": ("latitude", "longitude")}),
+        ("Point Details", {"fields": ("sequence", "latitude", "longitude")}),
     )
 
 
 @admin.register(MiningTenement)
-class MiningTenementAdmin(admin.ModelAdmin):
+class MiningTenementAdmin(
+    RentalDueAdminMixin, OptimizedChangeListMixin, admin.ModelAdmin
+):
     list_display = [
         "land_name",
         "title",
@@ -173,7 +468,13 @@ class MiningTenementAdmin(admin.ModelAdmin):
         "days_until_rental_due_alert",
     ]
     search_fields = ["land_name", "type_of_tenement"]
-    list_filter = ["type_of_tenement", "province", "district", "llg"]
+    list_filter = [
+        RentalDueFilter,
+        "type_of_tenement",
+        "province",
+        "district",
+        "llg",
+    ]
     list_per_page = 50
     ordering = ["title"]
     fieldsets = (
@@ -199,22 +500,11 @@ class MiningTenementAdmin(admin.ModelAdmin):
         ),
     )
 
-    def days_until_rental_due_alert(self, obj):
-        days = obj.days_until_rental_due
-        if days is not None:
-            if days < 0:
-                return f"Overdue by {-days} days"
-            elif days == 0:
-                return "Due today"
-            else:
-                return f"Due in {days} days"
-        return "No due date set"
-
-    days_until_rental_due_alert.short_description = "Rental Due Alert"
-
 
 @admin.register(MiningTenementAcquisition)
-class MiningTenementAcquisitionAdmin(admin.ModelAdmin):
+class MiningTenementAcquisitionAdmin(
+    RentalLedgerMixin, OptimizedChangeListMixin, admin.ModelAdmin
+):
     list_display = [
         "mining_tenement",
         "purchase_price",
@@ -246,7 +536,9 @@ class MiningTenementAcquisitionAdmin(admin.ModelAdmin):
 
 
 @admin.register(MiningTenementRental)
-class MiningTenementRentalAdmin(admin.ModelAdmin):
+class MiningTenementRentalAdmin(
+    RentalReconcileMixin, OptimizedChangeListMixin, admin.ModelAdmin
+):
     list_display = ["mining_tenement", "payment_date", "amount_paid", "payment_method"]
     search_fields = ["mining_tenement__land_name"]
     list_filter = ["payment_method", "payment_status"]
@@ -272,8 +564,19 @@ class MiningTenementRentalAdmin(admin.ModelAdmin):
 
 
 @admin.register(MiningTenementSurvey)
-class MiningTenementSurveyAdmin(admin.ModelAdmin):
-    list_display = ["mininig_tenement", "survey_date", "surveyor_name"]
+class MiningTenementSurveyAdmin(
+    SurveyPointImportMixin,
+    SurveyGeometryAdminMixin,
+    OptimizedChangeListMixin,
+    admin.ModelAdmin,
+):
+    list_display = [
+        "mininig_tenement",
+        "survey_date",
+        "surveyor_name",
+        "point_count",
+        "area_hectares",
+    ]
     search_fields = ["mininig_tenement__land_name", "surveyor_name"]
     list_filter = ["survey_date"]
     list_per_page = 50
@@ -285,17 +588,60 @@ class MiningTenementSurveyAdmin(admin.ModelAdmin):
 
 
 @admin.register(MiningTenementSurveyPoint)
-class MiningTenementSurveyPointAdmin(admin.ModelAdmin):
-    list_display = ["mining_tenement_survey", "latitude", "longitude"]
+class MiningTenementSurveyPointAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
+    list_display = ["mining_tenement_survey", "sequence", "latitude", "longitude"]
     search_fields = ["mining_tenement_survey__mininig_tenement__land_name"]
     list_per_page = 50
-    ordering = ["mining_tenement_survey"]
+    ordering = ["mining_tenement_survey", "sequence"]
     fieldsets = (
         ("Mining Tenement Survey Info", {"fields": ("mining_tenement_survey",)}),
-        ("Point Details", {"fields": ("latitude", "longitude")}),
+        ("Point Details", {"fields": ("sequence", "latitude", "longitude")}),
     )
 
 
+@admin.register(PortfolioTenement)
+class PortfolioTenementAdmin(
+    TrigramSearchMixin, OptimizedChangeListMixin, admin.ModelAdmin
+):
+    # Kept up to date from the tenement models; edit those instead.
+    list_display = [
+        "title",
+        "kind",
+        "land_name",
+        "type_of_tenement",
+        "province",
+        "district",
+        "llg",
+        "lease_holder",
+        "rental_due_date",
+        "point_count",
+        "tenement",
+    ]
+    search_fields = ["title", "land_name"]
+    trigram_fields = ("title", "land_name")
+    list_filter = [RentalDueFilter, "kind", "type_of_tenement", "province"]
+    list_per_page = 50
+    ordering = ["title"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def tenement(self, obj):
+        url = reverse(
+            f"{self.admin_site.name}:land_{obj.kind.lower()}tenement_change",
+            args=[obj.tenement_id],
+        )
+        return format_html('<a href="{}">Open</a>', url)
+
+    tenement.short_description = "Tenement"
+
+
 for model, model_admin in default_site._registry.items():
     if model not in custom_admin_site._registry:
         custom_admin_site.register(model, type(model_admin))
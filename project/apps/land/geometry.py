@@ -0,0 +1,330 @@
+import math
+from decimal import Decimal
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connections, transaction
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+# Mean Earth radius (IUGG), in metres.
+EARTH_RADIUS = 6371008.8
+
+GEOMETRY_FIELDS = [
+    "point_count",
+    "area_m2",
+    "perimeter_m",
+    "centroid_latitude",
+    "centroid_longitude",
+    "min_latitude",
+    "min_longitude",
+    "max_latitude",
+    "max_longitude",
+]
+
+
+def _coordinate(value):
+    return Decimal(f"{value:.6f}")
+
+
+def _metrics_numpy(latitudes, longitudes):
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    lat_next, lon_next = np.roll(lat, -1), np.roll(lon, -1)
+    area = abs(np.sum((lon_next - lon) * (2 + np.sin(lat) + np.sin(lat_next)))) * (
+        EARTH_RADIUS**2 / 2
+    )
+    half = (
+        np.sin((lat_next - lat) / 2) ** 2
+        + np.cos(lat) * np.cos(lat_next) * np.sin((lon_next - lon) / 2) ** 2
+    )
+    perimeter = np.sum(2 * EARTH_RADIUS * np.arcsin(np.sqrt(half)))
+
+    # Centroid of the outline projected onto a plane at its mean latitude.
+    origin_lat, origin_lon = np.mean(latitudes), np.mean(longitudes)
+    x = (np.asarray(longitudes, dtype=float) - origin_lon) * math.cos(
+        math.radians(origin_lat)
+    )
+    y = np.asarray(latitudes, dtype=float) - origin_lat
+    x_next, y_next = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y_next - x_next * y
+    twice_area = np.sum(cross)
+    if abs(twice_area) < 1e-12:
+        return float(area), float(perimeter), origin_lat, origin_lon
+    cx = np.sum((x + x_next) * cross) / (3 * twice_area)
+    cy = np.sum((y + y_next) * cross) / (3 * twice_area)
+    return (
+        float(area),
+        float(perimeter),
+        origin_lat + float(cy),
+        origin_lon + float(cx) / math.cos(math.radians(origin_lat)),
+    )
+
+
+def _metrics_python(latitudes, longitudes):
+    ring = list(zip(latitudes, longitudes))
+    edges = list(zip(ring, ring[1:] + ring[:1]))
+    area = perimeter = 0.0
+    for (lat1, lon1), (lat2, lon2) in edges:
+        lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+        area += (lon2 - lon1) * (2 + math.sin(lat1) + math.sin(lat2))
+        half = (
+            math.sin((lat2 - lat1) / 2) ** 2
+            + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        )
+        perimeter += 2 * EARTH_RADIUS * math.asin(math.sqrt(half))
+    area = abs(area) * EARTH_RADIUS**2 / 2
+
+    origin_lat = sum(latitudes) / len(latitudes)
+    origin_lon = sum(longitudes) / len(longitudes)
+    scale = math.cos(math.radians(origin_lat))
+    twice_area = cx = cy = 0.0
+    for (lat1, lon1), (lat2, lon2) in edges:
+        x1, y1 = (lon1 - origin_lon) * scale, lat1 - origin_lat
+        x2, y2 = (lon2 - origin_lon) * scale, lat2 - origin_lat
+        cross = x1 * y2 - x2 * y1
+        twice_area += cross
+        cx += (x1 + x2) * cross
+        cy += (y1 + y2) * cross
+    if abs(twice_area) < 1e-12:
+        return area, perimeter, origin_lat, origin_lon
+    return (
+        area,
+        perimeter,
+        origin_lat + cy / (3 * twice_area),
+        origin_lon + cx / (3 * twice_area) / scale,
+    )
+
+
+def polygon_metrics(latitudes, longitudes):
+    """
+    Area (m²), perimeter (m), centroid and bounding box of the closed ring
+    through the given points, in order, as ``GEOMETRY_FIELDS`` values.
+
+    Area and perimeter are measured on the sphere, which for tenement-sized
+    outlines is within a fraction of a percent of the WGS84 ellipsoid. Uses
+    NumPy when it is installed.
+    """
+    latitudes = [float(value) for value in latitudes]
+    longitudes = [float(value) for value in longitudes]
+    if not latitudes:
+        return dict.fromkeys(GEOMETRY_FIELDS, None) | {"point_count": 0}
+    metrics = _metrics_numpy if np is not None else _metrics_python
+    area, perimeter, centroid_lat, centroid_lon = metrics(latitudes, longitudes)
+    if len(latitudes) < 3:
+        area = 0.0
+    return {
+        "point_count": len(latitudes),
+        "area_m2": area,
+        "perimeter_m": perimeter,
+        "centroid_latitude": _coordinate(centroid_lat),
+        "centroid_longitude": _coordinate(centroid_lon),
+        "min_latitude": _coordinate(min(latitudes)),
+        "min_longitude": _coordinate(min(longitudes)),
+        "max_latitude": _coordinate(max(latitudes)),
+        "max_longitude": _coordinate(max(longitudes)),
+    }
+
+
+def survey_points(survey_model, survey_ids):
+    # {survey id: (latitudes, longitudes)} with each outline in boundary order.
+    relation = survey_model._meta.get_field(survey_model.points_related_name)
+    fk = relation.field.attname
+    rows = (
+        relation.related_model.objects.filter(**{f"{fk}__in": survey_ids})
+        .order_by(fk, "sequence", "pk")
+        .values_list(fk, "latitude", "longitude")
+    )
+    outlines = {}
+    for survey_id, points in groupby(rows.iterator(), key=lambda row: row[0]):
+        points = list(points)
+        outlines[survey_id] = (
+            [latitude for _, latitude, _ in points],
+            [longitude for _, _, longitude in points],
+        )
+    return outlines
+
+
+def uses_postgis(survey_model):
+    # Opt in with CRS_GEOMETRY_POSTGIS on a database with PostGIS installed.
+    connection = connections[survey_model.objects.db]
+    if not getattr(settings, "CRS_GEOMETRY_POSTGIS", False):
+        return False
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")
+        return cursor.fetchone() is not None
+
+
+def _refresh_postgis(survey_model, survey_ids):
+    relation = survey_model._meta.get_field(survey_model.points_related_name)
+    points_table = relation.related_model._meta.db_table
+    fk = relation.field.column
+    table = survey_model._meta.db_table
+    with connections[survey_model.objects.db].cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH lines AS (
+                SELECT "{fk}" AS survey_id,
+                       COUNT(*) AS point_count,
+                       ST_MakeLine(
+                           ST_MakePoint(longitude::float8, latitude::float8)
+                           ORDER BY sequence, id
+                       ) AS line,
+                       MIN(latitude) AS min_latitude,
+                       MIN(longitude) AS min_longitude,
+                       MAX(latitude) AS max_latitude,
+                       MAX(longitude) AS max_longitude
+                FROM "{points_table}"
+                WHERE "{fk}" = ANY(%s)
+                GROUP BY "{fk}"
+            ), shapes AS (
+                SELECT *,
+                       CASE WHEN point_count >= 3
+                            THEN ST_MakePolygon(ST_AddPoint(line, ST_StartPoint(line)))
+                       END AS shape
+                FROM lines
+            )
+            UPDATE "{table}" AS survey SET
+                point_count = shapes.point_count,
+                area_m2 = COALESCE(ST_Area(shapes.shape::geography), 0),
+                perimeter_m = COALESCE(
+                    ST_Perimeter(shapes.shape::geography),
+                    2 * ST_Length(shapes.line::geography)
+                ),
+                centroid_latitude = ROUND(
+                    ST_Y(ST_Centroid(COALESCE(shapes.shape, shapes.line)))::numeric, 6
+                ),
+                centroid_longitude = ROUND(
+                    ST_X(ST_Centroid(COALESCE(shapes.shape, shapes.line)))::numeric, 6
+                ),
+                min_latitude = shapes.min_latitude,
+                min_longitude = shapes.min_longitude,
+                max_latitude = shapes.max_latitude,
+                max_longitude = shapes.max_longitude
+            FROM shapes
+            WHERE survey.id = shapes.survey_id
+            """,
+            [list(survey_ids)],
+        )
+    # Surveys with no points left.
+    survey_model.objects.filter(pk__in=survey_ids).exclude(
+        pk__in=relation.related_model.objects.filter(
+            **{f"{relation.field.attname}__in": survey_ids}
+        ).values(relation.field.attname)
+    ).update(**(dict.fromkeys(GEOMETRY_FIELDS, None) | {"point_count": 0}))
+
+
+@transaction.atomic
+def refresh_geometry(survey_model, surveys=None, batch_size=1000):
+    """
+    Recompute the cached geometry of ``surveys`` (default all) of
+    ``survey_model`` from their points. Returns the number of surveys.
+    """
+    if surveys is None:
+        surveys = survey_model.objects.all()
+    survey_ids = list(surveys.values_list("pk", flat=True))
+    if uses_postgis(survey_model):
+        for start in range(0, len(survey_ids), batch_size):
+            _refresh_postgis(survey_model, survey_ids[start : start + batch_size])
+        return len(survey_ids)
+    for start in range(0, len(survey_ids), batch_size):
+        batch = survey_ids[start : start + batch_size]
+        outlines = survey_points(survey_model, batch)
+        updated = []
+        for survey_id in batch:
+            survey = survey_model(pk=survey_id)
+            for name, value in polygon_metrics(
+                *outlines.get(survey_id, ([], []))
+            ).items():
+                setattr(survey, name, value)
+            updated.append(survey)
+        survey_model.objects.bulk_update(updated, GEOMETRY_FIELDS)
+    return len(survey_ids)
+
+
+# Web Mercator tiles are 256 pixels wide at zoom 0 and double at each level.
+TILE_SIZE = 256
+MAX_ZOOM = 20
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+
+def _pixels(latitude, longitude, zoom):
+    world = TILE_SIZE * 2**zoom
+    latitude = max(-MAX_MERCATOR_LATITUDE, min(MAX_MERCATOR_LATITUDE, latitude))
+    sin = math.sin(math.radians(latitude))
+    return (
+        (longitude + 180) / 360 * world,
+        (0.5 - math.log((1 + sin) / (1 - sin)) / (4 * math.pi)) * world,
+    )
+
+
+def _segment_distance2(point, start, end):
+    (x, y), (x1, y1), (x2, y2) = point, start, end
+    dx, dy = x2 - x1, y2 - y1
+    if dx or dy:
+        t = max(0, min(1, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)))
+        x1, y1 = x1 + t * dx, y1 + t * dy
+    return (x - x1) ** 2 + (y - y1) ** 2
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Indexes of the ``points`` of a closed ring (first point not repeated)
+    that Douglas–Peucker keeps at ``tolerance``, in order. Always keeps at
+    least three so the ring stays a polygon.
+    """
+    count = len(points)
+    if count <= 3:
+        return list(range(count))
+    # Split the ring at the point farthest from the first one and simplify
+    # both halves; index ``count`` stands for the first point again.
+    first = points[0]
+    far = max(
+        range(1, count), key=lambda i: _segment_distance2(points[i], first, first)
+    )
+    keep = {0, far}
+    stack = [(0, far), (far, count)]
+    tolerance2 = tolerance**2
+    while stack:
+        start, end = stack.pop()
+        best, best_distance = None, tolerance2
+        for i in range(start + 1, end):
+            distance = _segment_distance2(points[i], points[start], points[end % count])
+            if distance > best_distance:
+                best, best_distance = i, distance
+        if best is not None:
+            keep.add(best)
+            stack += [(start, best), (best, end)]
+    if len(keep) < 3:
+        keep.add(
+            max(
+                (i for i in range(count) if i not in keep),
+                key=lambda i: _segment_distance2(points[i], points[0], points[far]),
+            )
+        )
+    return sorted(keep)
+
+
+def simplify_ring(latitudes, longitudes, zoom, tolerance=0.5):
+    """
+    GeoJSON ring (closed list of ``[longitude, latitude]``) of the outline
+    simplified to ``tolerance`` pixels at ``zoom``, with coordinates rounded
+    to what that zoom can show.
+    """
+    latitudes = [float(value) for value in latitudes]
+    longitudes = [float(value) for value in longitudes]
+    pixels = [
+        _pixels(latitude, longitude, zoom)
+        for latitude, longitude in zip(latitudes, longitudes)
+    ]
+    digits = min(6, max(0, math.ceil(math.log10(TILE_SIZE * 2**zoom / 360))) + 1)
+    ring = [
+        [round(longitudes[i], digits), round(latitudes[i], digits)]
+        for i in douglas_peucker(pixels, tolerance)
+    ]
+    return ring + ring[:1]
@@ -0,0 +1,203 @@
+import calendar
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.main.cache import bump_version, get_or_build
+from .models import LandTenement, MiningTenement
+
+LEDGER = "ledger"
+
+TENEMENT_COLUMNS = (
+    "kind",
+    "pk",
+    "title",
+    "land_name",
+    "lease_holder_id",
+    "lease_holder_name",
+    "rental_amount",
+    "rental_due_date",
+    "start_date",
+    "end_date",
+    "paid",
+)
+TENEMENT_EXPORT = (
+    ("Kind", "kind"),
+    ("Title", "title"),
+    ("Land Name", "land_name"),
+    ("Lease Holder", "lease_holder_name"),
+    ("Rental Amount", "rental_amount"),
+    ("Periods Due", "periods_due"),
+    ("Expected", "expected"),
+    ("Paid", "paid"),
+    ("Arrears", "arrears"),
+    ("Next Due", "next_due"),
+)
+COMPANY_EXPORT = (
+    ("Lease Holder", "lease_holder_name"),
+    ("Tenements", "tenements"),
+    ("Expected", "expected"),
+    ("Paid", "paid"),
+    ("Arrears", "arrears"),
+)
+
+
+def period_months():
+    return getattr(settings, "CRS_RENTAL_PERIOD_MONTHS", 12)
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _months_between(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def due_schedule(anchor, start, end, until, months=None):
+    """
+    ``(first_due, periods_due, next_due)`` for a rental falling due every
+    ``months`` months on the anniversaries of ``anchor``, from ``start`` to
+    ``end`` (open ended when None), counting the dues up to ``until``.
+    Worked out arithmetically, so it costs the same for any lease length.
+    """
+    months = months or period_months()
+    start = start or anchor
+    # First anniversary on or after the start of the lease.
+    steps = _months_between(anchor, start) // months
+    while add_months(anchor, steps * months) < start:
+        steps += 1
+    while add_months(anchor, (steps - 1) * months) >= start:
+        steps -= 1
+    first_due = add_months(anchor, steps * months)
+
+    limit = min(until, end) if end else until
+    periods = 0
+    if first_due <= limit:
+        periods = _months_between(first_due, limit) // months + 1
+        if add_months(first_due, (periods - 1) * months) > limit:
+            periods -= 1
+    next_due = add_months(first_due, periods * months)
+    if end and next_due > end:
+        next_due = None
+    return first_due, periods, next_due
+
+
+def expected_dues(anchor, start, end, until, amount, months=None):
+    # The dues themselves, period by period: [(due date, amount), ...].
+    months = months or period_months()
+    first_due, periods, _ = due_schedule(anchor, start, end, until, months)
+    return [(add_months(first_due, i * months), amount) for i in range(periods)]
+
+
+def _tenement_rows(model, kind, as_of):
+    acquisition = model.acquisition_related_name
+    rentals = model._meta.get_field(model.rental_related_name)
+    fk = rentals.field.name
+    paid = (
+        rentals.related_model.objects.filter(
+            **{
+                fk: OuterRef("pk"),
+                "payment_status": "Completed",
+                "payment_date__lte": as_of,
+            }
+        )
+        .order_by()
+        .values(fk)
+        .annotate(total=Sum("amount_paid"))
+        .values("total")
+    )
+    return (
+        model.objects.filter(**{f"{acquisition}__isnull": False})
+        .annotate(
+            kind=Value(kind),
+            lease_holder_name=F("lease_holder__name"),
+            rental_amount=F(f"{acquisition}__rental_amount"),
+            rental_due_date=F(f"{acquisition}__rental_due_date"),
+            start_date=Coalesce(
+                f"{acquisition}__start_date", f"{acquisition}__acquisition_date"
+            ),
+            end_date=F(f"{acquisition}__end_date"),
+            paid=Coalesce(
+                Subquery(paid),
+                Value(Decimal("0")),
+                output_field=DecimalField(max_digits=15, decimal_places=2),
+            ),
+        )
+        .values_list(*TENEMENT_COLUMNS)
+        .order_by()
+    )
+
+
+def build_ledger(as_of):
+    """
+    Expected dues, payments and arrears per tenement and per lease holder as
+    of ``as_of``. Land and mining tenements, with their completed payments
+    summed in a correlated subquery, come back in one UNION ALL query; the
+    dues are then worked out in a single pass over the rows.
+    """
+    land = _tenement_rows(LandTenement, "Land", as_of)
+    mining = _tenement_rows(MiningTenement, "Mining", as_of)
+    months = period_months()
+    tenements = []
+    companies = defaultdict(
+        lambda: {"tenements": 0, "expected": 0, "paid": 0, "arrears": 0}
+    )
+    for row in land.union(mining, all=True):
+        row = dict(zip(TENEMENT_COLUMNS, row))
+        amount = row["rental_amount"] or Decimal("0")
+        periods, next_due = 0, None
+        if row["rental_due_date"]:
+            _, periods, next_due = due_schedule(
+                row["rental_due_date"],
+                row["start_date"],
+                row["end_date"],
+                as_of,
+                months,
+            )
+        row.update(
+            periods_due=periods,
+            expected=amount * periods,
+            arrears=amount * periods - row["paid"],
+            next_due=next_due,
+        )
+        tenements.append(row)
+
+        company = companies[row["lease_holder_id"]]
+        company["lease_holder_id"] = row["lease_holder_id"]
+        company["lease_holder_name"] = row["lease_holder_name"]
+        company["tenements"] += 1
+        for key in ("expected", "paid", "arrears"):
+            company[key] += row[key]
+
+    tenements.sort(key=lambda row: (-row["arrears"], row["title"]))
+    companies = sorted(
+        companies.values(),
+        key=lambda row: (-row["arrears"], row["lease_holder_name"] or ""),
+    )
+    return {
+        "as_of": as_of,
+        "tenements": tenements,
+        "companies": companies,
+        "totals": {
+            key: sum(row[key] for row in tenements)
+            for key in ("expected", "paid", "arrears")
+        },
+    }
+
+
+def ledger(as_of=None):
+    # Cached per day until a tenement, acquisition, rental or company changes.
+    as_of = as_of or date.today()
+    return get_or_build(LEDGER, as_of.isoformat(), lambda: build_ledger(as_of))
+
+
+def invalidate_ledger(**kwargs):
+    transaction.on_commit(lambda: bump_version(LEDGER))
@@ -0,0 +1,67 @@
+import csv
+import time
+from contextlib import ExitStack
+from itertools import chain
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.land.reconcile import (
+    EXCEPTION_COLUMNS,
+    RentalReconciler,
+    StatementError,
+    read_statement,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark pending land and mining rentals Completed from bank statement "
+        "exports (CSV, OFX or MT940) and report the lines that did not match."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("statements", nargs="+", metavar="STATEMENT")
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=7,
+            help="Days either side of the payment date for amount-only matches.",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--exceptions", help="Write unmatched lines to this CSV.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        reconciler = RentalReconciler(options["window"], options["dry_run"])
+        with ExitStack() as stack:
+            try:
+                # Positions name the file, as several statements can be read.
+                lines = chain.from_iterable(
+                    (
+                        line._replace(position=f"{path}: {line.position}")
+                        for line in read_statement(
+                            stack.enter_context(open(path, "rb")), path
+                        )
+                    )
+                    for path in options["statements"]
+                )
+                reconciler.run(lines)
+            except (OSError, StatementError) as error:
+                raise CommandError(str(error))
+
+        if options["exceptions"]:
+            with open(options["exceptions"], "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(EXCEPTION_COLUMNS)
+                writer.writerows(reconciler.exceptions)
+        verb = "Would complete" if options["dry_run"] else "Completed"
+        matched = ", ".join(
+            f"{count} by {how}" for how, count in reconciler.matched.items()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {sum(reconciler.matched.values())} rentals ({matched}); "
+                f"{len(reconciler.exceptions)} exceptions, {reconciler.skipped} "
+                f"debits skipped, in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.land.portfolio import refresh_portfolio
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the portfolio read model of land and mining tenements, for "
+        "changes made without signals such as bulk loads or raw SQL."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = refresh_portfolio()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed {count} portfolio tenements "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
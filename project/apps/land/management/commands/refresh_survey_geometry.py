@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.land.geometry import refresh_geometry
+from apps.land.models import LandTenementSurvey, MiningTenementSurvey
+from apps.land.portfolio import refresh_portfolio
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the area, perimeter, centroid and bounding box cached on "
+        "land and mining tenement surveys from their survey points, and "
+        "the copy of it in the tenement portfolio."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        counts = [
+            refresh_geometry(model)
+            for model in (LandTenementSurvey, MiningTenementSurvey)
+        ]
+        # The portfolio carries a copy of each tenement's current geometry.
+        refresh_portfolio()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Measured {counts[0]} land and {counts[1]} mining surveys "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
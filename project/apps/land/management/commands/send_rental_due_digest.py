@@ -0,0 +1,53 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+
+from apps.land.rentals import DUE_COLUMNS, upcoming_rental_dues
+
+
+class Command(BaseCommand):
+    help = (
+        "Email one digest of overdue and upcoming tenement rentals. "
+        "Meant to run daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument(
+            "--to",
+            action="append",
+            metavar="EMAIL",
+            help="Recipient; repeat for more. Defaults to settings.ADMINS.",
+        )
+
+    def handle(self, *args, **options):
+        recipients = options["to"] or [email for _, email in settings.ADMINS]
+        if not recipients:
+            raise CommandError("No recipients: pass --to or set ADMINS.")
+        today = date.today()
+        dues = [
+            dict(zip(DUE_COLUMNS, row))
+            for row in upcoming_rental_dues(options["days"], today)
+        ]
+        if not dues:
+            self.stdout.write("No rentals due; nothing sent.")
+            return
+        context = {
+            "today": today,
+            "days": options["days"],
+            "overdue": [due for due in dues if due["rental_due_date"] < today],
+            "upcoming": [due for due in dues if due["rental_due_date"] >= today],
+        }
+        send_mail(
+            f"Rental dues: {len(context['overdue'])} overdue, "
+            f"{len(context['upcoming'])} due in {options['days']} days",
+            render_to_string("land/rental_due_digest.txt", context),
+            None,
+            recipients,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Sent {len(dues)} rental dues to {len(recipients)}")
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("land", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="landtenementacquisition",
+            name="rental_due_date",
+            field=models.DateField(
+                blank=True, db_index=True, verbose_name="Rental Due Date"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="miningtenementacquisition",
+            name="rental_due_date",
+            field=models.DateField(
+                blank=True, db_index=True, verbose_name="Rental Due Date"
+            ),
+        ),
+    ]
@@ -0,0 +1,291 @@
+# Generated by Django 4.2.4 on 2026-10-18 16:20
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+from apps.land.geometry import GEOMETRY_FIELDS, polygon_metrics
+
+SURVEYS = {
+    # survey model: (point model, point foreign key)
+    "LandTenementSurvey": ("LandTenementSurveyPoint", "land_tenement_survey_id"),
+    "MiningTenementSurvey": ("MiningTenementSurveyPoint", "mining_tenement_survey_id"),
+}
+
+# The ``box && box`` overlap test in SurveyQuerySet.intersecting() is served
+# by these PostgreSQL GiST indexes; other databases use the B-tree indexes.
+BOX_INDEXES = {
+    "LandTenementSurvey": "land_survey_box_gist",
+    "MiningTenementSurvey": "mining_survey_box_gist",
+}
+
+
+def number_points(apps, schema_editor):
+    # Existing points keep the order they were entered in.
+    for survey_name, (point_name, fk) in SURVEYS.items():
+        Point = apps.get_model("land", point_name)
+        points = Point.objects.order_by(fk, "pk").only("pk", fk)
+        updated = []
+        for _, group in groupby(
+            points.iterator(), key=lambda point: getattr(point, fk)
+        ):
+            for sequence, point in enumerate(group):
+                point.sequence = sequence
+                updated.append(point)
+        Point.objects.bulk_update(updated, ["sequence"], batch_size=5000)
+
+
+def measure_surveys(apps, schema_editor):
+    for survey_name, (point_name, fk) in SURVEYS.items():
+        Survey = apps.get_model("land", survey_name)
+        Point = apps.get_model("land", point_name)
+        rows = Point.objects.exclude(**{fk: None}).order_by(fk, "sequence", "pk")
+        updated = []
+        for survey_id, group in groupby(
+            rows.values_list(fk, "latitude", "longitude").iterator(),
+            key=lambda row: row[0],
+        ):
+            group = list(group)
+            survey = Survey(pk=survey_id)
+            metrics = polygon_metrics(
+                [row[1] for row in group], [row[2] for row in group]
+            )
+            for name, value in metrics.items():
+                setattr(survey, name, value)
+            updated.append(survey)
+        Survey.objects.bulk_update(updated, GEOMETRY_FIELDS, batch_size=1000)
+
+
+def create_box_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for survey_name, index in BOX_INDEXES.items():
+        table = apps.get_model("land", survey_name)._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index}" ON "{table}" USING gist '
+            '(box(point("min_longitude", "min_latitude"), '
+            'point("max_longitude", "max_latitude")))'
+        )
+
+
+def drop_box_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for index in BOX_INDEXES.values():
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{index}"')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("land", "0002_alter_landtenementacquisition_rental_due_date_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="landtenementsurvey",
+            name="area_m2",
+            field=models.FloatField(
+                editable=False, null=True, verbose_name="Area (m²)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="landtenementsurvey",
+            name="centroid_latitude",
+            field=models.DecimalField(
+                decimal_places=6,
+                editable=False,
+                max_digits=9,
+                null=True,
+                verbose_name="Centroid Latitude",
+            ),
+        ),
+        migrations.AddField(
+            model_name="landtenementsurvey",
+            name="centroid_longitude",
+            field=models.DecimalField(
+                decimal_places=6,
+                editable=False,
+                max_digits=9,
+                null=True,
+                verbose_name="Centroid Longitude",
+            ),
+        ),
+        migrations.AddField(
+            model_name="landtenementsurvey",
+            name="max_latitude",
+            field=models.DecimalField(
+                decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="landtenementsurvey",
+            name="max_longitude",
+            field=models.DecimalField(
+                decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="landtenementsurvey",
+            name="min_latitude",
+            field=models.DecimalField(
+                decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="landtenementsurvey",
+            name="min_longitude",
+            field=models.DecimalField(
+                decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="landtenementsurvey",
+            name="perimeter_m",
+            field=models.FloatField(
+                editable=False, null=True, verbose_name="Perimeter (m)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="landtenementsurvey",
+            name="point_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Points"
+            ),
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurvey",
+            name="area_m2",
+            field=models.FloatField(
+                editable=False, null=True, verbose_name="Area (m²)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurvey",
+            name="centroid_latitude",
+            field=models.DecimalField(
+                decimal_places=6,
+                editable=False,
+                max_digits=9,
+                null=True,
+                verbose_name="Centroid Latitude",
+            ),
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurvey",
+            name="centroid_longitude",
+            field=models.DecimalField(
+                decimal_places=6,
+                editable=False,
+                max_digits=9,
+                null=True,
+                verbose_name="Centroid Longitude",
+            ),
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurvey",
+            name="max_latitude",
+            field=models.DecimalField(
+                decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurvey",
+            name="max_longitude",
+            field=models.DecimalField(
+                decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurvey",
+            name="min_latitude",
+            field=models.DecimalField(
+                decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurvey",
+            name="min_longitude",
+            field=models.DecimalField(
+                decimal_places=6, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurvey",
+            name="perimeter_m",
+            field=models.FloatField(
+                editable=False, null=True, verbose_name="Perimeter (m)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurvey",
+            name="point_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Points"
+            ),
+        ),
+        migrations.AddField(
+            model_name="landtenementsurveypoint",
+            name="sequence",
+            field=models.PositiveIntegerField(
+                blank=True,
+                default=0,
+                help_text="Position of the point along the boundary. Leave blank to add it after the last point.",
+                verbose_name="Sequence",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="miningtenementsurveypoint",
+            name="sequence",
+            field=models.PositiveIntegerField(
+                blank=True,
+                default=0,
+                help_text="Position of the point along the boundary. Leave blank to add it after the last point.",
+                verbose_name="Sequence",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterModelOptions(
+            name="landtenementsurveypoint",
+            options={
+                "ordering": ["land_tenement_survey", "sequence", "pk"],
+                "verbose_name": "Land Tenement Survey Point",
+                "verbose_name_plural": "Land Tenement Survey Points",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="miningtenementsurveypoint",
+            options={
+                "ordering": ["mining_tenement_survey", "sequence", "pk"],
+                "verbose_name": "Mining Tenement Survey Point",
+                "verbose_name_plural": "Mining Tenement Survey Points",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="landtenementsurvey",
+            index=models.Index(
+                fields=[
+                    "min_latitude",
+                    "max_latitude",
+                    "min_longitude",
+                    "max_longitude",
+                ],
+                name="land_survey_bbox_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="miningtenementsurvey",
+            index=models.Index(
+                fields=[
+                    "min_latitude",
+                    "max_latitude",
+                    "min_longitude",
+                    "max_longitude",
+                ],
+                name="mining_survey_bbox_idx",
+            ),
+        ),
+        migrations.RunPython(number_points, migrations.RunPython.noop),
+        migrations.RunPython(measure_surveys, migrations.RunPython.noop),
+        migrations.RunPython(create_box_indexes, drop_box_indexes),
+    ]
@@ -0,0 +1,310 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:20
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+from apps.land.geometry import GEOMETRY_FIELDS
+
+TENEMENTS = {
+    # tenement model: (kind, acquisition model, its foreign key,
+    #                  survey model, its foreign key)
+    "LandTenement": (
+        "Land",
+        "LandTenementAcquisition",
+        "land_tenement_id",
+        "LandTenementSurvey",
+        "land_tenement_id",
+    ),
+    "MiningTenement": (
+        "Mining",
+        "MiningTenementAcquisition",
+        "mining_tenement_id",
+        "MiningTenementSurvey",
+        "mininig_tenement_id",
+    ),
+}
+
+# PostgreSQL-only indexes: the GiST box index used by intersecting(), as on
+# the surveys, and a trigram index for portfolio-wide title search.
+PG_INDEXES = {
+    "portfolio_box_gist": "USING gist (box(point(min_longitude, min_latitude), "
+    "point(max_longitude, max_latitude)))",
+    "portfolio_title_trgm": "USING gin (title gin_trgm_ops)",
+    "portfolio_land_name_trgm": "USING gin (land_name gin_trgm_ops)",
+}
+
+
+def populate(apps, schema_editor):
+    PortfolioTenement = apps.get_model("land", "PortfolioTenement")
+    for tenement_name, (
+        kind,
+        acquisition,
+        acquisition_fk,
+        survey,
+        survey_fk,
+    ) in TENEMENTS.items():
+        acquisitions = {
+            getattr(row, acquisition_fk): row
+            for row in apps.get_model("land", acquisition).objects.exclude(
+                **{acquisition_fk: None}
+            )
+        }
+        # Ascending, so the latest survey of each tenement is kept.
+        surveys = {
+            getattr(row, survey_fk): row
+            for row in apps.get_model("land", survey)
+            .objects.exclude(**{survey_fk: None})
+            .order_by("survey_date", "pk")
+        }
+        rows = []
+        for tenement in apps.get_model("land", tenement_name).objects.all():
+            terms = acquisitions.get(tenement.pk)
+            current = surveys.get(tenement.pk)
+            rows.append(
+                PortfolioTenement(
+                    kind=kind,
+                    tenement_id=tenement.pk,
+                    title=tenement.title,
+                    land_name=tenement.land_name,
+                    type_of_tenement=tenement.type_of_tenement,
+                    province_id=tenement.province_id,
+                    district_id=tenement.district_id,
+                    llg_id=tenement.llg_id,
+                    lease_holder_id=tenement.lease_holder_id,
+                    rental_amount=terms and terms.rental_amount,
+                    rental_due_date=terms and terms.rental_due_date,
+                    survey_id=current and current.pk,
+                    survey_date=current and current.survey_date,
+                    **(
+                        {name: getattr(current, name) for name in GEOMETRY_FIELDS}
+                        if current
+                        else {}
+                    ),
+                )
+            )
+        PortfolioTenement.objects.bulk_create(rows, batch_size=1000)
+
+
+def create_pg_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("land", "PortfolioTenement")._meta.db_table
+    for name, method in PG_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" {method}'
+        )
+
+
+def drop_pg_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in PG_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0002_alter_bank_bank_initials_alter_bank_bank_name"),
+        ("land", "0003_survey_geometry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PortfolioTenement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "point_count",
+                    models.PositiveIntegerField(
+                        default=0, editable=False, verbose_name="Points"
+                    ),
+                ),
+                (
+                    "area_m2",
+                    models.FloatField(
+                        editable=False, null=True, verbose_name="Area (m²)"
+                    ),
+                ),
+                (
+                    "perimeter_m",
+                    models.FloatField(
+                        editable=False, null=True, verbose_name="Perimeter (m)"
+                    ),
+                ),
+                (
+                    "centroid_latitude",
+                    models.DecimalField(
+                        decimal_places=6,
+                        editable=False,
+                        max_digits=9,
+                        null=True,
+                        verbose_name="Centroid Latitude",
+                    ),
+                ),
+                (
+                    "centroid_longitude",
+                    models.DecimalField(
+                        decimal_places=6,
+                        editable=False,
+                        max_digits=9,
+                        null=True,
+                        verbose_name="Centroid Longitude",
+                    ),
+                ),
+                (
+                    "min_latitude",
+                    models.DecimalField(
+                        decimal_places=6, editable=False, max_digits=9, null=True
+                    ),
+                ),
+                (
+                    "min_longitude",
+                    models.DecimalField(
+                        decimal_places=6, editable=False, max_digits=9, null=True
+                    ),
+                ),
+                (
+                    "max_latitude",
+                    models.DecimalField(
+                        decimal_places=6, editable=False, max_digits=9, null=True
+                    ),
+                ),
+                (
+                    "max_longitude",
+                    models.DecimalField(
+                        decimal_places=6, editable=False, max_digits=9, null=True
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("Land", "Land"), ("Mining", "Mining")],
+                        max_length=10,
+                        verbose_name="Kind",
+                    ),
+                ),
+                ("tenement_id", models.PositiveIntegerField(verbose_name="Tenement")),
+                ("title", models.CharField(max_length=255, verbose_name="Title")),
+                (
+                    "land_name",
+                    models.CharField(max_length=255, verbose_name="Land Name"),
+                ),
+                (
+                    "type_of_tenement",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Type of Tenement"
+                    ),
+                ),
+                (
+                    "rental_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=15,
+                        null=True,
+                        verbose_name="Rental Amount (PGK)",
+                    ),
+                ),
+                (
+                    "rental_due_date",
+                    models.DateField(null=True, verbose_name="Rental Due Date"),
+                ),
+                (
+                    "survey_id",
+                    models.PositiveIntegerField(
+                        null=True, verbose_name="Current Survey"
+                    ),
+                ),
+                (
+                    "survey_date",
+                    models.DateField(null=True, verbose_name="Survey Date"),
+                ),
+                (
+                    "district",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="main.district",
+                        verbose_name="District",
+                    ),
+                ),
+                (
+                    "lease_holder",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="main.company",
+                        verbose_name="Lease Holder",
+                    ),
+                ),
+                (
+                    "llg",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="main.locallevelgovernment",
+                        verbose_name="LLG",
+                    ),
+                ),
+                (
+                    "province",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="main.province",
+                        verbose_name="Province",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Portfolio Tenement",
+                "verbose_name_plural": "Portfolio",
+                "ordering": ["title"],
+                "indexes": [
+                    models.Index(
+                        fields=[
+                            "kind",
+                            "province",
+                            "district",
+                            "llg",
+                            "type_of_tenement",
+                        ],
+                        name="portfolio_location_idx",
+                    ),
+                    models.Index(
+                        fields=["rental_due_date", "kind"], name="portfolio_due_idx"
+                    ),
+                    models.Index(
+                        fields=["lease_holder", "kind"], name="portfolio_holder_idx"
+                    ),
+                    models.Index(fields=["title"], name="portfolio_title_idx"),
+                    models.Index(
+                        fields=[
+                            "min_latitude",
+                            "max_latitude",
+                            "min_longitude",
+                            "max_longitude",
+                        ],
+                        name="portfolio_bbox_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="portfoliotenement",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "tenement_id"), name="portfolio_tenement_unique"
+            ),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+        TrigramExtension(),
+        migrations.RunPython(create_pg_indexes, drop_pg_indexes),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
-from datetime import datetime
+from django.db import connections, models
+from django.db.models import F
+from datetime import date, timedelta
 from apps.main.models import (
     Tribe,
     Clan,
@@ -39,7 +40,7 @@ class BaseLand(models.Model):
     images = models.FileField("Images", upload_to="lands/images/", blank=True)
 
     def __str__(self):
-        return self.name
+        return self.land_name
 
     class Meta:
         abstract = True
@@ -58,6 +59,32 @@ class LandOwners(models.Model):
         ordering = ["name"]
 
 
+class RentalDueQuerySet(models.QuerySet):
+    def with_rental_due(self):
+        # Joins the acquisition once so the due date can be sorted and filtered on.
+        return self.annotate(
+            rental_due_date=F(f"{self.model.acquisition_related_name}__rental_due_date")
+        )
+
+    def overdue(self, today=None):
+        return self.with_rental_due().filter(rental_due_date__lt=today or date.today())
+
+    def due_within(self, days, today=None):
+        today = today or date.today()
+        return self.with_rental_due().filter(
+            rental_due_date__gte=today,
+            rental_due_date__lte=today + timedelta(days=days),
+        )
+
+
+class TenementQuerySet(RentalDueQuerySet):
+    def intersecting(self, south, west, north, east):
+        # Tenements with a survey whose bounding box overlaps the given one.
+        relation = self.model._meta.get_field(self.model.survey_related_name)
+        surveys = relation.related_model.objects.intersecting(south, west, north, east)
+        return self.filter(pk__in=surveys.values(relation.field.attname))
+
+
 class BaseTenement(models.Model):
     title = models.CharField("Title", max_length=255)
     lease_holder = models.ForeignKey(
@@ -94,6 +121,18 @@ class BaseTenement(models.Model):
         blank=True,
     )
 
+    objects = TenementQuerySet.as_manager()
+
+    @property
+    def days_until_rental_due(self):
+        # Querysets from with_rental_due() already carry the date.
+        if not hasattr(self, "rental_due_date"):
+            acquisition = getattr(self, self.acquisition_related_name, None)
+            self.rental_due_date = acquisition and acquisition.rental_due_date
+        if self.rental_due_date is None:
+            return None
+        return (self.rental_due_date - date.today()).days
+
     class Meta:
         abstract = True
 
@@ -112,20 +151,10 @@ class LandTenement(BaseLand, BaseTenement):
         ],
     )
 
-    @property
-    def days_until_rental_due(self):
-        if hasattr(
-            self,
-            "land_tenement_acquisition_by_land_tenement"
-            and self.land_tenement_acquisition_by_land_tenement.rental_due_date,
-        ):
-            rental_due = (
-                self.land_tenement_acquisition_by_land_tenement.rental_due_date
-                - datetime.date(datetime.now())
-            )
-            return rental_due
-
-        return None
+    acquisition_related_name = "land_tenement_acquisition_by_land_tenement"
+    survey_related_name = "land_tenement_surveys_by_land_tenement"
+    rental_related_name = "land_tenement_rentals_by_land_tenement"
+    portfolio_kind = "Land"
 
     class Meta:
         verbose_name = "Land Tenement"
@@ -164,7 +193,7 @@ class LandTenementAcquisition(models.Model):
         blank=True,
         help_text="Rental amount in PNG kina",
     )
-    rental_due_date = models.DateField("Rental Due Date", blank=True)
+    rental_due_date = models.DateField("Rental Due Date", blank=True, db_index=True)
     notes = models.TextField("Notes", blank=True)
 
     def __str__(self):
@@ -225,7 +254,85 @@ class LandTenementRental(models.Model):
         ]
 
 
-class LandTenementSurvey(models.Model):
+class SurveyQuerySet(models.QuerySet):
+    def intersecting(self, south, west, north, east):
+        """
+        Surveys whose bounding box overlaps the given one. On PostgreSQL the
+        test is written as a ``box && box`` so the GiST index on the boxes
+        serves it.
+        """
+        if connections[self.db].vendor == "postgresql":
+            table = self.model._meta.db_table
+            return self.extra(
+                where=[
+                    f'box(point("{table}"."min_longitude", "{table}"."min_latitude"), '
+                    f'point("{table}"."max_longitude", "{table}"."max_latitude")) '
+                    "&& box(point(%s, %s), point(%s, %s))"
+                ],
+                params=[west, south, east, north],
+            )
+        return self.filter(
+            min_latitude__lte=north,
+            max_latitude__gte=south,
+            min_longitude__lte=east,
+            max_longitude__gte=west,
+        )
+
+
+class SurveyGeometry(models.Model):
+    # Derived from the survey's points by apps.land.geometry; never edited.
+    point_count = models.PositiveIntegerField("Points", default=0, editable=False)
+    area_m2 = models.FloatField("Area (m²)", null=True, editable=False)
+    perimeter_m = models.FloatField("Perimeter (m)", null=True, editable=False)
+    centroid_latitude = models.DecimalField(
+        "Centroid Latitude", max_digits=9, decimal_places=6, null=True, editable=False
+    )
+    centroid_longitude = models.DecimalField(
+        "Centroid Longitude", max_digits=9, decimal_places=6, null=True, editable=False
+    )
+    min_latitude = models.DecimalField(
+        max_digits=9, decimal_places=6, null=True, editable=False
+    )
+    min_longitude = models.DecimalField(
+        max_digits=9, decimal_places=6, null=True, editable=False
+    )
+    max_latitude = models.DecimalField(
+        max_digits=9, decimal_places=6, null=True, editable=False
+    )
+    max_longitude = models.DecimalField(
+        max_digits=9, decimal_places=6, null=True, editable=False
+    )
+
+    objects = SurveyQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+
+class BaseSurveyPoint(models.Model):
+    sequence = models.PositiveIntegerField(
+        "Sequence",
+        blank=True,
+        help_text="Position of the point along the boundary. Leave blank to "
+        "add it after the last point.",
+    )
+
+    def save(self, *args, **kwargs):
+        if self.sequence is None:
+            survey = self._meta.get_field(self.survey_field).attname
+            last = (
+                type(self)
+                .objects.filter(**{survey: getattr(self, survey)})
+                .aggregate(last=models.Max("sequence"))["last"]
+            )
+            self.sequence = 0 if last is None else last + 1
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class LandTenementSurvey(SurveyGeometry):
     land_tenement = models.ForeignKey(
         LandTenement,
         on_delete=models.SET_NULL,
@@ -236,13 +343,26 @@ class LandTenementSurvey(models.Model):
     survey_date = models.DateField("Survey Date", blank=True)
     surveyor_name = models.CharField("Surveyor Name", max_length=255)
 
+    points_related_name = "land_tenemenet_survey_points_by_land_tenement_survey"
+
     class Meta:
         verbose_name = "Land Tenement Survey"
         verbose_name_plural = "Land Tenement Surveys"
         ordering = ["-survey_date"]
+        indexes = [
+            models.Index(
+                fields=[
+                    "min_latitude",
+                    "max_latitude",
+                    "min_longitude",
+                    "max_longitude",
+                ],
+                name="land_survey_bbox_idx",
+            )
+        ]
 
 
-class LandTenementSurveyPoint(models.Model):
+class LandTenementSurveyPoint(BaseSurveyPoint):
     land_tenement_survey = models.ForeignKey(
         LandTenementSurvey,
         on_delete=models.SET_NULL,
@@ -257,9 +377,12 @@ class LandTenementSurveyPoint(models.Model):
         "Longitude", blank=True, max_digits=9, decimal_places=6
     )
 
+    survey_field = "land_tenement_survey"
+
     class Meta:
         verbose_name = "Land Tenement Survey Point"
         verbose_name_plural = "Land Tenement Survey Points"
+        ordering = ["land_tenement_survey", "sequence", "pk"]
 
 
 class MiningTenement(BaseLand, BaseTenement):
@@ -278,19 +401,10 @@ class MiningTenement(BaseLand, BaseTenement):
         ],
     )
 
-    @property
-    def days_until_rental_due(self):
-        if hasattr(
-            self,
-            "mining_tenement_acquisition_by_mining_tenement"
-            and self.mining_tenement_acquisition_by_mining_tenement.rental_due_date,
-        ):
-            rental_due = (
-                self.mining_tenement_acquisition_by_mining_tenement.rental_due_date
-                - datetime.date(datetime.now())
-            )
-            return rental_due
-        return None
+    acquisition_related_name = "mining_tenement_acquisition_by_mining_tenement"
+    survey_related_name = "mining_tenement_surveys_by_mining_tenement"
+    rental_related_name = "mining_tenement_rentals_by_mining_tenement"
+    portfolio_kind = "Mining"
 
     class Meta:
         verbose_name = "Mining Tenement"
@@ -329,7 +443,7 @@ class MiningTenementAcquisition(models.Model):
         blank=True,
         help_text="Rental amount in PNG kina",
     )
-    rental_due_date = models.DateField("Rental Due Date", blank=True)
+    rental_due_date = models.DateField("Rental Due Date", blank=True, db_index=True)
     notes = models.TextField("Notes", blank=True)
 
     def __str__(self):
@@ -390,7 +504,7 @@ class MiningTenementRental(models.Model):
         ]
 
 
-class MiningTenementSurvey(models.Model):
+class MiningTenementSurvey(SurveyGeometry):
     mininig_tenement = models.ForeignKey(
         MiningTenement,
         on_delete=models.SET_NULL,
@@ -401,13 +515,26 @@ class MiningTenementSurvey(models.Model):
     survey_date = models.DateField("Survey Date", blank=True)
     surveyor_name = models.CharField("Surveyor Name", max_length=255)
 
+    points_related_name = "mining_tenemenet_survey_points_by_mining_tenement_survey"
+
     class Meta:
         verbose_name = "Mining Tenement Survey"
         verbose_name_plural = "Mining Tenement Surveys"
         ordering = ["-survey_date"]
+        indexes = [
+            models.Index(
+                fields=[
+                    "min_latitude",
+                    "max_latitude",
+                    "min_longitude",
+                    "max_longitude",
+                ],
+                name="mining_survey_bbox_idx",
+            )
+        ]
 
 
-class MiningTenementSurveyPoint(models.Model):
+class MiningTenementSurveyPoint(BaseSurveyPoint):
     mining_tenement_survey = models.ForeignKey(
         MiningTenementSurvey,
         on_delete=models.SET_NULL,
@@ -422,6 +549,92 @@ class MiningTenementSurveyPoint(models.Model):
         "Longitude", blank=True, max_digits=9, decimal_places=6
     )
 
+    survey_field = "mining_tenement_survey"
+
     class Meta:
         verbose_name = "Mining Tenement Survey Point"
         verbose_name_plural = "Mining Tenement Survey Points"
+        ordering = ["mining_tenement_survey", "sequence", "pk"]
+
+
+class PortfolioQuerySet(SurveyQuerySet):
+    def overdue(self, today=None):
+        return self.filter(rental_due_date__lt=today or date.today())
+
+    def due_within(self, days, today=None):
+        today = today or date.today()
+        return self.filter(
+            rental_due_date__gte=today,
+            rental_due_date__lte=today + timedelta(days=days),
+        )
+
+
+class PortfolioTenement(SurveyGeometry):
+    """
+    One row per land or mining tenement, with its acquisition's rental terms
+    and its current survey's geometry, so portfolio-wide searches, maps and
+    rental reports are a single indexed query. Maintained by
+    apps.land.portfolio; never edited.
+    """
+
+    kind = models.CharField(
+        "Kind", max_length=10, choices=[("Land", "Land"), ("Mining", "Mining")]
+    )
+    tenement_id = models.PositiveIntegerField("Tenement")
+    title = models.CharField("Title", max_length=255)
+    land_name = models.CharField("Land Name", max_length=255)
+    type_of_tenement = models.CharField("Type of Tenement", blank=True, max_length=255)
+    province = models.ForeignKey(
+        Province, on_delete=models.CASCADE, related_name="+", verbose_name="Province"
+    )
+    district = models.ForeignKey(
+        District, on_delete=models.CASCADE, related_name="+", verbose_name="District"
+    )
+    llg = models.ForeignKey(
+        LocalLevelGovernment,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="LLG",
+    )
+    lease_holder = models.ForeignKey(
+        Company, on_delete=models.CASCADE, related_name="+", verbose_name="Lease Holder"
+    )
+    rental_amount = models.DecimalField(
+        "Rental Amount (PGK)", max_digits=15, decimal_places=2, null=True
+    )
+    rental_due_date = models.DateField("Rental Due Date", null=True)
+    survey_id = models.PositiveIntegerField("Current Survey", null=True)
+    survey_date = models.DateField("Survey Date", null=True)
+
+    objects = PortfolioQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.kind} tenement {self.title}"
+
+    class Meta:
+        verbose_name = "Portfolio Tenement"
+        verbose_name_plural = "Portfolio"
+        ordering = ["title"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "tenement_id"], name="portfolio_tenement_unique"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["kind", "province", "district", "llg", "type_of_tenement"],
+                name="portfolio_location_idx",
+            ),
+            models.Index(fields=["rental_due_date", "kind"], name="portfolio_due_idx"),
+            models.Index(fields=["lease_holder", "kind"], name="portfolio_holder_idx"),
+            models.Index(fields=["title"], name="portfolio_title_idx"),
+            models.Index(
+                fields=[
+                    "min_latitude",
+                    "max_latitude",
+                    "min_longitude",
+                    "max_longitude",
+                ],
+                name="portfolio_bbox_idx",
+            ),
+        ]
@@ -0,0 +1,86 @@
+import hashlib
+
+from django.core.cache import cache
+
+from apps.main.cache import CACHE_TIMEOUT
+from .geometry import MAX_ZOOM, simplify_ring, survey_points
+from .models import LandTenementSurvey, MiningTenementSurvey, PortfolioTenement
+
+# Map parameter: portfolio kind.
+KINDS = {"land": "Land", "mining": "Mining"}
+SURVEY_MODELS = {"Land": LandTenementSurvey, "Mining": MiningTenementSurvey}
+
+
+def _cache_key(tenement, zoom):
+    # The cached measurements change whenever a point is added, moved,
+    # removed or renumbered, so keying on them retires stale outlines without
+    # having to delete every zoom level of a survey.
+    shape = (
+        f"{tenement['point_count']}:{tenement['area_m2']!r}:"
+        f"{tenement['perimeter_m']!r}"
+    )
+    return (
+        f"crs:outline:{SURVEY_MODELS[tenement['kind']]._meta.label_lower}:"
+        f"{tenement['survey_id']}:{zoom}:"
+        f"{hashlib.md5(shape.encode()).hexdigest()[:12]}"
+    )
+
+
+def outline_features(kinds, south, west, north, east, zoom):
+    """
+    GeoJSON features for the tenements of ``kinds`` whose current outline
+    overlaps the box, simplified for ``zoom``. The tenements come from one
+    bounding-box query on the portfolio. Simplified rings are cached per
+    survey and zoom, so panning only reads and simplifies what is new.
+    """
+    zoom = max(0, min(MAX_ZOOM, zoom))
+    tenements = list(
+        PortfolioTenement.objects.intersecting(south, west, north, east)
+        .filter(kind__in=kinds, point_count__gte=3)
+        .order_by()
+        .values(
+            "kind",
+            "tenement_id",
+            "title",
+            "survey_id",
+            "survey_date",
+            "point_count",
+            "area_m2",
+            "perimeter_m",
+        )
+    )
+    if not tenements:
+        return []
+
+    keys = [_cache_key(tenement, zoom) for tenement in tenements]
+    rings = cache.get_many(keys)
+    missing = {}
+    for tenement, key in zip(tenements, keys):
+        if key not in rings:
+            missing.setdefault(tenement["kind"], {})[tenement["survey_id"]] = key
+    built = {}
+    for kind, surveys in missing.items():
+        outlines = survey_points(SURVEY_MODELS[kind], list(surveys))
+        for survey_id, (latitudes, longitudes) in outlines.items():
+            built[surveys[survey_id]] = simplify_ring(latitudes, longitudes, zoom)
+    if built:
+        cache.set_many(built, CACHE_TIMEOUT)
+        rings.update(built)
+
+    return [
+        {
+            "type": "Feature",
+            "id": f"{tenement['kind'].lower()}-{tenement['tenement_id']}",
+            "geometry": {"type": "Polygon", "coordinates": [rings[key]]},
+            "properties": {
+                "kind": tenement["kind"].lower(),
+                "tenement": tenement["tenement_id"],
+                "title": tenement["title"],
+                "survey": tenement["survey_id"],
+                "survey_date": tenement["survey_date"],
+                "area_m2": tenement["area_m2"],
+            },
+        }
+        for tenement, key in zip(tenements, keys)
+        if key in rings
+    ]
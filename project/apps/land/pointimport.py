@@ -0,0 +1,189 @@
+import csv
+import io
+import math
+from decimal import Decimal
+from xml.etree.ElementTree import ParseError, iterparse
+
+from django.db import transaction
+from django.db.models import Max
+
+from .geometry import refresh_geometry
+from .portfolio import sync_surveys
+from .signals import remeasure_suspended
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+FORMATS = ("csv", "gpx", "kml")
+LATITUDE_COLUMNS = ("latitude", "lat", "y")
+LONGITUDE_COLUMNS = ("longitude", "lon", "lng", "long", "x")
+GPX_POINTS = ("trkpt", "rtept", "wpt")
+
+
+class PointImportError(Exception):
+    pass
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _read_csv(file):
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    rows = csv.reader(file)
+    header = [value.strip().lower() for value in next(rows, ())]
+    try:
+        latitude = next(
+            header.index(name) for name in LATITUDE_COLUMNS if name in header
+        )
+        longitude = next(
+            header.index(name) for name in LONGITUDE_COLUMNS if name in header
+        )
+    except StopIteration:
+        raise PointImportError("The CSV needs latitude and longitude columns.")
+    for number, row in enumerate(rows, start=2):  # row 1 is the header
+        if any(value.strip() for value in row):
+            values = row + [""] * (max(latitude, longitude) + 1 - len(row))
+            yield f"Row {number}", values[latitude], values[longitude]
+
+
+def _read_gpx(file):
+    number = 0
+    for _, element in iterparse(file):
+        if _local_name(element.tag) in GPX_POINTS:
+            number += 1
+            yield f"Point {number}", element.get("lat", ""), element.get("lon", "")
+            element.clear()
+
+
+def _read_kml(file):
+    number = 0
+    for _, element in iterparse(file):
+        if _local_name(element.tag) == "coordinates":
+            # Whitespace separated longitude,latitude[,altitude] tuples.
+            for position in (element.text or "").split():
+                number += 1
+                longitude, _, rest = position.partition(",")
+                yield f"Point {number}", rest.partition(",")[0], longitude
+            element.clear()
+
+
+def read_points(file, filename):
+    """
+    Yield ``(position, latitude, longitude)`` text for each point of a CSV,
+    GPX or KML file, in file order. The file is parsed incrementally.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension not in FORMATS:
+        raise PointImportError(f"Upload a {', '.join(FORMATS)} file.")
+    reader = {"csv": _read_csv, "gpx": _read_gpx, "kml": _read_kml}[extension]
+    try:
+        yield from reader(file)
+    except (ParseError, csv.Error) as error:
+        raise PointImportError(f"Cannot read the {extension.upper()} file: {error}")
+    except UnicodeDecodeError as error:
+        raise PointImportError(
+            f"The {extension.upper()} file is not UTF-8 text ({error.reason} at "
+            f"byte {error.start})."
+        )
+
+
+def _float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
+
+
+def _out_of_range(latitudes, longitudes):
+    # Indexes of points outside WGS84 bounds; NaN fails every comparison.
+    if np is not None:
+        latitudes, longitudes = np.array(latitudes), np.array(longitudes)
+        valid = (
+            (latitudes >= -90)
+            & (latitudes <= 90)
+            & (longitudes >= -180)
+            & (longitudes <= 180)
+        )
+        return np.flatnonzero(~valid).tolist()
+    return [
+        i
+        for i, (latitude, longitude) in enumerate(zip(latitudes, longitudes))
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180)
+    ]
+
+
+class PointImporter:
+    """
+    Replace or extend the points of ``survey`` from a survey file.
+
+    The whole file is validated before anything is written, since a boundary
+    with a point missing is a different shape. Problems are reported in
+    ``errors`` as ``(position, message)``. Points are numbered in file order,
+    written with chunked ``bulk_create`` and the survey is measured once.
+    """
+
+    def __init__(self, survey, replace=False, batch_size=2000):
+        self.survey = survey
+        self.replace = replace
+        self.batch_size = batch_size
+        self.errors = []
+        self.created = 0
+
+    def run(self, points):
+        positions, latitudes, longitudes = [], [], []
+        for position, latitude, longitude in points:
+            positions.append(position)
+            latitudes.append(_float(latitude))
+            longitudes.append(_float(longitude))
+        for i in _out_of_range(latitudes, longitudes):
+            self.errors.append(
+                (positions[i], "Latitude must be within ±90 and longitude ±180.")
+            )
+        if not positions:
+            self.errors.append(("File", "No points found."))
+        if self.errors:
+            return self
+
+        # Closed rings (KML polygons, GPX tracks walked back to the start)
+        # repeat the first point; the survey outline closes itself.
+        if len(positions) > 3 and (latitudes[0], longitudes[0]) == (
+            latitudes[-1],
+            longitudes[-1],
+        ):
+            latitudes.pop()
+            longitudes.pop()
+        self.save(latitudes, longitudes)
+        return self
+
+    @transaction.atomic
+    def save(self, latitudes, longitudes):
+        survey_model = type(self.survey)
+        relation = survey_model._meta.get_field(survey_model.points_related_name)
+        point_model, fk = relation.related_model, relation.field.attname
+        existing = point_model.objects.filter(**{fk: self.survey.pk})
+        if self.replace:
+            with remeasure_suspended():
+                existing.delete()
+            start = 0
+        else:
+            last = existing.aggregate(last=Max("sequence"))["last"]
+            start = 0 if last is None else last + 1
+        point_model.objects.bulk_create(
+            (
+                point_model(
+                    **{fk: self.survey.pk},
+                    sequence=start + i,
+                    latitude=Decimal(f"{latitude:.6f}"),
+                    longitude=Decimal(f"{longitude:.6f}"),
+                )
+                for i, (latitude, longitude) in enumerate(zip(latitudes, longitudes))
+            ),
+            batch_size=self.batch_size,
+        )
+        self.created = len(latitudes)
+        refresh_geometry(survey_model, survey_model.objects.filter(pk=self.survey.pk))
+        sync_surveys(survey_model, [self.survey.pk])
@@ -0,0 +1,135 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from .geometry import GEOMETRY_FIELDS
+from .models import LandTenement, MiningTenement, PortfolioTenement
+
+TENEMENT_MODELS = (LandTenement, MiningTenement)
+
+PORTFOLIO_FIELDS = [
+    "title",
+    "land_name",
+    "type_of_tenement",
+    "province_id",
+    "district_id",
+    "llg_id",
+    "lease_holder_id",
+    "rental_amount",
+    "rental_due_date",
+    "survey_id",
+    "survey_date",
+    *GEOMETRY_FIELDS,
+]
+
+
+def tenement_field(model):
+    # The foreign key from an acquisition, rental or survey to its tenement.
+    return next(
+        field
+        for field in model._meta.concrete_fields
+        if field.is_relation and field.related_model in TENEMENT_MODELS
+    )
+
+
+def _portfolio_rows(tenement_model, pks=None):
+    acquisition = tenement_model.acquisition_related_name
+    surveys = tenement_model._meta.get_field(tenement_model.survey_related_name)
+    survey_model = surveys.related_model
+    # The current survey is the latest one.
+    latest = (
+        survey_model.objects.filter(**{surveys.field.name: OuterRef("pk")})
+        .order_by("-survey_date", "-pk")
+        .values("pk")[:1]
+    )
+    tenements = tenement_model.objects.all()
+    if pks is not None:
+        tenements = tenements.filter(pk__in=pks)
+    rows = list(
+        tenements.annotate(
+            rental_amount=F(f"{acquisition}__rental_amount"),
+            rental_due_date=F(f"{acquisition}__rental_due_date"),
+            survey_id=Subquery(latest),
+        )
+        .order_by()
+        .values(
+            "pk",
+            "title",
+            "land_name",
+            "type_of_tenement",
+            "province_id",
+            "district_id",
+            "llg_id",
+            "lease_holder_id",
+            "rental_amount",
+            "rental_due_date",
+            "survey_id",
+        )
+    )
+    geometry = {
+        survey["pk"]: survey
+        for survey in survey_model.objects.filter(
+            pk__in=[row["survey_id"] for row in rows if row["survey_id"]]
+        )
+        .order_by()
+        .values("pk", "survey_date", *GEOMETRY_FIELDS)
+    }
+    for row in rows:
+        survey = geometry.get(row["survey_id"], {"point_count": 0})
+        yield PortfolioTenement(
+            kind=tenement_model.portfolio_kind,
+            tenement_id=row.pop("pk"),
+            survey_date=survey.get("survey_date"),
+            **row,
+            **{name: survey.get(name) for name in GEOMETRY_FIELDS},
+        )
+
+
+@transaction.atomic
+def sync_portfolio(tenement_model, pks=None, batch_size=1000):
+    """
+    Bring the portfolio rows of ``tenement_model`` tenements ``pks`` (default
+    all) up to date: upserted in batches, and removed for tenements that no
+    longer exist. Returns the number of rows written.
+    """
+    kind = tenement_model.portfolio_kind
+    rows = list(_portfolio_rows(tenement_model, pks))
+    PortfolioTenement.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["kind", "tenement_id"],
+        update_fields=PORTFOLIO_FIELDS,
+    )
+    stale = PortfolioTenement.objects.filter(kind=kind)
+    if pks is not None:
+        stale = stale.filter(tenement_id__in=pks)
+    stale.exclude(tenement_id__in=tenement_model.objects.values("pk")).delete()
+    return len(rows)
+
+
+def refresh_portfolio():
+    return sum(sync_portfolio(model) for model in TENEMENT_MODELS)
+
+
+def sync_related(instance, previous_pk=None):
+    # After a change to a tenement's acquisition or survey, which may have
+    # belonged to the ``previous_pk`` tenement.
+    field = tenement_field(type(instance))
+    pks = {getattr(instance, field.attname), previous_pk} - {None}
+    if pks:
+        sync_portfolio(field.related_model, sorted(pks))
+
+
+def sync_surveys(survey_model, survey_ids):
+    # After the geometry of these surveys was measured again.
+    field = tenement_field(survey_model)
+    pks = list(
+        survey_model.objects.filter(
+            pk__in=survey_ids, **{f"{field.name}__isnull": False}
+        )
+        .order_by()
+        .values_list(field.attname, flat=True)
+        .distinct()
+    )
+    if pks:
+        sync_portfolio(field.related_model, pks)
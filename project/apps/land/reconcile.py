@@ -0,0 +1,310 @@
+import csv
+import io
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .ledger import invalidate_ledger
+from .models import LandTenementRental, MiningTenementRental
+
+FORMATS = ("csv", "ofx", "mt940")
+RENTAL_MODELS = {"Land": LandTenementRental, "Mining": MiningTenementRental}
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y%m%d")
+CSV_COLUMNS = {
+    "date": ("date", "transaction_date", "value_date", "posted"),
+    "amount": ("amount", "credit_amount"),
+    "credit": ("credit", "credits", "deposit"),
+    "debit": ("debit", "debits", "withdrawal"),
+    "reference": ("reference", "ref", "receipt", "receipt_number", "cheque"),
+    "description": ("description", "details", "narrative", "memo", "particulars"),
+}
+EXCEPTION_COLUMNS = ("position", "date", "amount", "reference", "reason")
+
+StatementLine = namedtuple(
+    "StatementLine", "position date amount reference description"
+)
+Rental = namedtuple("Rental", "kind pk receipt amount payment_date")
+
+
+class StatementError(Exception):
+    pass
+
+
+def _date(value):
+    value = (value or "").strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _amount(value):
+    try:
+        return Decimal(value.strip().replace(",", "")).quantize(Decimal("0.01"))
+    except (InvalidOperation, AttributeError):
+        return None
+
+
+def _text(file):
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        yield from file
+    except UnicodeDecodeError as error:
+        raise StatementError(
+            f"The statement is not UTF-8 text ({error.reason} at byte "
+            f"{error.start})."
+        )
+
+
+def _read_csv(file):
+    rows = csv.reader(_text(file))
+    header = [value.strip().lower().replace(" ", "_") for value in next(rows, ())]
+    columns = {
+        name: next((header.index(alias) for alias in aliases if alias in header), None)
+        for name, aliases in CSV_COLUMNS.items()
+    }
+    if columns["date"] is None or (
+        columns["amount"] is None and columns["credit"] is None
+    ):
+        raise StatementError(
+            "The CSV needs a date column and an amount or credit column."
+        )
+
+    def cell(row, name):
+        index = columns[name]
+        return row[index].strip() if index is not None and index < len(row) else ""
+
+    for number, row in enumerate(rows, start=2):  # row 1 is the header
+        if not any(value.strip() for value in row):
+            continue
+        if columns["amount"] is not None:
+            amount = _amount(cell(row, "amount"))
+        elif cell(row, "credit"):
+            amount = _amount(cell(row, "credit"))
+        else:
+            debit = _amount(cell(row, "debit") or "0")
+            amount = None if debit is None else -debit
+        yield StatementLine(
+            f"Row {number}",
+            _date(cell(row, "date")),
+            amount,
+            cell(row, "reference"),
+            cell(row, "description"),
+        )
+
+
+OFX_TAG = re.compile(r"<(/?)(\w+)>([^<\r\n]*)")
+
+
+def _read_ofx(file):
+    # OFX 1.x is SGML without closing tags on values and 2.x is XML; reading
+    # tag by tag line by line handles both without loading the file.
+    number, transaction_values = 0, None
+    for line in _text(file):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if transaction_values is not None:
+                    number += 1
+                    yield _ofx_line(number, transaction_values)
+                transaction_values = None if closing else {}
+            elif transaction_values is not None and not closing:
+                transaction_values[tag] = value.strip()
+    if transaction_values is not None:
+        yield _ofx_line(number + 1, transaction_values)
+
+
+def _ofx_line(number, values):
+    return StatementLine(
+        f"Transaction {number}",
+        _date(values.get("DTPOSTED", "")[:8]),
+        _amount(values.get("TRNAMT", "")),
+        values.get("REFNUM") or values.get("CHECKNUM") or values.get("FITID", ""),
+        " ".join(filter(None, (values.get("NAME"), values.get("MEMO")))),
+    )
+
+
+MT940_LINE = re.compile(
+    r":61:(?P<date>\d{6})(?:\d{4})?(?P<mark>R?[CD])[A-Z]?(?P<amount>[\d,]+)"
+    r"[A-Z]\w{3}(?P<reference>[^/\r\n]*)"
+)
+
+
+def _read_mt940(file):
+    number, line, details = 0, None, []
+    for text in _text(file):
+        text = text.rstrip("\r\n")
+        tag = text[:4]
+        if tag.startswith(":") and tag != ":86:" and line is not None:
+            yield line._replace(description=" ".join(details))
+            line, details = None, []
+        if tag == ":61:":
+            number += 1
+            match = MT940_LINE.match(text)
+            if match is None:
+                line = StatementLine(f"Line {number}", None, None, "", "")
+                continue
+            amount = _amount(match["amount"].replace(",", "."))
+            if amount is not None and match["mark"] in ("D", "RC"):
+                amount = -amount
+            line = StatementLine(
+                f"Line {number}",
+                _date("20" + match["date"]),
+                amount,
+                match["reference"].strip(),
+                "",
+            )
+        elif line is not None and (tag == ":86:" or not tag.startswith(":")):
+            details.append(text[4:] if tag == ":86:" else text)
+    if line is not None:
+        yield line._replace(description=" ".join(details))
+
+
+def read_statement(file, filename):
+    """
+    Yield a ``StatementLine`` per transaction of a CSV, OFX or MT940 bank
+    statement, in file order, reading the file incrementally. Credits are
+    positive; unreadable dates or amounts come through as ``None``.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension in ("sta", "mt940", "940"):
+        return _read_mt940(file)
+    if extension in ("ofx", "qfx"):
+        return _read_ofx(file)
+    if extension == "csv":
+        return _read_csv(file)
+    raise StatementError(f"Upload a {', '.join(FORMATS)} statement.")
+
+
+def _normalise(reference):
+    return re.sub(r"[^0-9A-Z]", "", (reference or "").upper())
+
+
+def _references(line):
+    # The receipt number may be the reference or anywhere in the narrative.
+    words = re.split(r"[\s,;:/]+", f"{line.reference} {line.description}")
+    return {_normalise(line.reference)} | {_normalise(word) for word in words}
+
+
+class RentalReconciler:
+    """
+    Match bank statement credits to pending land and mining rentals.
+
+    Lines are first hash-joined to rentals on (receipt number, amount); a
+    line whose receipt number matches a rental of another amount is held
+    back for review. What is left is matched on amount to the only pending
+    rental whose payment date is within ``window_days``. Matched rentals are
+    marked Completed with one UPDATE per model (chunked by ``batch_size``)
+    and everything else lands in ``exceptions`` as ``(position, date,
+    amount, reference, reason)``.
+    """
+
+    def __init__(self, window_days=7, dry_run=False, batch_size=900):
+        self.window = timedelta(days=window_days)
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.exceptions = []
+        self.matched = {"receipt": 0, "date window": 0}
+        self.skipped = 0
+        self.completed = defaultdict(list)
+
+    def pending_rentals(self):
+        for kind, model in RENTAL_MODELS.items():
+            rows = (
+                model.objects.filter(payment_status="Pending")
+                .order_by()
+                .values_list("pk", "receipt_number", "amount_paid", "payment_date")
+            )
+            for pk, receipt, amount, payment_date in rows.iterator():
+                yield Rental(kind, pk, _normalise(receipt), amount, payment_date)
+
+    def run(self, lines):
+        by_receipt, by_amount = defaultdict(list), defaultdict(list)
+        for rental in self.pending_rentals():
+            if rental.receipt:
+                by_receipt[rental.receipt].append(rental)
+            by_amount[rental.amount].append(rental)
+        dates = {}
+        for amount, rentals in by_amount.items():
+            rentals.sort(key=lambda rental: rental.payment_date)
+            dates[amount] = [rental.payment_date for rental in rentals]
+        used = set()
+
+        unmatched = []
+        for line in lines:
+            if line.date is None or line.amount is None:
+                self.exception(line, "Unreadable date or amount")
+                continue
+            if line.amount <= 0:
+                self.skipped += 1
+                continue
+            candidates = [
+                rental
+                for reference in _references(line)
+                for rental in by_receipt.get(reference, ())
+                if (rental.kind, rental.pk) not in used
+            ]
+            exact = [rental for rental in candidates if rental.amount == line.amount]
+            if exact:
+                self.complete(exact[0], "receipt", used)
+            elif candidates:
+                rental = candidates[0]
+                self.exception(
+                    line,
+                    f"Receipt matches {rental.kind.lower()} rental {rental.pk} "
+                    f"of {rental.amount}",
+                )
+            else:
+                unmatched.append(line)
+
+        for line in unmatched:
+            rentals = by_amount.get(line.amount, [])
+            paid = dates.get(line.amount, [])
+            start = bisect_left(paid, line.date - self.window)
+            end = bisect_right(paid, line.date + self.window)
+            window = [
+                rental
+                for rental in rentals[start:end]
+                if (rental.kind, rental.pk) not in used
+            ]
+            if len(window) == 1:
+                self.complete(window[0], "date window", used)
+            elif window:
+                self.exception(
+                    line, f"{len(window)} pending rentals of this amount in the window"
+                )
+            else:
+                self.exception(line, "No pending rental matches")
+
+        if not self.dry_run:
+            self.save()
+        return self
+
+    def complete(self, rental, how, used):
+        used.add((rental.kind, rental.pk))
+        self.completed[rental.kind].append(rental.pk)
+        self.matched[how] += 1
+
+    def exception(self, line, reason):
+        self.exceptions.append(
+            (line.position, line.date, line.amount, line.reference, reason)
+        )
+
+    @transaction.atomic
+    def save(self):
+        for kind, pks in self.completed.items():
+            model = RENTAL_MODELS[kind]
+            for start in range(0, len(pks), self.batch_size):
+                model.objects.filter(
+                    pk__in=pks[start : start + self.batch_size]
+                ).update(payment_status="Completed")
+        # update() sends no signals.
+        if self.completed:
+            invalidate_ledger()
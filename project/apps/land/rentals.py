@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+from django.db.models import Count, F, Sum
+
+from .models import PortfolioTenement
+
+DUE_COLUMNS = (
+    "kind",
+    "tenement_id",
+    "title",
+    "land_name",
+    "lease_holder_name",
+    "rental_amount",
+    "rental_due_date",
+)
+
+
+def upcoming_rental_dues(days=30, today=None):
+    """
+    Every land and mining tenement that is overdue or falls due within
+    ``days``, as ``DUE_COLUMNS`` tuples ordered by due date, read from the
+    portfolio in one query on its due date index.
+    """
+    until = (today or date.today()) + timedelta(days=days)
+    return (
+        PortfolioTenement.objects.filter(rental_due_date__lte=until)
+        .annotate(lease_holder_name=F("lease_holder__name"))
+        .values_list(*DUE_COLUMNS)
+        .order_by("rental_due_date", "title")
+    )
+
+
+def overdue_rental_totals(today=None):
+    # (kind, tenements, rental amount) for overdue land and mining tenements.
+    return list(
+        PortfolioTenement.objects.overdue(today)
+        .values("kind")
+        .annotate(count=Count("pk"), amount=Sum("rental_amount"))
+        .values_list("kind", "count", "amount")
+        .order_by("kind")
+    )
@@ -0,0 +1,139 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from apps.main.models import Company
+from .geometry import refresh_geometry
+from .ledger import invalidate_ledger
+from .models import (
+    LandTenement,
+    LandTenementAcquisition,
+    LandTenementRental,
+    LandTenementSurvey,
+    LandTenementSurveyPoint,
+    MiningTenement,
+    MiningTenementAcquisition,
+    MiningTenementRental,
+    MiningTenementSurvey,
+    MiningTenementSurveyPoint,
+)
+from .portfolio import sync_portfolio, sync_related, sync_surveys, tenement_field
+
+# Everything the rental ledger reads.
+LEDGER_MODELS = (
+    Company,
+    LandTenement,
+    LandTenementAcquisition,
+    LandTenementRental,
+    MiningTenement,
+    MiningTenementAcquisition,
+    MiningTenementRental,
+)
+
+# The foreign key of the tenement whose portfolio row each model feeds, or
+# of the survey each point outlines.
+PARENT_FIELDS = {
+    **{
+        model: tenement_field(model).attname
+        for model in (
+            LandTenementAcquisition,
+            LandTenementSurvey,
+            MiningTenementAcquisition,
+            MiningTenementSurvey,
+        )
+    },
+    **{
+        model: model._meta.get_field(model.survey_field).attname
+        for model in (LandTenementSurveyPoint, MiningTenementSurveyPoint)
+    },
+}
+
+_state = threading.local()
+
+
+@contextmanager
+def remeasure_suspended():
+    # For bulk changes whose caller measures the surveys once afterwards.
+    suspended = getattr(_state, "suspended", False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = suspended
+
+
+def remeasure_survey(sender, instance, raw=False, **kwargs):
+    # Point saves and deletes through the admin; bulk loaders call
+    # refresh_geometry() themselves.
+    if raw:
+        return
+    field = sender._meta.get_field(sender.survey_field)
+    # A point moved to another survey changes the outline of both.
+    survey_ids = {
+        getattr(instance, field.attname),
+        getattr(instance, "_loaded_parent", None),
+    } - {None}
+    instance._loaded_parent = getattr(instance, field.attname)
+    if survey_ids and not getattr(_state, "suspended", False):
+        survey_model = field.related_model
+        refresh_geometry(survey_model, survey_model.objects.filter(pk__in=survey_ids))
+        sync_surveys(survey_model, list(survey_ids))
+
+
+def sync_tenement(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_portfolio(sender, [instance.pk])
+
+
+def remember_parent(sender, instance, **kwargs):
+    # The parent the row was loaded with, so moving the row to another one
+    # updates both. Rows loaded with it deferred look it up in pre_save.
+    attname = PARENT_FIELDS[sender]
+    if instance.pk is None:
+        instance._loaded_parent = None
+    elif attname not in instance.get_deferred_fields():
+        instance._loaded_parent = getattr(instance, attname)
+
+
+def load_parent(sender, instance, raw=False, **kwargs):
+    if raw or hasattr(instance, "_loaded_parent"):
+        return
+    instance._loaded_parent = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list(PARENT_FIELDS[sender], flat=True)
+        .first()
+    )
+
+
+def sync_tenement_of(sender, instance, raw=False, **kwargs):
+    # Acquisitions and surveys feed the portfolio row of their tenement.
+    if not raw:
+        sync_related(instance, getattr(instance, "_loaded_parent", None))
+        instance._loaded_parent = getattr(instance, PARENT_FIELDS[sender])
+
+
+for model in (LandTenementSurveyPoint, MiningTenementSurveyPoint):
+    post_init.connect(remember_parent, sender=model)
+    pre_save.connect(load_parent, sender=model)
+    post_save.connect(remeasure_survey, sender=model)
+    post_delete.connect(remeasure_survey, sender=model)
+
+for model in LEDGER_MODELS:
+    post_save.connect(invalidate_ledger, sender=model)
+    post_delete.connect(invalidate_ledger, sender=model)
+
+for model in (LandTenement, MiningTenement):
+    post_save.connect(sync_tenement, sender=model)
+    post_delete.connect(sync_tenement, sender=model)
+
+for model in (
+    LandTenementAcquisition,
+    LandTenementSurvey,
+    MiningTenementAcquisition,
+    MiningTenementSurvey,
+):
+    post_init.connect(remember_parent, sender=model)
+    pre_save.connect(load_parent, sender=model)
+    post_save.connect(sync_tenement_of, sender=model)
+    post_delete.connect(sync_tenement_of, sender=model)
@@ -1,3 +1,737 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from datetime import date, timedelta
+from itertools import chain
+
+from django.contrib.auth.models import Permission, User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.main.models import Company, District, LocalLevelGovernment, Province
+from .geometry import polygon_metrics
+from .ledger import due_schedule, expected_dues, ledger
+from .models import (
+    LandTenement,
+    LandTenementAcquisition,
+    LandTenementRental,
+    LandTenementSurvey,
+    LandTenementSurveyPoint,
+    MiningTenement,
+    MiningTenementAcquisition,
+    MiningTenementRental,
+    PortfolioTenement,
+)
+from .reconcile import RentalReconciler, read_statement
+from .rentals import upcoming_rental_dues
+from .signals import remeasure_suspended
 
 # Create your tests here.
+
+
+class TenementTestMixin:
+    def setUp(self):
+        province = Province.objects.create(name="Enga")
+        district = District.objects.create(name="Porgera", province=province)
+        self.location = {
+            "province": province,
+            "district": district,
+            "llg": LocalLevelGovernment.objects.create(
+                name="Porgera Rural", province=province, district=district
+            ),
+            "lease_holder": Company.objects.create(name="Porgera Gold"),
+        }
+        self.today = date.today()
+
+    def add_tenement(self, model, acquisition_model, title, days):
+        tenement = model.objects.create(
+            land_name=f"{title} land", title=title, **self.location
+        )
+        if days is not None:
+            relation = model._meta.get_field(model.acquisition_related_name).field.name
+            acquisition_model.objects.create(
+                purchase_price=0,
+                rental_amount=100,
+                rental_due_date=self.today + timedelta(days=days),
+                **{relation: tenement},
+            )
+        return tenement
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class RentalDueTests(TenementTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_tenement(LandTenement, LandTenementAcquisition, "L1", -5)
+        self.add_tenement(LandTenement, LandTenementAcquisition, "L2", 20)
+        self.add_tenement(LandTenement, LandTenementAcquisition, "L3", 200)
+        self.add_tenement(LandTenement, LandTenementAcquisition, "L4", None)
+        self.add_tenement(MiningTenement, MiningTenementAcquisition, "M1", 10)
+
+    def test_filters_run_on_the_annotated_due_date(self):
+        tenements = LandTenement.objects.with_rental_due()
+        self.assertEqual(
+            [t.days_until_rental_due for t in tenements], [-5, 20, 200, None]
+        )
+        self.assertQuerysetEqual(
+            LandTenement.objects.overdue(), ["L1"], lambda t: t.title
+        )
+        self.assertQuerysetEqual(
+            LandTenement.objects.due_within(30), ["L2"], lambda t: t.title
+        )
+
+    def test_changelist_filters_by_rental_due(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        response = self.client.get(
+            reverse("crs:land_landtenement_changelist"),
+            {"rental_due": "overdue", "o": "7"},
+        )
+        self.assertEqual([t.title for t in response.context["cl"].result_list], ["L1"])
+
+    def test_digest_lists_land_and_mining_in_one_query(self):
+        with self.assertNumQueries(1):
+            dues = list(upcoming_rental_dues(30))
+        self.assertEqual([due[2] for due in dues], ["L1", "M1", "L2"])
+        call_command(
+            "send_rental_due_digest", to=["lands@example.com"], stdout=io.StringIO()
+        )
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("1 overdue, 2 due", mail.outbox[0].subject)
+        self.assertIn("Mining tenement M1", mail.outbox[0].body)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class SurveyGeometryTests(TenementTestMixin, TestCase):
+    # A 0.01 degree square at Porgera, about 1.11 km a side.
+    SQUARE = [(-5.47, 143.12), (-5.47, 143.13), (-5.46, 143.13), (-5.46, 143.12)]
+
+    def setUp(self):
+        super().setUp()
+        self.tenement = self.add_tenement(LandTenement, None, "L1", None)
+        self.survey = LandTenementSurvey.objects.create(
+            land_tenement=self.tenement,
+            survey_date=self.today,
+            surveyor_name="Surveyor",
+        )
+
+    def add_points(self, points):
+        for latitude, longitude in points:
+            LandTenementSurveyPoint.objects.create(
+                land_tenement_survey=self.survey,
+                latitude=latitude,
+                longitude=longitude,
+            )
+        self.survey.refresh_from_db()
+
+    def test_point_saves_measure_the_survey(self):
+        self.add_points(self.SQUARE)
+        self.assertEqual(
+            list(
+                self.survey.land_tenemenet_survey_points_by_land_tenement_survey.values_list(
+                    "sequence", flat=True
+                )
+            ),
+            [0, 1, 2, 3],
+        )
+        self.assertEqual(self.survey.point_count, 4)
+        self.assertAlmostEqual(self.survey.area_m2 / 1e6, 1.231, places=2)
+        self.assertAlmostEqual(self.survey.perimeter_m, 4438, delta=5)
+        self.assertEqual(str(self.survey.centroid_latitude), "-5.465000")
+        self.assertEqual(str(self.survey.centroid_longitude), "143.125000")
+
+        # Reversing the ring changes nothing; a single point has no area.
+        reverse_metrics = polygon_metrics(*zip(*reversed(self.SQUARE)))
+        self.assertAlmostEqual(reverse_metrics["area_m2"], self.survey.area_m2)
+        self.assertEqual(polygon_metrics([-5.47], [143.12])["area_m2"], 0)
+
+    def test_moving_a_point_measures_both_surveys(self):
+        self.add_points(self.SQUARE[:3])
+        other = LandTenementSurvey.objects.create(
+            land_tenement=self.tenement, survey_date=self.today
+        )
+        point = LandTenementSurveyPoint.objects.filter(
+            land_tenement_survey=self.survey
+        ).last()
+        point.land_tenement_survey = other
+        point.save()
+        self.survey.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.survey.point_count, other.point_count), (2, 1))
+
+    def test_bounding_box_queries(self):
+        self.add_points(self.SQUARE)
+        inside = (-5.465, 143.125, -5.464, 143.126)
+        outside = (-5.0, 143.0, -4.9, 143.1)
+        self.assertEqual(
+            list(LandTenement.objects.intersecting(*inside)), [self.tenement]
+        )
+        self.assertFalse(LandTenement.objects.intersecting(*outside).exists())
+
+        self.survey.land_tenemenet_survey_points_by_land_tenement_survey.all().delete()
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.point_count, 0)
+        self.assertIsNone(self.survey.area_m2)
+
+    def test_outline_endpoint_simplifies_and_caches_per_zoom(self):
+        # The square again with ten almost collinear points along each side.
+        ring = []
+        for (lat1, lon1), (lat2, lon2) in zip(
+            self.SQUARE, self.SQUARE[1:] + self.SQUARE[:1]
+        ):
+            for step in range(10):
+                wobble = 0.00001 * (step % 2)
+                ring.append(
+                    (
+                        round(lat1 + (lat2 - lat1) * step / 10 + wobble, 6),
+                        round(lon1 + (lon2 - lon1) * step / 10 + wobble, 6),
+                    )
+                )
+        self.add_points(ring)
+        older = LandTenementSurvey.objects.create(
+            land_tenement=self.tenement,
+            survey_date=self.today - timedelta(days=365),
+            surveyor_name="Surveyor",
+        )
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        cache.clear()
+        url = reverse("tenement_outlines")
+        bbox = "143.0,-5.5,143.2,-5.4"
+
+        response = self.client.get(url, {"bbox": bbox, "zoom": 10, "kind": "land"})
+        (feature,) = response.json()["features"]
+        self.assertEqual(feature["properties"]["survey"], self.survey.pk)
+        coordinates = feature["geometry"]["coordinates"][0]
+        self.assertEqual(len(coordinates), 5)
+        self.assertEqual(coordinates[0], coordinates[-1])
+        self.assertNotEqual(older.pk, feature["properties"]["survey"])
+
+        detailed = self.client.get(url, {"bbox": bbox, "zoom": 20}).json()
+        self.assertEqual(
+            len(detailed["features"][0]["geometry"]["coordinates"][0]), len(ring) + 1
+        )
+
+        # Cached rings: no point query on the second request.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {"bbox": bbox, "zoom": 10})
+        self.assertFalse(
+            any("surveypoint" in query["sql"] for query in queries.captured_queries)
+        )
+        self.assertEqual(
+            self.client.get(
+                url, {"bbox": "143.0,-5.5,143.2,-5.4", "kind": "x"}
+            ).status_code,
+            400,
+        )
+        self.assertFalse(self.client.get(url, {"bbox": "0,0,1,1"}).json()["features"])
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class SurveyPointImportTests(TenementTestMixin, TestCase):
+    GPX = b"""<?xml version="1.0"?>
+<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">
+  <trk><trkseg>
+    <trkpt lat="-5.47" lon="143.12"><ele>2200</ele></trkpt>
+    <trkpt lat="-5.47" lon="143.13"/>
+    <trkpt lat="-5.46" lon="143.13"/>
+    <trkpt lat="-5.46" lon="143.12"/>
+    <trkpt lat="-5.47" lon="143.12"/>
+  </trkseg></trk>
+</gpx>"""
+    KML = b"""<?xml version="1.0"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Placemark><Polygon>
+  <outerBoundaryIs><LinearRing><coordinates>
+    143.12,-5.47,0 143.13,-5.47,0 143.13,-5.46,0 143.12,-5.46,0 143.12,-5.47,0
+  </coordinates></LinearRing></outerBoundaryIs>
+</Polygon></Placemark></kml>"""
+
+    def setUp(self):
+        super().setUp()
+        tenement = self.add_tenement(LandTenement, None, "L1", None)
+        self.survey = LandTenementSurvey.objects.create(
+            land_tenement=tenement, survey_date=self.today, surveyor_name="Surveyor"
+        )
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        self.url = reverse(
+            "crs:land_landtenementsurvey_import_points", args=[self.survey.pk]
+        )
+
+    def points(self):
+        return list(
+            self.survey.land_tenemenet_survey_points_by_land_tenement_survey.values_list(
+                "sequence", "latitude", "longitude"
+            )
+        )
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            self.url, {"file": SimpleUploadedFile(name, content), **data}
+        )
+
+    def test_gpx_and_kml_read_the_same_closed_ring(self):
+        for name, content in (("walk.gpx", self.GPX), ("outline.kml", self.KML)):
+            response = self.upload(name, content, replace="on")
+            self.assertRedirects(
+                response,
+                reverse("crs:land_landtenementsurvey_change", args=[self.survey.pk]),
+            )
+            points = self.points()
+            self.assertEqual([point[0] for point in points], [0, 1, 2, 3])
+            self.assertEqual(str(points[1][2]), "143.130000")
+            self.survey.refresh_from_db()
+            self.assertEqual(self.survey.point_count, 4)
+            self.assertAlmostEqual(self.survey.area_m2 / 1e6, 1.231, places=2)
+
+    def test_csv_appends_in_order_and_rejects_bad_files_whole(self):
+        self.upload("a.csv", b"Lat,Lon\n-5.47,143.12\n-5.47,143.13\n")
+        self.upload("b.csv", b"latitude,longitude\n-5.46,143.13\n\n-5.46,143.12\n")
+        self.assertEqual(
+            [(sequence, str(lat)) for sequence, lat, _ in self.points()],
+            [(0, "-5.470000"), (1, "-5.470000"), (2, "-5.460000"), (3, "-5.460000")],
+        )
+
+        response = self.upload(
+            "bad.csv", b"latitude,longitude\n-5.46,143.12\n95,143.1\nx,143\n"
+        )
+        self.assertEqual(
+            response.context["importer"].errors,
+            [
+                ("Row 3", "Latitude must be within ±90 and longitude ±180."),
+                ("Row 4", "Latitude must be within ±90 and longitude ±180."),
+            ],
+        )
+        self.assertEqual(len(self.points()), 4)
+        response = self.upload("notes.txt", b"lat,lon")
+        self.assertFormError(
+            response.context["form"], "file", "Upload a csv, gpx, kml file."
+        )
+        response = self.upload("broken.gpx", b"<gpx><trkpt lat='1'")
+        self.assertIn("Cannot read the GPX file", str(response.context["form"].errors))
+        response = self.upload(
+            "latin.csv", "lat,lon,name\n-5.46,143.12,Café\n".encode("latin-1")
+        )
+        self.assertIn(
+            "The CSV file is not UTF-8 text", str(response.context["form"].errors)
+        )
+        # Longer than the csv module's field size limit.
+        response = self.upload("long.csv", b"lat,lon\n" + b"1" * 200000 + b",1\n")
+        self.assertIn("Cannot read the CSV file", str(response.context["form"].errors))
+
+    def test_unknown_survey_is_not_found_and_suspension_nests(self):
+        for object_id in ("abc", self.survey.pk + 1):
+            response = self.client.get(
+                reverse("crs:land_landtenementsurvey_import_points", args=[object_id])
+            )
+            self.assertEqual(response.status_code, 404)
+
+        # Replacing points suspends remeasuring too; the caller's suspension
+        # must outlast it.
+        with remeasure_suspended():
+            self.upload("a.csv", b"lat,lon\n-5.47,143.12\n-5.47,143.13\n", replace="on")
+            LandTenementSurveyPoint.objects.create(
+                land_tenement_survey=self.survey, latitude=-5.46, longitude=143.13
+            )
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.point_count, 2)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class RentalReconciliationTests(TenementTestMixin, TestCase):
+    OFX = b"""OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20260303120000
+<TRNAMT>250.00
+<FITID>9001
+<NAME>PORGERA GOLD
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20260304
+<TRNAMT>-20.00
+<FITID>9002
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+    MT940 = b""":20:STATEMENT
+:25:123456789
+:60F:C260301PGK1000,00
+:61:2603050305C300,00NTRFNONREF//B1
+:86:RENTAL RCPT M-77 PORGERA
+:61:2603060306C999,00NTRFNONREF//B2
+:86:UNKNOWN PAYER
+:62F:C260331PGK2299,00
+-
+"""
+
+    def setUp(self):
+        super().setUp()
+        land = self.add_tenement(LandTenement, None, "L1", None)
+        mining = self.add_tenement(MiningTenement, None, "M1", None)
+        self.rentals = {}
+        for name, model, tenement, receipt, amount, day in (
+            ("receipt", LandTenementRental, land, "R-1001", 100, 1),
+            ("mismatch", LandTenementRental, land, "R-1002", 120, 1),
+            ("window", LandTenementRental, land, None, 250, 1),
+            ("mining", MiningTenementRental, mining, "M-77", 300, 20),
+            ("twin_a", LandTenementRental, land, None, 75, 10),
+            ("twin_b", MiningTenementRental, mining, None, 75, 12),
+        ):
+            field = (
+                "land_tenement" if model is LandTenementRental else "mining_tenement"
+            )
+            self.rentals[name] = model.objects.create(
+                payment_date=date(2026, 3, day),
+                amount_paid=amount,
+                receipt_number=receipt,
+                payment_status="Pending",
+                **{field: tenement},
+            )
+
+    def statuses(self):
+        for rental in self.rentals.values():
+            rental.refresh_from_db()
+        return {name: rental.payment_status for name, rental in self.rentals.items()}
+
+    def test_matches_by_receipt_then_date_window_across_formats(self):
+        csv_statement = (
+            b"Date,Description,Reference,Amount\n"
+            b"02/03/2026,Lease rent,R 1001,100.00\n"
+            b"02/03/2026,Lease rent,R-1002,100.00\n"
+            b"11/03/2026,Transfer,,75.00\n"
+            b"31/02/2026,Bad date,,10.00\n"
+        )
+        reconciler = RentalReconciler(window_days=7)
+        lines = chain(
+            read_statement(io.BytesIO(csv_statement), "march.csv"),
+            read_statement(io.BytesIO(self.OFX), "march.ofx"),
+            read_statement(io.BytesIO(self.MT940), "march.sta"),
+        )
+        # Two reads, two updates and the savepoint around them.
+        with self.assertNumQueries(6):
+            reconciler.run(lines)
+        self.assertEqual(reconciler.matched, {"receipt": 2, "date window": 1})
+        self.assertEqual(reconciler.skipped, 1)
+        self.assertEqual(
+            [(position, reason) for position, _, _, _, reason in reconciler.exceptions],
+            [
+                (
+                    "Row 3",
+                    "Receipt matches land rental %d of 120.00"
+                    % self.rentals["mismatch"].pk,
+                ),
+                ("Row 5", "Unreadable date or amount"),
+                ("Row 4", "2 pending rentals of this amount in the window"),
+                ("Line 2", "No pending rental matches"),
+            ],
+        )
+        self.assertEqual(
+            self.statuses(),
+            {
+                "receipt": "Completed",
+                "mismatch": "Pending",
+                "window": "Completed",
+                "mining": "Completed",
+                "twin_a": "Pending",
+                "twin_b": "Pending",
+            },
+        )
+
+    def test_admin_dry_run_and_command_exceptions_report(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        response = self.client.post(
+            reverse("crs:land_landtenementrental_reconcile"),
+            {
+                "file": SimpleUploadedFile("march.sta", self.MT940),
+                "window_days": 7,
+                "dry_run": "on",
+            },
+        )
+        self.assertContains(response, "No pending rental matches")
+        self.assertEqual(self.statuses()["mining"], "Pending")
+
+        with tempfile.TemporaryDirectory() as directory:
+            statement = os.path.join(directory, "march.ofx")
+            report = os.path.join(directory, "exceptions.csv")
+            with open(statement, "wb") as file:
+                file.write(self.OFX)
+            call_command(
+                "reconcile_rentals", statement, exceptions=report, stdout=io.StringIO()
+            )
+            with open(report) as file:
+                self.assertEqual(
+                    file.read().splitlines(), ["position,date,amount,reference,reason"]
+                )
+        self.assertEqual(self.statuses()["window"], "Completed")
+
+    def test_unreadable_debit_and_encoding_are_reported(self):
+        reconciler = RentalReconciler(dry_run=True)
+        reconciler.run(
+            read_statement(
+                io.BytesIO(b":20:STATEMENT\n:61:2603050305D,NTRFNONREF//B1\n-\n"),
+                "march.sta",
+            )
+        )
+        self.assertEqual(
+            [(position, reason) for position, _, _, _, reason in reconciler.exceptions],
+            [("Line 1", "Unreadable date or amount")],
+        )
+
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        response = self.client.post(
+            reverse("crs:land_landtenementrental_reconcile"),
+            {
+                "file": SimpleUploadedFile(
+                    "march.csv",
+                    "Date,Amount,Reference\n02/03/2026,100,Café\n".encode("cp1252"),
+                ),
+                "window_days": 7,
+            },
+        )
+        self.assertContains(response, "The statement is not UTF-8 text")
+
+        with tempfile.TemporaryDirectory() as directory:
+            statement = os.path.join(directory, "march.sta")
+            report = os.path.join(directory, "exceptions.csv")
+            with open(statement, "wb") as file:
+                file.write(self.MT940)
+            call_command(
+                "reconcile_rentals", statement, exceptions=report, stdout=io.StringIO()
+            )
+            with open(report) as file:
+                self.assertTrue(
+                    file.read().splitlines()[1].startswith(f"{statement}: Line 2,")
+                )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class RentalLedgerTests(TenementTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.land = self.add_tenement(LandTenement, None, "L1", None)
+        self.mining = self.add_tenement(MiningTenement, None, "M1", None)
+        LandTenementAcquisition.objects.create(
+            land_tenement=self.land,
+            purchase_price=0,
+            rental_amount=100,
+            rental_due_date=date(2024, 6, 30),
+            start_date=date(2024, 1, 1),
+        )
+        MiningTenementAcquisition.objects.create(
+            mining_tenement=self.mining,
+            purchase_price=0,
+            rental_amount=50,
+            rental_due_date=date(2025, 1, 1),
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 12, 31),
+        )
+        for amount, status in ((150, "Completed"), (100, "Pending")):
+            LandTenementRental.objects.create(
+                land_tenement=self.land,
+                payment_date=date(2025, 7, 1),
+                amount_paid=amount,
+                payment_status=status,
+            )
+
+    def test_due_schedule(self):
+        self.assertEqual(
+            due_schedule(date(2020, 3, 31), date(2021, 1, 15), None, date(2026, 4, 1)),
+            (date(2021, 3, 31), 6, date(2027, 3, 31)),
+        )
+        self.assertEqual(
+            [
+                due
+                for due, _ in expected_dues(
+                    date(2026, 1, 31), None, date(2026, 4, 30), date(2027, 1, 1), 10, 1
+                )
+            ],
+            [
+                date(2026, 1, 31),
+                date(2026, 2, 28),
+                date(2026, 3, 31),
+                date(2026, 4, 30),
+            ],
+        )
+
+    def test_arrears_per_tenement_and_lease_holder_are_cached(self):
+        as_of = date(2026, 7, 1)
+        with self.assertNumQueries(1):
+            report = ledger(as_of)
+        self.assertEqual(
+            [
+                (
+                    row["title"],
+                    row["periods_due"],
+                    row["expected"],
+                    row["paid"],
+                    row["arrears"],
+                )
+                for row in report["tenements"]
+            ],
+            [("L1", 3, 300, 150, 150), ("M1", 1, 50, 0, 50)],
+        )
+        self.assertIsNone(report["tenements"][1]["next_due"])
+        (company,) = report["companies"]
+        self.assertEqual((company["tenements"], company["arrears"]), (2, 200))
+
+        with self.assertNumQueries(0):
+            ledger(as_of)
+        with self.captureOnCommitCallbacks(execute=True):
+            LandTenementRental.objects.filter(payment_status="Pending").update(
+                payment_status="Completed"
+            )
+            LandTenementRental.objects.first().save()
+        self.assertEqual(ledger(as_of)["totals"]["arrears"], 100)
+
+    def test_admin_report_and_export(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        url = reverse("crs:land_landtenementacquisition_ledger")
+        response = self.client.get(url, {"as_of": "2026-07-01", "by": "company"})
+        self.assertEqual(response.context["rows"], [["Porgera Gold", 2, 350, 150, 200]])
+        response = self.client.get(url, {"as_of": "2026-07-01", "format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["Kind", "Title", "Land Name"])
+        self.assertEqual(lines[1].split(",")[-2:], ["150.00", "2027-06-30"])
+
+    def test_needs_view_permission_on_both_acquisitions(self):
+        user = User.objects.create_user("clerk", is_staff=True)
+        user.user_permissions.add(
+            Permission.objects.get(codename="view_landtenementacquisition")
+        )
+        self.client.force_login(user)
+        url = reverse("crs:land_landtenementacquisition_ledger")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(
+            reverse("crs:land_landtenementacquisition_changelist")
+        )
+        self.assertNotContains(response, url)
+
+        user.user_permissions.add(
+            Permission.objects.get(codename="change_miningtenementacquisition")
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class PortfolioTests(TenementTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.land = self.add_tenement(LandTenement, LandTenementAcquisition, "L1", 10)
+        self.mining = self.add_tenement(MiningTenement, None, "M1", None)
+
+    def rows(self):
+        return list(
+            PortfolioTenement.objects.order_by("kind").values_list(
+                "kind", "title", "rental_due_date", "point_count"
+            )
+        )
+
+    def test_kept_in_step_with_tenements_acquisitions_and_surveys(self):
+        due = self.today + timedelta(days=10)
+        self.assertEqual(
+            self.rows(), [("Land", "L1", due, 0), ("Mining", "M1", None, 0)]
+        )
+
+        MiningTenementAcquisition.objects.create(
+            mining_tenement=self.mining,
+            purchase_price=0,
+            rental_amount=50,
+            rental_due_date=due,
+        )
+        survey = LandTenementSurvey.objects.create(
+            land_tenement=self.land, survey_date=self.today
+        )
+        for sequence, (lat, lon) in enumerate(((0, 0), (0, 0.01), (0.01, 0.01))):
+            LandTenementSurveyPoint.objects.create(
+                land_tenement_survey=survey,
+                sequence=sequence,
+                latitude=lat,
+                longitude=lon,
+            )
+        self.land.title = "L1A"
+        self.land.save()
+        self.assertEqual(
+            self.rows(), [("Land", "L1A", due, 3), ("Mining", "M1", due, 0)]
+        )
+        self.assertEqual(
+            PortfolioTenement.objects.get(kind="Land").survey_id, survey.pk
+        )
+
+        survey.delete()
+        self.mining.delete()
+        self.assertEqual(self.rows(), [("Land", "L1A", due, 0)])
+
+    def test_moving_an_acquisition_or_survey_updates_both_tenements(self):
+        other = self.add_tenement(LandTenement, None, "L2", None)
+        survey = LandTenementSurvey.objects.create(
+            land_tenement=self.land, survey_date=self.today
+        )
+        acquisition = LandTenementAcquisition.objects.get(land_tenement=self.land)
+        acquisition.land_tenement = other
+        acquisition.save()
+        # Loaded with the tenement deferred, so it is looked up on save.
+        survey = LandTenementSurvey.objects.defer("land_tenement").get(pk=survey.pk)
+        survey.land_tenement = other
+        survey.save()
+        due = self.today + timedelta(days=10)
+        self.assertEqual(
+            list(
+                PortfolioTenement.objects.filter(kind="Land")
+                .order_by("title")
+                .values_list("title", "rental_due_date", "survey_id")
+            ),
+            [("L1", None, None), ("L2", due, survey.pk)],
+        )
+
+    def test_refresh_command_rebuilds_the_portfolio(self):
+        PortfolioTenement.objects.all().delete()
+        call_command("refresh_portfolio", stdout=io.StringIO())
+        self.assertEqual(len(self.rows()), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(PortfolioTenement.objects.due_within(30).values_list("title")),
+                [("L1",)],
+            )
+
+    def test_changelist_is_read_only_and_links_to_the_tenement(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        response = self.client.get(
+            reverse("crs:land_portfoliotenement_changelist"), {"q": "L1"}
+        )
+        self.assertContains(
+            response, reverse("crs:land_landtenement_change", args=[self.land.pk])
+        )
+        self.assertNotContains(response, "Add portfolio")
@@ -1,3 +1,36 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.gzip import gzip_page
 
-# Create your views here.
+from .outlines import KINDS, outline_features
+
+
+@gzip_page
+@staff_member_required(login_url="crs:login")
+def tenement_outlines_view(request):
+    """
+    Tenement outlines overlapping ``bbox=west,south,east,north`` as a GeoJSON
+    FeatureCollection simplified for ``zoom``. ``kind`` (land or mining,
+    repeatable) narrows it down.
+    """
+    try:
+        west, south, east, north = map(float, request.GET["bbox"].split(","))
+        zoom = int(request.GET.get("zoom", 12))
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {"error": "Pass bbox=west,south,east,north and an integer zoom."},
+            status=400,
+        )
+    kinds = request.GET.getlist("kind") or list(KINDS)
+    if any(kind not in KINDS for kind in kinds):
+        return JsonResponse(
+            {"error": f"kind must be one of {', '.join(KINDS)}."}, status=400
+        )
+
+    features = outline_features(
+        [KINDS[kind] for kind in kinds], south, west, north, east, zoom
+    )
+    response = JsonResponse({"type": "FeatureCollection", "features": features})
+    patch_cache_control(response, private=True, max_age=60)
+    return response
@@ -1,6 +1,17 @@
+from django.apps import apps
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.admin.sites import site as default_site
 from django.contrib.admin import AdminSite
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.http import Http404
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .dashboard import tiles_for
+from .exports import export_response, get_export_fields
+from .perf import request_log
 from .models import (
     Country,
     Organization,
@@ -21,16 +32,142 @@ class CustomAdminSite(AdminSite):
     site_header = "CRS"
     site_title = "CRS"
     index_title = "Welcome to CRS"
+    index_template = "admin/dashboard.html"
+
+    def get_urls(self):
+        urls = [
+            path(
+                "export/<str:app_label>/<str:model_name>/",
+                self.admin_view(self.export_view),
+                name="export",
+            ),
+            path("_perf/", self.admin_view(self.perf_view), name="perf"),
+        ]
+        return urls + super().get_urls()
+
+    def index(self, request, extra_context=None):
+        extra_context = {"tiles": tiles_for(request.user), **(extra_context or {})}
+        return super().index(request, extra_context)
+
+    def export_view(self, request, app_label, model_name):
+        # Export whatever the changelist shows for the same query string:
+        # filters, search and ordering all apply.
+        try:
+            model = apps.get_model(app_label, model_name)
+            model_admin = self._registry[model]
+        except (LookupError, KeyError):
+            raise Http404
+        if not model_admin.has_view_permission(request):
+            raise PermissionDenied
+        params = request.GET.copy()
+        file_format = params.pop("format", ["csv"])[-1]
+        request.GET = params
+        try:
+            changelist = model_admin.get_changelist_instance(request)
+        except IncorrectLookupParameters:
+            raise Http404
+        return export_response(
+            changelist.queryset,
+            get_export_fields(model_admin),
+            model._meta.model_name,
+            file_format,
+        )
+
+    def perf_view(self, request):
+        if not request.user.is_superuser:
+            raise PermissionDenied
+        if request.method == "POST":
+            request_log.clear()
+            return redirect("crs:perf")
+        records = request_log.snapshot()
+        context = {
+            **self.each_context(request),
+            "title": "Request performance",
+            "enabled": getattr(settings, "CRS_PERF_ENABLED", False),
+            "slow_ms": getattr(settings, "CRS_PERF_SLOW_MS", 500),
+            "summary": request_log.summary(),
+            "slow_requests": [record for record in reversed(records) if record["slow"]],
+            "recorded": len(records),
+        }
+        request.current_app = self.name
+        return TemplateResponse(request, "admin/perf.html", context)
 
 
 custom_admin_site = CustomAdminSite(name="crs")
 
 
+@admin.action(description="Export selected %(verbose_name_plural)s")
+def export_selected(modeladmin, request, queryset):
+    return export_response(
+        queryset, get_export_fields(modeladmin), modeladmin.model._meta.model_name
+    )
+
+
+custom_admin_site.add_action(export_selected)
+
+
+def is_single_valued(model, lookup):
+    # True when every hop of ``lookup`` can be followed with a join.
+    for name in lookup.split("__"):
+        field = model._meta.get_field(name)
+        if field.many_to_many or field.one_to_many:
+            return False
+        model = field.related_model
+    return True
+
+
+class OptimizedChangeListMixin:
+    """
+    Select or prefetch the relations that ``list_display`` touches.
+
+    Relation fields are picked up directly. Display methods declare what they
+    follow with a ``related`` attribute, next to ``short_description``::
+
+        display_province.related = ("province",)
+    """
+
+    def get_list_relations(self):
+        select_related, prefetch_related = [], []
+        for name in self.list_display:
+            for lookup in self._list_display_relations(name):
+                if is_single_valued(self.model, lookup):
+                    target = select_related
+                else:
+                    target = prefetch_related
+                if lookup not in target:
+                    target.append(lookup)
+        return select_related, prefetch_related
+
+    def _list_display_relations(self, name):
+        if callable(name):
+            return getattr(name, "related", ())
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            attr = getattr(self, name, None) or getattr(self.model, name, None)
+            if isinstance(attr, property):
+                attr = attr.fget
+            return getattr(attr, "related", ())
+        return (name,) if field.is_relation else ()
+
+    def get_list_select_related(self, request):
+        return self.get_list_relations()[0]
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        select_related, prefetch_related = self.get_list_relations()
+        if select_related:
+            qs = qs.select_related(*select_related)
+        if prefetch_related:
+            qs = qs.prefetch_related(*prefetch_related)
+        return qs
+
+
 # Register your models here.
 
 
 @admin.register(Country)
-class CountryAdmin(admin.ModelAdmin):
+class CountryAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = ["name"]
     search_fields = ["name"]
     list_filter = ["name"]
@@ -39,7 +176,7 @@ class CountryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Organization)
-class OrganizationAdmin(admin.ModelAdmin):
+class OrganizationAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = ["name", "email", "phone", "address"]
     search_fields = ["name", "email", "phone", "address"]
     list_filter = ["name"]
@@ -68,7 +205,7 @@ class CompanyAdmin(OrganizationAdmin):
 
 
 @admin.register(Province)
-class ProvinceAdmin(admin.ModelAdmin):
+class ProvinceAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = ["name", "country"]
     search_fields = ["name"]
     list_filter = ["name", "country"]
@@ -88,7 +225,7 @@ class ProvinceAdmin(admin.ModelAdmin):
 
 
 @admin.register(District)
-class DistrictAdmin(admin.ModelAdmin):
+class DistrictAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = ["name", "province"]
     search_fields = ["name"]
     list_filter = ["name", "province"]
@@ -108,7 +245,7 @@ class DistrictAdmin(admin.ModelAdmin):
 
 
 @admin.register(LocalLevelGovernment)
-class LLGAdmin(admin.ModelAdmin):
+class LLGAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = ["name", "display_province", "display_district"]
     search_fields = ["name"]
     list_filter = ["name", "province", "district"]
@@ -131,15 +268,17 @@ class LLGAdmin(admin.ModelAdmin):
         return obj.province.name if obj.province else "-"
 
     display_province.short_description = "Province"
+    display_province.related = ("province",)
 
     def display_district(self, obj):
         return obj.district.name if obj.district else "-"
 
     display_district.short_description = "District"
+    display_district.related = ("district",)
 
 
 @admin.register(TrustRegion)
-class TrustRegionAdmin(admin.ModelAdmin):
+class TrustRegionAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = ["name"]
     search_fields = ["name"]
     list_filter = [
@@ -158,7 +297,7 @@ class TrustRegionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Village)
-class VillageAdmin(admin.ModelAdmin):
+class VillageAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = [
         "name",
         "display_province",
@@ -192,15 +331,17 @@ class VillageAdmin(admin.ModelAdmin):
         return obj.province.name if obj.province else "-"
 
     display_province.short_description = "Province"
+    display_province.related = ("province",)
 
     def display_district(self, obj):
         return obj.district.name if obj.district else "-"
 
     display_district.short_description = "District"
+    display_district.related = ("district",)
 
 
 @admin.register(TrustVillage)
-class TrustVillageAdmin(admin.ModelAdmin):
+class TrustVillageAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = [
         "name",
         "display_province",
@@ -231,20 +372,23 @@ class TrustVillageAdmin(admin.ModelAdmin):
         return obj.province.name if obj.province else "-"
 
     display_province.short_description = "Province"
+    display_province.related = ("province",)
 
     def display_district(self, obj):
         return obj.district.name if obj.district else "-"
 
     display_district.short_description = "District"
+    display_district.related = ("district",)
 
     def display_trust_region(self, obj):
         return obj.trust_region.name if obj.trust_region else "-"
 
     display_trust_region.short_description = "Trust Region"
+    display_trust_region.related = ("trust_region",)
 
 
 @admin.register(Tribe)
-class TribeAdmin(admin.ModelAdmin):
+class TribeAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = [
         "name",
         "display_province",
@@ -271,9 +415,12 @@ class TribeAdmin(admin.ModelAdmin):
     def display_province(self, obj):
         return obj.province.name if obj.province else "-"
 
+    display_province.short_description = "Province"
+    display_province.related = ("province",)
+
 
 @admin.register(Clan)
-class ClanAdmin(admin.ModelAdmin):
+class ClanAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = [
         "name",
         "display_province",
@@ -308,27 +455,31 @@ class ClanAdmin(admin.ModelAdmin):
         return obj.province.name if obj.province else "-"
 
     display_province.short_description = "Province"
+    display_province.related = ("province",)
 
     def display_district(self, obj):
         return obj.district.name if obj.district else "-"
 
     display_district.short_description = "District"
+    display_district.related = ("district",)
 
     def display_village(self, obj):
         # Return a string representation of the ManyToManyField
         return ", ".join([str(item) for item in obj.village.all()])
 
     display_village.short_description = "Village"
+    display_village.related = ("village",)
 
     def display_trust_village(self, obj):
         # Return a string representation of the ManyToManyField
         return ", ".join([str(item) for item in obj.trust_village.all()])
 
     display_trust_village.short_description = "Trust Village"
+    display_trust_village.related = ("trust_village",)
 
 
 @admin.register(Bank)
-class BankAdmin(admin.ModelAdmin):
+class BankAdmin(OptimizedChangeListMixin, admin.ModelAdmin):
     list_display = ("bank_name", "bank_initials", "account_number_length")
     search_fields = ("bank_name", "bank_initials")
     list_filter = ("bank_name",)
@@ -0,0 +1,236 @@
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.urls import reverse
+
+from apps.community_context.models import CommunityPerson, Household
+from .models import District, Province
+
+
+def _first_pk(model):
+    return model.objects.order_by("pk").values_list("pk", flat=True).first()
+
+
+def _changelist(name, **params):
+    return lambda: (reverse(f"crs:{name}_changelist"), params)
+
+
+def _change(name, model):
+    return lambda: (reverse(f"crs:{name}_change", args=[_first_pk(model)]), {})
+
+
+# (name, function returning (url, query parameters)). Resolved after the data
+# is loaded so change forms can point at a real row.
+BENCHMARKS = [
+    ("index", lambda: (reverse("crs:index"), {})),
+    ("person changelist", _changelist("community_context_communityperson")),
+    (
+        "person changelist page 50",
+        _changelist("community_context_communityperson", p=50),
+    ),
+    (
+        "person search",
+        _changelist("community_context_communityperson", q="kewa pato"),
+    ),
+    ("household changelist", _changelist("community_context_household")),
+    (
+        "household changelist by size",
+        _changelist("community_context_household", size="5-8", o="-7"),
+    ),
+    ("dwelling changelist", _changelist("community_context_dwelling")),
+    ("trust village changelist", _changelist("main_trustvillage")),
+    ("land tenement changelist", _changelist("land_landtenement")),
+    ("mining tenement changelist", _changelist("land_miningtenement")),
+    ("demographics", _changelist("community_context_demographicrollup")),
+    (
+        "person change form",
+        _change("community_context_communityperson", CommunityPerson),
+    ),
+    ("household change form", _change("community_context_household", Household)),
+    ("trust regions lookup", lambda: (reverse("get_trust_regions"), {})),
+    (
+        "districts lookup",
+        lambda: (
+            reverse("get_districts_by_province"),
+            {"province_id": _first_pk(Province)},
+        ),
+    ),
+    (
+        "trust villages lookup",
+        lambda: (
+            reverse("get_trust_villages_by_district"),
+            {"district_id": _first_pk(District)},
+        ),
+    ),
+    ("hierarchy bundle", lambda: (reverse("get_hierarchy_bundle"), {})),
+    ("dwelling autocomplete", lambda: (reverse("dwelling_autocomplete"), {"q": "1"})),
+    (
+        "tenement outlines",
+        lambda: (
+            reverse("tenement_outlines"),
+            {"bbox": "140,-12,156,-1", "zoom": 8},
+        ),
+    ),
+    (
+        "rental ledger",
+        lambda: (reverse("crs:land_landtenementacquisition_ledger"), {}),
+    ),
+    (
+        "person export",
+        lambda: (
+            reverse("crs:export", args=["community_context", "communityperson"]),
+            {"format": "csv"},
+        ),
+    ),
+    (
+        "household export",
+        lambda: (
+            reverse("crs:export", args=["community_context", "household"]),
+            {"format": "csv"},
+        ),
+    ),
+]
+
+
+# The chained location dropdowns: each is a small query, so the cost of
+# opening a connection per request shows most here.
+CASCADE = [
+    "trust regions lookup",
+    "districts lookup",
+    "trust villages lookup",
+    "hierarchy bundle",
+]
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _request(client, url, params, lifecycle=False):
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    if lifecycle:
+        # What the request_started signal does, and the test client skips.
+        close_old_connections()
+    # Unlike CaptureQueriesContext this does not connect by itself, so a
+    # request served from the cache is timed without a connection.
+    with connection.execute_wrapper(count):
+        response = client.get(url, params)
+        # Streaming exports do their work while the body is read.
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        else:
+            response.content
+    if lifecycle:
+        close_old_connections()
+    return response.status_code, (time.perf_counter() - started) * 1000, len(queries)
+
+
+def run_benchmarks(repeat=5, names=None, conn_max_age=None):
+    """
+    Time each benchmark against the current database as a superuser.
+
+    The first request runs with a cleared cache and is reported on its own
+    as ``cold_ms``; the following ``repeat`` requests give the warm timings.
+    With ``conn_max_age`` set, connections are closed and reopened around
+    each request as a server would with that CONN_MAX_AGE, so the timings
+    include connecting. Returns one result dict per benchmark.
+    """
+    lifecycle = conn_max_age is not None
+    if lifecycle:
+        previous_max_age = connection.settings_dict["CONN_MAX_AGE"]
+        connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+        connection.close()
+    try:
+        return _run(repeat, names, lifecycle)
+    finally:
+        if lifecycle:
+            connection.settings_dict["CONN_MAX_AGE"] = previous_max_age
+            connection.close()
+
+
+def _run(repeat, names, lifecycle):
+    user = User.objects.filter(is_superuser=True).first()
+    if user is None:
+        user = User.objects.create_superuser("benchmark", "", None)
+    client = Client()
+    client.force_login(user)
+    results = []
+    for name, target in BENCHMARKS:
+        if names and name not in names:
+            continue
+        url, params = target()
+        cache.clear()
+        status, cold_ms, cold_queries = _request(client, url, params, lifecycle)
+        timings, queries = [], cold_queries
+        for _ in range(repeat):
+            status, ms, queries = _request(client, url, params, lifecycle)
+            timings.append(ms)
+        results.append(
+            {
+                "name": name,
+                "url": url,
+                "params": {key: str(value) for key, value in params.items()},
+                "status": status,
+                "cold_ms": round(cold_ms, 2),
+                "cold_queries": cold_queries,
+                "median_ms": round(statistics.median(timings), 2),
+                "min_ms": round(min(timings), 2),
+                "max_ms": round(max(timings), 2),
+                "queries": queries,
+            }
+        )
+    return results
+
+
+def compare(previous, current):
+    # Pair up results by (persons, name) and report the change in median
+    # latency and query count.
+    before = {
+        (run["persons"], row["name"]): row for run in previous for row in run["results"]
+    }
+    rows = []
+    for run in current:
+        for row in run["results"]:
+            old = before.get((run["persons"], row["name"]))
+            if old is None:
+                continue
+            rows.append(
+                {
+                    "persons": run["persons"],
+                    "name": row["name"],
+                    "median_ms": row["median_ms"],
+                    "previous_ms": old["median_ms"],
+                    "cold_ms": row["cold_ms"],
+                    "previous_cold_ms": old["cold_ms"],
+                    "change": (
+                        row["median_ms"] / old["median_ms"] - 1
+                        if old["median_ms"]
+                        else 0
+                    ),
+                    "queries": row["queries"],
+                    "previous_queries": old["queries"],
+                }
+            )
+    return rows
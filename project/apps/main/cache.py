@@ -0,0 +1,75 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+# Namespace shared by the geographic lookup endpoints in apps.main.views.
+LOOKUPS = "lookups"
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(namespace):
+    return f"crs:version:{namespace}"
+
+
+def bump_version(namespace):
+    # A new token orphans every entry cached under the previous one, so there
+    # is no need to track and delete individual keys.
+    version = {"token": f"{time.time_ns():x}", "modified": int(time.time())}
+    cache.set(_version_key(namespace), version, None)
+    return version
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        version = bump_version(namespace)
+    return version
+
+
+def get_or_build(namespace, key, build, timeout=CACHE_TIMEOUT):
+    version = get_version(namespace)
+    cache_key = f"crs:{namespace}:{version['token']}:{key}"
+    value = cache.get(cache_key)
+    if value is None:
+        value = build()
+        cache.set(cache_key, value, timeout)
+    return value
+
+
+def cached_json_response(request, namespace, key, build):
+    """
+    Serve ``build()`` as JSON, cached until ``namespace`` is bumped.
+
+    The response carries a strong ETag over the body and a Last-Modified of
+    the namespace version, so browsers can revalidate and get a 304.
+    """
+    version = get_version(namespace)
+
+    def build_entry():
+        content = json.dumps(
+            build(), cls=DjangoJSONEncoder, separators=(",", ":")
+        ).encode()
+        return {
+            "content": content,
+            "etag": quote_etag(hashlib.sha1(content).hexdigest()),
+        }
+
+    entry = get_or_build(namespace, key, build_entry)
+
+    response = HttpResponse(entry["content"], content_type="application/json")
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(version["modified"])
+    patch_cache_control(response, private=True, no_cache=True)
+    return get_conditional_response(
+        request,
+        etag=entry["etag"],
+        last_modified=version["modified"],
+        response=response,
+    )
@@ -0,0 +1,158 @@
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, OuterRef, Sum, Value
+from django.db.models.signals import post_delete, post_save
+
+from apps.community_benefit.models import CommunityBenefitAllocation
+from apps.community_context.models import (
+    CommunityPerson,
+    DemographicRollup,
+    Household,
+    HouseholdBankAccount,
+)
+from apps.community_payment.models import AllocationDistribution
+from apps.land.models import (
+    LandTenement,
+    LandTenementAcquisition,
+    MiningTenement,
+    MiningTenementAcquisition,
+)
+from apps.land.rentals import overdue_rental_totals
+from .cache import bump_version, get_or_build
+
+# Tiles also expire on their own, for changes made without signals (bulk
+# loads, queryset updates) and for the date rolling over.
+TILE_TIMEOUT = getattr(settings, "CRS_DASHBOARD_TIMEOUT", 60 * 5)
+
+TILES = []
+
+
+class Tile:
+    def __init__(self, key, title, columns, build, models, permission):
+        self.key = key
+        self.title = title
+        self.columns = columns
+        self.build = build
+        self.models = models
+        self.permission = permission
+
+    @property
+    def namespace(self):
+        return f"dashboard:{self.key}"
+
+    def rows(self):
+        return get_or_build(self.namespace, date.today(), self.build, TILE_TIMEOUT)
+
+    def invalidate(self, **kwargs):
+        transaction.on_commit(lambda: bump_version(self.namespace))
+
+
+def tile(title, columns, models, permission):
+    # Register a function returning a list of rows, each matching columns.
+    def register(build):
+        TILES.append(Tile(build.__name__, title, columns, build, models, permission))
+        return build
+
+    return register
+
+
+def tiles_for(user):
+    return [
+        {"title": item.title, "columns": item.columns, "rows": item.rows()}
+        for item in TILES
+        if user.has_perm(item.permission)
+    ]
+
+
+@tile(
+    "Population by trust region",
+    ("Trust Region", "People"),
+    (CommunityPerson,),
+    "community_context.view_communityperson",
+)
+def population():
+    # Every person has exactly one sex rollup, so its counts sum to people.
+    return list(
+        DemographicRollup.objects.filter(dimension="sex")
+        .values_list("trust_region__name")
+        .annotate(people=Sum("count"))
+        .order_by("trust_region__name")
+    )
+
+
+@tile(
+    "Households without a bank account",
+    ("Trust Region", "Households", "Without account"),
+    (Household, HouseholdBankAccount),
+    "community_context.view_household",
+)
+def unbanked_households():
+    accounts = HouseholdBankAccount.objects.filter(household=OuterRef("pk")).exclude(
+        status="Nil"
+    )
+    return list(
+        Household.objects.values_list("trust_region__name")
+        .annotate(
+            households=Count("pk"),
+            unbanked=Count("pk", filter=~Exists(accounts)),
+        )
+        .order_by("trust_region__name")
+    )
+
+
+@tile(
+    "Overdue tenement rentals",
+    ("Tenements", "Overdue", "Rental (PGK)"),
+    (
+        LandTenement,
+        LandTenementAcquisition,
+        MiningTenement,
+        MiningTenementAcquisition,
+    ),
+    "land.view_landtenement",
+)
+def overdue_rentals():
+    return overdue_rental_totals()
+
+
+@tile(
+    "Benefits allocated and distributed",
+    ("Year", "Allocated (PGK)", "Distributed (PGK)"),
+    (CommunityBenefitAllocation, AllocationDistribution),
+    "community_benefit.view_communitybenefitallocation",
+)
+def benefits_by_year():
+    # Summing across the allocation-distribution join would repeat each
+    # allocation once per distribution, so the two totals are aggregated
+    # separately and combined in one UNION ALL.
+    zero = Value(0, output_field=DecimalField(max_digits=15, decimal_places=2))
+    allocated = (
+        CommunityBenefitAllocation.objects.values_list("year")
+        .annotate(allocated=Sum("amount"), distributed=zero)
+        .order_by()
+    )
+    distributed = (
+        AllocationDistribution.objects.values_list("benefit_allocation__year")
+        .annotate(allocated=zero, distributed=Sum("amount"))
+        .order_by()
+    )
+    totals = {}
+    for year, allocated_amount, distributed_amount in allocated.union(
+        distributed, all=True
+    ):
+        row = totals.setdefault(year, [0, 0])
+        row[0] += allocated_amount
+        row[1] += distributed_amount
+    return sorted(
+        ((year, *row) for year, row in totals.items()),
+        key=lambda row: row[0] or 0,
+        reverse=True,
+    )
+
+
+for item in TILES:
+    for model in item.models:
+        post_save.connect(item.invalidate, sender=model, weak=False)
+        post_delete.connect(item.invalidate, sender=model, weak=False)
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_INERROR,
+    TRANSACTION_STATUS_INTRANS,
+)
+
+
+class ConnectionPool:
+    """
+    The open connections of one database in this process, shared by its
+    threads. At most ``max_size`` are checked out at once and a thread waits
+    up to ``timeout`` seconds for one to come back. Idle connections are
+    reused newest first and closed once idle for ``max_idle`` seconds.
+    """
+
+    def __init__(self, max_size=4, timeout=30, max_idle=600):
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.idle = []
+        self.timeout = timeout
+        self.max_idle = max_idle
+
+    def checkout(self):
+        # An idle connection, or None when the caller should open a new one.
+        if not self.slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f"No pooled database connection was free within {self.timeout}s."
+            )
+        with self.lock:
+            if not self.idle:
+                return None
+            connection, released = self.idle.pop()
+            stale = []
+            if time.monotonic() - released > self.max_idle:
+                # The rest were released even earlier.
+                stale = [connection, *(old for old, _ in self.idle)]
+                self.idle = []
+                connection = None
+        for old in stale:
+            self._close(old)
+        return connection
+
+    def checkin(self, connection, discard=False):
+        try:
+            if not discard and self._reset(connection):
+                with self.lock:
+                    self.idle.append((connection, time.monotonic()))
+            else:
+                self._close(connection)
+        finally:
+            self.slots.release()
+
+    def release(self):
+        # For a checkout whose new connection could not be opened.
+        self.slots.release()
+
+    def _reset(self, connection):
+        # Only connections outside any transaction go back in the pool.
+        if connection.closed:
+            return False
+        status = connection.info.transaction_status
+        if status in (TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR):
+            try:
+                connection.rollback()
+            except Exception:
+                return False
+            status = connection.info.transaction_status
+        return status == TRANSACTION_STATUS_IDLE
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def connection_pool(alias, name, options):
+    # Keyed by process too, as a forked worker must not share its parent's
+    # sockets, and by database name, which the test runner changes.
+    key = (alias, name, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**({} if options is True else options))
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL with the connections of each worker process pooled, sized by
+    ``OPTIONS["pool"]`` (``True`` or the ConnectionPool arguments). Closing a
+    connection, as Django does at the end of every request, returns it to the
+    pool instead.
+    """
+
+    @property
+    def pool(self):
+        return connection_pool(
+            self.alias,
+            self.settings_dict["NAME"],
+            self.settings_dict["OPTIONS"]["pool"],
+        )
+
+    def get_connection_params(self):
+        if self.settings_dict["CONN_MAX_AGE"]:
+            raise ImproperlyConfigured(
+                "The pooled backend needs CONN_MAX_AGE = 0, so connections go "
+                "back to the pool after each request."
+            )
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        while True:
+            connection = pool.checkout()
+            if connection is None:
+                try:
+                    return super().get_new_connection(conn_params)
+                except Exception:
+                    pool.release()
+                    raise
+            if not self.settings_dict["CONN_HEALTH_CHECKS"] or self._usable(connection):
+                break
+            pool.checkin(connection, discard=True)
+        # What the parent sets when it opens a connection.
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED
+            )
+        )
+        return connection
+
+    def _usable(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is not None:
+            # Closed inside atomic(), the wrapper keeps its reference.
+            self.pool.checkin(
+                self.connection,
+                discard=self.errors_occurred or self.in_atomic_block,
+            )
@@ -0,0 +1,365 @@
+import hashlib
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.admin import ListFilter
+from django.contrib.admin.utils import NotRelationField, get_fields_from_path
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.utils import run_formatters
+from django.db import connections, router
+from django.db.models import CharField, TextField
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.utils import timezone
+
+# Index methods: a btree over the columns, a trigram GIN over the column for
+# the trigram_similar lookups, and a trigram GIN over UPPER(column) for the
+# icontains/istartswith/iexact lookups of plain admin search.
+BTREE, TRIGRAM, UPPER_TRIGRAM = "btree", "trigram", "upper_trigram"
+# Below this many rows a sequential scan is as cheap as an index lookup.
+SMALL_TABLE = 1000
+LARGE_TABLE = 100000
+
+Candidate = namedtuple("Candidate", "model method columns sources")
+TableStats = namedtuple("TableStats", "rows seq_scan seq_tup_read idx_scan")
+
+
+def _column(model, path):
+    # The (model, field) that a lookup path ends on, or None when that is not
+    # a column, such as a reverse or many-to-many relation.
+    try:
+        field = get_fields_from_path(model, path)[-1]
+    except (FieldDoesNotExist, NotRelationField):
+        return None
+    if not getattr(field, "concrete", False) or field.many_to_many:
+        return None
+    return field.model._meta.concrete_model, field
+
+
+def _ordering(model_admin):
+    fields = []
+    for name in model_admin.ordering or model_admin.model._meta.ordering or ():
+        if isinstance(name, str) and name != "?":
+            fields.append(name.lstrip("-"))
+    return fields
+
+
+def _search_fields(model_admin):
+    # TrigramSearchMixin replaces the lookups of the fields it names.
+    trigram_fields = getattr(model_admin, "trigram_fields", ())
+    return [(name, TRIGRAM) for name in trigram_fields] + [
+        (name.lstrip("^=@"), UPPER_TRIGRAM)
+        for name in model_admin.search_fields
+        if not name.startswith("@") and name.lstrip("^=") not in trigram_fields
+    ]
+
+
+def _auditable(model):
+    # Only tables this project's migrations create.
+    return (
+        not model._meta.proxy
+        and model._meta.managed
+        and Path(model._meta.app_config.path).is_relative_to(settings.BASE_DIR)
+    )
+
+
+def admin_candidates(admin_site):
+    """
+    Every index the changelists of ``admin_site`` could use: one per column
+    they filter, sort or search on, wherever the lookup leads, and a composite
+    of each plain filter column followed by the sort columns, which serves a
+    filtered page in index order. Only models of this project are audited.
+    """
+    candidates = {}
+
+    def add(model, path, method, source):
+        resolved = _column(model, path)
+        if not resolved:
+            return None
+        model, field = resolved
+        # Trigram indexes only serve text; searching numbers casts every row.
+        if method == BTREE or isinstance(field, (CharField, TextField)):
+            add_columns(model, method, [field.column], source)
+        return resolved
+
+    def add_columns(model, method, columns, source):
+        if not _auditable(model):
+            return
+        key = (model, method, tuple(columns))
+        candidate = candidates.setdefault(
+            key, Candidate(model, method, tuple(columns), [])
+        )
+        if source not in candidate.sources:
+            candidate.sources.append(source)
+
+    for model, model_admin in admin_site._registry.items():
+        name = type(model_admin).__name__
+        # The changelist sorts by all of its ordering at once, so the local
+        # columns make one composite; sorting across a join indexes the
+        # related column.
+        ordering = []
+        for path in _ordering(model_admin):
+            resolved = _column(model, path)
+            if resolved and resolved[0] is model:
+                if not resolved[1].primary_key:
+                    ordering.append(resolved[1].column)
+            elif resolved:
+                add(model, path, BTREE, f"{name}.ordering")
+        if ordering:
+            add_columns(model, BTREE, ordering, f"{name}.ordering")
+
+        for path in model_admin.list_filter:
+            if isinstance(path, (list, tuple)):
+                path = path[0]
+            if isinstance(path, type) and issubclass(path, ListFilter):
+                continue
+            resolved = add(model, path, BTREE, f"{name}.list_filter")
+            if resolved and resolved[0] is model and not resolved[1].is_relation:
+                column = resolved[1].column
+                if ordering and ordering != [column]:
+                    add_columns(
+                        model,
+                        BTREE,
+                        [column, *(other for other in ordering if other != column)],
+                        f"{name}.list_filter",
+                    )
+
+        if model_admin.date_hierarchy:
+            add(model, model_admin.date_hierarchy, BTREE, f"{name}.date_hierarchy")
+
+        for path, method in _search_fields(model_admin):
+            add(model, path, method, f"{name}.search_fields")
+
+        # Autocomplete widgets search the related model through its own admin.
+        for path in model_admin.autocomplete_fields:
+            related = model._meta.get_field(path).related_model
+            if related in admin_site._registry:
+                for search, method in _search_fields(admin_site._registry[related]):
+                    add(related, search, method, f"{name}.autocomplete_fields")
+
+    candidates = list(candidates.values())
+    # A btree already proposed over more columns serves any prefix of them.
+    return [
+        candidate
+        for candidate in candidates
+        if candidate.method != BTREE
+        or not any(
+            other.model is candidate.model
+            and other.method == BTREE
+            and len(other.columns) > len(candidate.columns)
+            and other.columns[: len(candidate.columns)] == candidate.columns
+            for other in candidates
+        )
+    ]
+
+
+def _normalise(definition):
+    return "".join(
+        char for char in (definition or "").lower() if char not in ' "()'
+    ).replace("::text", "")
+
+
+def _covers(constraint, method, columns):
+    if method == BTREE:
+        btree = constraint["primary_key"] or constraint["unique"]
+        btree = btree or constraint.get("index") and constraint.get("type") == "idx"
+        return bool(btree) and tuple(constraint["columns"][: len(columns)]) == columns
+    if constraint.get("type") != "gin":
+        return False
+    (column,) = columns
+    if method == TRIGRAM:
+        return constraint["columns"] == [column]
+    # PostgreSQL reports expression indexes by their definition only.
+    return f"upper{column}gin_trgm_ops" in _normalise(constraint.get("definition"))
+
+
+def existing_indexes(connection, tables):
+    with connection.cursor() as cursor:
+        return {
+            table: list(
+                connection.introspection.get_constraints(cursor, table).values()
+            )
+            for table in tables
+        }
+
+
+def table_stats(connection, tables):
+    """
+    Row counts, and on PostgreSQL the sequential and index scans since the
+    statistics were last reset, from ``pg_stat_user_tables``.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT relname, n_live_tup, seq_scan, seq_tup_read, idx_scan "
+                "FROM pg_stat_user_tables WHERE relname = ANY(%s)",
+                [list(tables)],
+            )
+            return {row[0]: TableStats(*row[1:]) for row in cursor.fetchall()}
+        stats = {}
+        for table in tables:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            stats[table] = TableStats(cursor.fetchone()[0], None, None, None)
+        return stats
+
+
+def estimate_impact(stats):
+    # Tables the planner would scan anyway, or that are never scanned
+    # sequentially, gain little from another index.
+    if stats.rows < SMALL_TABLE or stats.seq_scan == 0:
+        return "low"
+    if stats.rows >= LARGE_TABLE:
+        return "high"
+    return "medium"
+
+
+def audit(admin_site):
+    """
+    The candidates of ``admin_site`` grouped into ``(missing, covered)``;
+    missing ones come as ``(candidate, stats, impact)``, the heaviest first.
+    Trigram indexes are only audited on PostgreSQL.
+    """
+    by_alias = {}
+    for candidate in admin_candidates(admin_site):
+        alias = router.db_for_write(candidate.model)
+        by_alias.setdefault(alias, []).append(candidate)
+
+    missing, covered = [], []
+    for alias, candidates in by_alias.items():
+        connection = connections[alias]
+        tables = {candidate.model._meta.db_table for candidate in candidates}
+        indexes = existing_indexes(connection, tables)
+        stats = table_stats(connection, tables)
+        for candidate in candidates:
+            if candidate.method != BTREE and connection.vendor != "postgresql":
+                continue
+            table = candidate.model._meta.db_table
+            if any(
+                _covers(constraint, candidate.method, candidate.columns)
+                for constraint in indexes[table]
+            ):
+                covered.append(candidate)
+                continue
+            table_stat = stats.get(table, TableStats(0, None, None, None))
+            missing.append((candidate, table_stat, estimate_impact(table_stat)))
+    order = {"high": 0, "medium": 1, "low": 2}
+    missing.sort(
+        key=lambda row: (order[row[2]], -row[1].rows, row[0].model._meta.db_table)
+    )
+    return missing, covered
+
+
+def index_name(candidate):
+    table = candidate.model._meta.db_table
+    digest = hashlib.md5(
+        f"{table}:{candidate.method}:{','.join(candidate.columns)}".encode()
+    ).hexdigest()[:6]
+    suffix = "idx" if candidate.method == BTREE else "trgm"
+    # PostgreSQL truncates identifiers past 63 characters.
+    return f"{'_'.join([table, *candidate.columns])[:50]}_{digest}_{suffix}"
+
+
+def index_definition(candidate):
+    if candidate.method == BTREE:
+        return "(%s)" % ", ".join(f'"{column}"' for column in candidate.columns)
+    (column,) = candidate.columns
+    if candidate.method == TRIGRAM:
+        return f'USING gin ("{column}" gin_trgm_ops)'
+    return f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+
+
+MIGRATION_TEMPLATE = """\
+# Generated by Django {version} on {timestamp}
+
+{imports}from django.db import migrations
+
+# Written by the audit_indexes command for what the admin filters, sorts and
+# searches on. They are kept out of Meta.indexes, so GIN indexes can stay
+# PostgreSQL-only, and PostgreSQL builds them all concurrently, without
+# blocking writes: hence a non-atomic migration.
+INDEXES = {{
+{indexes}
+}}
+
+
+def create_indexes(apps, schema_editor):
+    postgresql = schema_editor.connection.vendor == "postgresql"
+    concurrently = "CONCURRENTLY " if postgresql else ""
+    for name, (table, definition, postgresql_only) in INDEXES.items():
+        if postgresql or not postgresql_only:
+            schema_editor.execute(
+                f'CREATE INDEX {{concurrently}}IF NOT EXISTS "{{name}}" '
+                f'ON "{{table}}" {{definition}}'
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    postgresql = schema_editor.connection.vendor == "postgresql"
+    concurrently = "CONCURRENTLY " if postgresql else ""
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX {{concurrently}}IF EXISTS "{{name}}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        {dependencies}
+    ]
+
+    operations = [
+        {operations}
+    ]
+"""
+
+
+def migration_source(candidates, dependencies):
+    trigram = any(candidate.method != BTREE for candidate in candidates)
+    operations = ["migrations.RunPython(create_indexes, drop_indexes),"]
+    if trigram:
+        operations.insert(0, "TrigramExtension(),")
+    return MIGRATION_TEMPLATE.format(
+        version=django.get_version(),
+        timestamp=timezone.now().strftime("%Y-%m-%d %H:%M"),
+        imports="from django.contrib.postgres.operations import TrigramExtension\n"
+        if trigram
+        else "",
+        indexes="\n".join(
+            f"    {index_name(candidate)!r}: ({candidate.model._meta.db_table!r}, "
+            f"{index_definition(candidate)!r}, {candidate.method != BTREE!r}),"
+            for candidate in candidates
+        ),
+        dependencies="\n        ".join(f"{node!r}," for node in dependencies),
+        operations="\n        ".join(operations),
+    )
+
+
+def write_migrations(candidates):
+    """
+    One migration per app creating the indexes of ``candidates``, after the
+    app's latest migration. Returns the paths written.
+    """
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    by_app = {}
+    for candidate in candidates:
+        by_app.setdefault(candidate.model._meta.app_config, []).append(candidate)
+    paths = []
+    for app_config, app_candidates in by_app.items():
+        leaves = loader.graph.leaf_nodes(app_config.label)
+        if not leaves:
+            continue
+        number = max(
+            MigrationAutodetector.parse_number(name) or 0 for _, name in leaves
+        )
+        path = os.path.join(
+            app_config.path, "migrations", f"{number + 1:04d}_audit_indexes.py"
+        )
+        with open(path, "w") as migration:
+            migration.write(migration_source(app_candidates, leaves))
+        paths.append(path)
+    if paths:
+        run_formatters(paths)
+    return paths
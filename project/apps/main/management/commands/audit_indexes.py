@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.main.admin import custom_admin_site
+from apps.main.indexaudit import audit, index_name, write_migrations
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the columns the CRS admin filters, sorts and searches on against "
+        "the database's indexes, and propose the missing ones with an estimate "
+        "of their impact from table sizes and, on PostgreSQL, seq scan counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--write",
+            action="store_true",
+            help="Write a migration per app creating the proposed indexes.",
+        )
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=0,
+            help="Only propose indexes on tables with at least this many rows.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        missing, covered = audit(custom_admin_site)
+        missing = [row for row in missing if row[1].rows >= options["min_rows"]]
+
+        for candidate, stats, impact in missing:
+            scans = ""
+            if stats.seq_scan is not None:
+                scans = (
+                    f", {stats.seq_scan} seq scans reading {stats.seq_tup_read} "
+                    f"rows, {stats.idx_scan or 0} index scans"
+                )
+            self.stdout.write(
+                f"{impact:<6} {candidate.model._meta.db_table} "
+                f"({', '.join(candidate.columns)}) {candidate.method}: "
+                f"{stats.rows} rows{scans}\n"
+                f"       {index_name(candidate)} for {', '.join(candidate.sources)}"
+            )
+        if options["verbosity"] > 1:
+            for candidate in covered:
+                self.stdout.write(
+                    f"ok     {candidate.model._meta.db_table} "
+                    f"({', '.join(candidate.columns)}) {candidate.method}"
+                )
+
+        if options["write"]:
+            for path in write_migrations([row[0] for row in missing]):
+                self.stdout.write(f"Wrote {path}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(missing)} missing and {len(covered)} existing indexes "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from apps.main.sampledata import SampleDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Add a synthetic dataset of about --persons community persons, with "
+        "the geography, households, bank accounts and tenements around them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--persons", type=int, default=10000)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Same seed, same data. Use a new seed to load another set.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        generator = SampleDataGenerator(
+            options["persons"], options["seed"], options["batch_size"]
+        )
+        try:
+            created = generator.run()
+        except IntegrityError as error:
+            raise CommandError(
+                f"Seed {options['seed']} has already been loaded: {error}"
+            )
+        summary = ", ".join(f"{count} {name}" for name, count in created.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {summary} in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,152 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from apps.main.benchmarks import (
+    BENCHMARKS,
+    CASCADE,
+    compare,
+    current_commit,
+    run_benchmarks,
+)
+from apps.main.sampledata import SampleDataGenerator
+
+SCALES = (10000, 100000, 1000000)
+# Benchmarks clear and fill the cache, so they get their own rather than the
+# file cache the running site shares.
+BENCHMARK_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the key admin pages, lookups and exports against generated "
+        "data at each --persons scale, in a throwaway test database, and "
+        "write latencies and query counts as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--persons",
+            type=int,
+            action="append",
+            help=f"Scale to run at; repeat for more. Defaults to {SCALES}.",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--benchmark",
+            action="append",
+            choices=[name for name, _ in BENCHMARKS] + ["cascade"],
+            help="Only run this benchmark; repeat for more. cascade runs the "
+            "chained location lookups.",
+        )
+        parser.add_argument(
+            "--conn-max-age",
+            type=int,
+            help="Open and close connections around each request as a server "
+            "would with this CONN_MAX_AGE, so connecting is timed too. Compare "
+            "a run with 0 against one with the configured value.",
+        )
+        parser.add_argument(
+            "--existing",
+            action="store_true",
+            help="Benchmark the configured database as it is, without "
+            "generating data.",
+        )
+        parser.add_argument(
+            "--output", help="JSON file; defaults to benchmarks/<commit>.json."
+        )
+        parser.add_argument("--compare", help="Earlier JSON output to compare with.")
+
+    def handle(self, *args, **options):
+        if options["benchmark"] and "cascade" in options["benchmark"]:
+            options["benchmark"] = [
+                name for name in options["benchmark"] if name != "cascade"
+            ] + CASCADE
+        previous = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as file:
+                    previous = json.load(file)["runs"]
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f"Cannot read {options['compare']}: {error}")
+
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            if options["existing"]:
+                runs = [self.run(None, options)]
+            else:
+                runs = self.run_generated(options)
+
+        commit = current_commit()
+        output = options["output"] or os.path.join(
+            settings.BASE_DIR, "benchmarks", f"{commit or 'results'}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as file:
+            json.dump(
+                {
+                    "commit": commit,
+                    "created": timezone.now().isoformat(),
+                    "database": connection.vendor,
+                    "repeat": options["repeat"],
+                    "conn_max_age": options["conn_max_age"],
+                    "runs": runs,
+                },
+                file,
+                indent=2,
+            )
+        if previous is not None:
+            for row in compare(previous, runs):
+                self.stdout.write(
+                    f"{row['persons'] or '-':>8} {row['name']:<32} "
+                    f"{row['previous_ms']:>9.1f} -> {row['median_ms']:>9.1f} ms "
+                    f"({row['change']:+.0%}), "
+                    f"{row['previous_queries']} -> {row['queries']} queries "
+                    f"(cold {row['previous_cold_ms']:.1f} -> {row['cold_ms']:.1f} ms)"
+                )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
+
+    def run_generated(self, options):
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        setup_test_environment(debug=False)
+        old_config = runner.setup_databases()
+        try:
+            return [
+                self.run(persons, options) for persons in options["persons"] or SCALES
+            ]
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def run(self, persons, options):
+        load_s = None
+        if persons is not None:
+            call_command("flush", interactive=False, verbosity=0)
+            started = time.monotonic()
+            SampleDataGenerator(persons, options["seed"]).run()
+            load_s = round(time.monotonic() - started, 1)
+            self.stdout.write(f"Loaded {persons} persons in {load_s}s")
+        results = run_benchmarks(
+            options["repeat"], options["benchmark"], options["conn_max_age"]
+        )
+        for row in results:
+            self.stdout.write(
+                f"{persons or '-':>8} {row['name']:<32} {row['median_ms']:>9.1f} ms "
+                f"{row['queries']:>4} queries (cold {row['cold_ms']:.1f} ms, "
+                f"{row['cold_queries']} queries)"
+            )
+        return {"persons": persons, "load_s": load_s, "results": results}
@@ -0,0 +1,276 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.utils.functional import cached_property
+
+# How many pages back KeysetPaginator looks for a remembered boundary.
+SEEK_WINDOW = 10
+BOUNDARY_TIMEOUT = 60 * 60
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Use PostgreSQL planner estimates instead of COUNT(*) for big result sets.
+
+    Unfiltered querysets read ``pg_class.reltuples``; filtered ones take the
+    row estimate from EXPLAIN. Below ``estimate_threshold`` rows, or on other
+    databases, the exact count is used.
+    """
+
+    estimate_threshold = 100000
+    is_estimated = False
+
+    def estimated_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+            else:
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        estimate = row[0]
+        if not isinstance(estimate, int):
+            if isinstance(estimate, str):
+                estimate = json.loads(estimate)
+            estimate = estimate[0]["Plan"]["Plan Rows"]
+        # reltuples is -1 for tables that have never been analysed.
+        return int(estimate) if estimate >= 0 else None
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is None or estimate < self.estimate_threshold:
+            return super().count
+        self.is_estimated = True
+        return estimate
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # An estimate can undershoot; let the page come back short instead.
+            if self.is_estimated and number > 1:
+                return number
+            raise
+
+
+class KeysetPaginator(EstimatedCountPaginator):
+    """
+    Seek to a page from the last row of a page shown before it.
+
+    Each rendered page remembers its last row's ordering values. A request
+    for page ``n`` filters past the nearest remembered boundary instead of
+    scanning an OFFSET from the start, so stepping through deep pages costs
+    the same as page 1. Orderings that cannot be expressed as field paths
+    (random, arbitrary expressions) fall back to plain OFFSET paging.
+    """
+
+    @cached_property
+    def keys(self):
+        query = self.object_list.query
+        keys = {}
+        for part in query.order_by:
+            resolved = _resolve_ordering(self.object_list.model, query, part)
+            if resolved is None:
+                return None
+            for path, descending in resolved:
+                # A repeated path can no longer change the order.
+                keys.setdefault(path, descending)
+        return list(keys.items()) or None
+
+    @cached_property
+    def ordered_list(self):
+        ordering = [
+            F(path).desc(nulls_first=True)
+            if descending
+            else F(path).asc(nulls_last=True)
+            for path, descending in self.keys
+        ]
+        return self.object_list.annotate(
+            **{f"_keyset_{i}": F(path) for i, (path, _) in enumerate(self.keys)}
+        ).order_by(*ordering)
+
+    @cached_property
+    def cache_prefix(self):
+        sql, params = self.ordered_list.query.sql_with_params()
+        digest = hashlib.sha1(f"{sql}{params}{self.per_page}".encode()).hexdigest()
+        return f"crs:keyset:{digest}"
+
+    def page(self, number):
+        if not self.keys:
+            return super().page(number)
+        number = self.validate_number(number)
+        start, after = self._nearest_boundary(number)
+        object_list = self.ordered_list
+        if after is not None:
+            object_list = object_list.filter(_seek_filter(self.keys, after))
+        size = self.per_page
+        if not self.is_estimated:
+            remaining = self.count - (number - 1) * self.per_page
+            if remaining <= self.per_page + self.orphans:
+                size = remaining
+        bottom = (number - 1 - start) * self.per_page
+        object_list = object_list[bottom : bottom + size]
+        rows = list(object_list)
+        if rows:
+            self._remember(number, rows[-1])
+        return self._get_page(object_list, number, self)
+
+    def _key(self, row):
+        return [getattr(row, f"_keyset_{i}") for i in range(len(self.keys))]
+
+    def _remember(self, number, last):
+        key = self._key(last)
+        cache.set(f"{self.cache_prefix}:{number}", key, BOUNDARY_TIMEOUT)
+        return key
+
+    def _nearest_boundary(self, number):
+        # Returns the page whose last row we can seek past, and that row's key.
+        candidates = range(number - 1, max(number - 1 - SEEK_WINDOW, 0), -1)
+        found = cache.get_many(f"{self.cache_prefix}:{page}" for page in candidates)
+        for page in candidates:
+            key = found.get(f"{self.cache_prefix}:{page}")
+            if key is not None:
+                return page, key
+        return 0, None
+
+
+class KeysetCursorPaginator(KeysetPaginator):
+    """
+    KeysetPaginator that never counts, for infinite-scroll widgets.
+
+    Each page reads one row more than it shows to learn whether another page
+    follows. ``cursor`` is the key of a page's last row when there is more;
+    passing it back as ``after`` seeks straight past that row.
+    """
+
+    def __init__(self, object_list, per_page, after=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.after = after
+        self.cursor = None
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        object_list, start, after = self.object_list, number - 1, None
+        if self.keys:
+            object_list = self.ordered_list
+            if self.after is not None:
+                after = self.after
+            else:
+                start, after = self._nearest_boundary(number)
+            if after is not None:
+                object_list = object_list.filter(_seek_filter(self.keys, after))
+        else:
+            start = 0
+        bottom = (number - 1 - start) * self.per_page
+        rows = list(object_list[bottom : bottom + self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        # Enough for Page.has_next() without a COUNT(*).
+        self.count = (number - 1) * self.per_page + len(rows) + more
+        if rows and self.keys:
+            if self.after is None:
+                key = self._remember(number, rows[-1])
+            else:
+                # Page numbers are relative to the cursor; don't cache them.
+                key = self._key(rows[-1])
+            self.cursor = key if more else None
+        return self._get_page(rows, number, self)
+
+
+def _resolve_ordering(model, query, part, depth=0):
+    # Turn one order_by() entry into (field path, descending) pairs, following
+    # related models' Meta.ordering the way the ORM does.
+    if isinstance(part, OrderBy) and isinstance(part.expression, F):
+        name, descending = part.expression.name, part.descending
+    elif isinstance(part, F):
+        name, descending = part.name, False
+    elif isinstance(part, str) and part != "?":
+        descending = part.startswith("-")
+        name = part.lstrip("-+")
+    else:
+        return None
+    if depth == 0 and name in query.annotations:
+        return [(name, descending)]
+    if name == "pk":
+        return [(model._meta.pk.attname, descending)]
+
+    current = model
+    parts = name.split("__")
+    field = None
+    for i, field_name in enumerate(parts):
+        try:
+            field = current._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            return None
+        if field.many_to_many or field.one_to_many or not field.concrete:
+            return None
+        if field.is_relation and i < len(parts) - 1:
+            current = field.related_model
+    if not field.is_relation:
+        return [(name, descending)]
+    if field.attname == parts[-1] or depth > 2:
+        return [(name, descending)]
+
+    related = field.related_model
+    related_ordering = related._meta.ordering
+    if not related_ordering:
+        return [(f"{name}__{related._meta.pk.attname}", descending)]
+    resolved = []
+    for related_part in related_ordering:
+        if not isinstance(related_part, str):
+            return None
+        related_descending = related_part.startswith("-")
+        nested = _resolve_ordering(related, query, related_part.lstrip("-"), depth + 1)
+        if nested is None:
+            return None
+        for path, nested_descending in nested:
+            flipped = descending ^ related_descending ^ nested_descending
+            resolved.append((f"{name}__{path}", flipped))
+    return resolved
+
+
+def _seek_filter(keys, values):
+    # Rows strictly after ``values`` in an ordering where NULLs sort last
+    # ascending and first descending (PostgreSQL's default).
+    condition = Q(pk__in=[])
+    equal = Q()
+    for (path, descending), value in zip(keys, values):
+        if descending:
+            after = Q(**{f"{path}__isnull": False})
+            if value is not None:
+                after = Q(**{f"{path}__lt": value})
+        else:
+            after = Q(pk__in=[])
+            if value is not None:
+                after = Q(**{f"{path}__gt": value}) | Q(**{f"{path}__isnull": True})
+        condition |= equal & after
+        if value is None:
+            equal &= Q(**{f"{path}__isnull": True})
+        else:
+            equal &= Q(**{path: value})
+    return condition
@@ -0,0 +1,209 @@
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger("crs.perf")
+
+
+class RequestLog:
+    """
+    Bounded per-process buffer of recent request records.
+
+    Only the newest ``CRS_PERF_BUFFER_SIZE`` requests are kept, so memory
+    stays flat no matter how long the process runs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = deque(maxlen=getattr(settings, "CRS_PERF_BUFFER_SIZE", 500))
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.records)
+
+    def summary(self):
+        # One row per (URL pattern, ModelAdmin), slowest average first.
+        groups = {}
+        for record in self.snapshot():
+            key = (record["route"], record["model_admin"])
+            group = groups.setdefault(
+                key,
+                {
+                    "route": record["route"],
+                    "model_admin": record["model_admin"],
+                    "requests": 0,
+                    "total_ms": 0,
+                    "max_ms": 0,
+                    "queries": 0,
+                    "db_ms": 0,
+                    "duplicates": 0,
+                },
+            )
+            group["requests"] += 1
+            group["total_ms"] += record["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], record["duration_ms"])
+            group["queries"] += record["query_count"]
+            group["db_ms"] += record["db_ms"]
+            group["duplicates"] = max(group["duplicates"], record["duplicates"])
+        rows = []
+        for group in groups.values():
+            requests = group["requests"]
+            group["avg_ms"] = group["total_ms"] / requests
+            group["avg_queries"] = group["queries"] / requests
+            group["avg_db_ms"] = group["db_ms"] / requests
+            rows.append(group)
+        return sorted(rows, key=lambda row: row["avg_ms"], reverse=True)
+
+
+request_log = RequestLog()
+
+
+def _frames():
+    # The calling frames as bare (file, line, function) tuples; formatting
+    # waits until the request turns out to be slow.
+    frame, frames = sys._getframe(2), []
+    while frame is not None:
+        frames.append((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    return frames
+
+
+def _app_stack(frames):
+    # Only our own frames: the admin or view code that issued the query.
+    base = str(settings.BASE_DIR)
+    return [
+        f"{filename}:{lineno} in {name}"
+        for filename, lineno, name in reversed(frames)
+        if filename.startswith(base)
+        and "site-packages" not in filename
+        and filename != __file__
+    ]
+
+
+def _params_key(params, many):
+    # Compares parameters for the duplicate count without repr()ing them.
+    if many:
+        return id(params)
+    try:
+        return hash(tuple(params.items() if isinstance(params, dict) else params))
+    except TypeError:
+        return repr(params)
+
+
+class QueryRecorder:
+    # Installed with connection.execute_wrapper() for the length of a request.
+    def __init__(self, capture_stacks):
+        self.capture_stacks = capture_stacks
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "sql": sql,
+                    "params": params,
+                    "key": _params_key(params or (), many),
+                    "ms": (time.perf_counter() - started) * 1000,
+                    "frames": _frames() if self.capture_stacks else [],
+                }
+            )
+
+
+class PerfMiddleware:
+    """
+    Record latency, query count, DB time and repeated queries per request.
+
+    Opt in with ``CRS_PERF_ENABLED = True``. Requests slower than
+    ``CRS_PERF_SLOW_MS`` keep their SQL, and with ``CRS_PERF_CAPTURE_STACKS``
+    the app frames that issued each query, and are logged to the ``crs.perf``
+    logger. Walking the stack on every query costs time on query-heavy pages,
+    so stacks are off by default. Results are shown at
+    ``/crs/_perf/``. Queries run while a streaming response is consumed are
+    not counted.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "CRS_PERF_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "CRS_PERF_SLOW_MS", 500)
+
+    def __call__(self, request):
+        recorder = QueryRecorder(getattr(settings, "CRS_PERF_CAPTURE_STACKS", False))
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.record(request, response, recorder.queries, duration_ms)
+        return response
+
+    def record(self, request, response, queries, duration_ms):
+        match = request.resolver_match
+        model_admin = getattr(match.func, "model_admin", None) if match else None
+        exact = Counter((query["sql"], query["key"]) for query in queries)
+        similar = Counter(query["sql"] for query in queries)
+        slow = duration_ms >= self.slow_ms
+        record = {
+            "time": timezone.now(),
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "route": match.route if match else request.path,
+            "model_admin": str(model_admin) if model_admin else "",
+            "duration_ms": duration_ms,
+            "query_count": len(queries),
+            "db_ms": sum(query["ms"] for query in queries),
+            "duplicates": sum(count - 1 for count in exact.values()),
+            "similar": [
+                (sql, count) for sql, count in similar.most_common(5) if count > 1
+            ],
+            "slow": slow,
+            "queries": [
+                {
+                    "sql": query["sql"],
+                    "params": repr(query["params"]),
+                    "ms": query["ms"],
+                    "stack": _app_stack(query["frames"]),
+                }
+                for query in queries
+            ]
+            if slow
+            else [],
+        }
+        request_log.add(record)
+        if slow:
+            logger.warning(
+                "Slow request %s %s: %.0f ms, %d queries (%.0f ms), %d duplicated\n%s",
+                request.method,
+                request.path,
+                duration_ms,
+                len(queries),
+                record["db_ms"],
+                record["duplicates"],
+                "\n".join(
+                    f"{query['ms']:.1f} ms {query['sql']}\n    "
+                    + "\n    ".join(query["stack"])
+                    for query in record["queries"]
+                ),
+            )
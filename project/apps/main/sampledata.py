@@ -0,0 +1,406 @@
+import math
+import random
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+
+from apps.community_context.counters import rebuild_household_counts
+from apps.community_context.models import (
+    CommunityPerson,
+    Dwelling,
+    Household,
+    HouseholdBankAccount,
+)
+from apps.community_context.rollups import refresh_rollups
+from apps.land.geometry import refresh_geometry
+from apps.land.portfolio import sync_portfolio
+from apps.land.models import (
+    LandTenement,
+    LandTenementAcquisition,
+    LandTenementRental,
+    LandTenementSurvey,
+    LandTenementSurveyPoint,
+    MiningTenement,
+    MiningTenementAcquisition,
+    MiningTenementRental,
+    MiningTenementSurvey,
+    MiningTenementSurveyPoint,
+)
+from .models import (
+    Bank,
+    Company,
+    District,
+    LocalLevelGovernment,
+    Province,
+    TrustRegion,
+    TrustVillage,
+)
+
+FIRST_NAMES = {
+    "M": "Kewa Pato Aki Jacob Peter John Paul Michael Kaluwin Timothy Simon "
+    "Yakali Ipatas Joseph David".split(),
+    "F": "Maria Anna Ruth Grace Lucy Martha Esther Kila Naomi Elizabeth Rose "
+    "Sarah Helen Miriam Janet".split(),
+}
+LAST_NAMES = (
+    "Pato Tom Ipatas Yakali Kaluwin Pundari Kiap Andaya Tumu Kambao Lakane "
+    "Waka Pokole Kange Yope Anga".split()
+)
+BANKS = [
+    ("Bank of South Pacific", "BSP", 10),
+    ("Westpac Bank", "WPC", 10),
+    ("Australia and New Zealand Bank", "ANZ", 10),
+    ("Kina Bank", "KB", 10),
+]
+
+HOUSEHOLDS_PER_VILLAGE = 400
+VILLAGES_PER_REGION = 20
+PERSONS_PER_LAND_TENEMENT = 1000
+PERSONS_PER_MINING_TENEMENT = 2000
+
+
+def _choices(model, field_name):
+    return [value for value, _ in model._meta.get_field(field_name).choices]
+
+
+class SampleDataGenerator:
+    """
+    Add a realistic synthetic dataset of about ``persons`` community persons,
+    with the geography, dwellings, households, bank accounts, tenements,
+    rentals and survey points around them.
+
+    Everything is written with ``bulk_create`` one trust village at a time,
+    so memory stays flat at any scale. The same ``seed`` gives the same
+    data; names are tagged with the seed, so runs with different seeds can
+    share a database.
+    """
+
+    def __init__(self, persons, seed=0, batch_size=5000):
+        self.persons = persons
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.tag = f"S{seed}"
+        self.created = Counter()
+        self.occupations = _choices(CommunityPerson, "occupation")
+        self.education_levels = _choices(CommunityPerson, "education_level")
+        self.dwelling_types = _choices(Dwelling, "dwelling_type")
+
+    def bulk_create(self, model, objects):
+        objects = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.created[model._meta.verbose_name_plural] += len(objects)
+        return objects
+
+    @transaction.atomic
+    def run(self):
+        households = max(1, self.persons // 5)
+        villages = -(-households // HOUSEHOLDS_PER_VILLAGE)
+        self.banks = self.ensure_banks()
+        self.create_geography(villages)
+        remaining = households
+        for village in self.villages:
+            count = min(remaining, HOUSEHOLDS_PER_VILLAGE)
+            self.create_village(village, count)
+            remaining -= count
+        self.create_tenements()
+        rebuild_household_counts(
+            Household.objects.filter(trust_village__in=self.villages)
+        )
+        refresh_rollups()
+        return self.created
+
+    def ensure_banks(self):
+        banks = []
+        for name, initials, length in BANKS:
+            bank, _ = Bank.objects.get_or_create(
+                bank_initials=initials,
+                defaults={"bank_name": name, "account_number_length": length},
+            )
+            banks.append(bank)
+        return banks
+
+    def create_geography(self, villages):
+        regions = -(-villages // VILLAGES_PER_REGION)
+        provinces = self.bulk_create(
+            Province,
+            [Province(name=f"Province {self.tag}-{i}") for i in range(max(2, regions))],
+        )
+        districts = self.bulk_create(
+            District,
+            [
+                District(name=f"District {self.tag}-{p}-{i}", province=province)
+                for p, province in enumerate(provinces)
+                for i in range(3)
+            ],
+        )
+        self.llgs = self.bulk_create(
+            LocalLevelGovernment,
+            [
+                LocalLevelGovernment(
+                    name=f"LLG {self.tag}-{d}-{i}",
+                    province_id=district.province_id,
+                    district=district,
+                )
+                for d, district in enumerate(districts)
+                for i in range(3)
+            ],
+        )
+        self.regions = self.bulk_create(
+            TrustRegion,
+            [TrustRegion(name=f"Trust Region {self.tag}-{i}") for i in range(regions)],
+        )
+        self.villages = []
+        for i in range(villages):
+            llg = self.random.choice(self.llgs)
+            self.villages.append(
+                TrustVillage(
+                    name=f"Trust Village {self.tag}-{i}",
+                    province_id=llg.province_id,
+                    district_id=llg.district_id,
+                    llg=llg,
+                    trust_region=self.regions[i // VILLAGES_PER_REGION],
+                )
+            )
+        self.villages = self.bulk_create(TrustVillage, self.villages)
+        self.companies = self.bulk_create(
+            Company,
+            [Company(name=f"Company {self.tag}-{i}") for i in range(10)],
+        )
+
+    def create_village(self, village, households):
+        region_id = village.trust_region_id
+        dwellings = self.bulk_create(
+            Dwelling,
+            [
+                Dwelling(
+                    trust_region_id=region_id,
+                    trust_village=village,
+                    dwelling_number=number,
+                    dwelling_type=self.random.choice(self.dwelling_types),
+                    construction_year=self.random.randint(1960, date.today().year),
+                )
+                for number in range(1, households + 1)
+            ],
+        )
+        homes = self.bulk_create(
+            Household,
+            [
+                Household(
+                    trust_region_id=region_id,
+                    trust_village=village,
+                    dwelling_number=dwelling,
+                    household_number=1,
+                    primary_income_source=self.random.choice(
+                        ["Farming", "Fishing", "Wages", "Royalties", "Business"]
+                    ),
+                )
+                for dwelling in dwellings
+            ],
+        )
+        persons, heads = [], []
+        for household in homes:
+            members = self.members(household, region_id, village.pk)
+            heads.append(members[0])
+            persons.extend(members)
+        self.bulk_create(CommunityPerson, persons)
+        for household, head in zip(homes, heads):
+            household.head_of_household_id = head.pk
+        Household.objects.bulk_update(
+            homes, ["head_of_household"], batch_size=self.batch_size
+        )
+        self.bulk_create(
+            HouseholdBankAccount,
+            [
+                self.bank_account(household, head)
+                for household, head in zip(homes, heads)
+                if self.random.random() < 0.7
+            ],
+        )
+
+    def members(self, household, region_id, village_id):
+        last_name = self.random.choice(LAST_NAMES)
+        sex = self.random.choice("MF")
+        plan = [("Head", sex, self.random.choice(["Young Adult", "Middle-aged Adult"]))]
+        if self.random.random() < 0.8:
+            plan.append(
+                (
+                    "Wife" if sex == "M" else "Husband",
+                    "F" if sex == "M" else "M",
+                    plan[0][2],
+                )
+            )
+        for _ in range(self.random.choices([0, 1, 2, 3, 4, 5], [1, 2, 3, 3, 2, 1])[0]):
+            child_sex = self.random.choice("MF")
+            plan.append(
+                (
+                    "Son" if child_sex == "M" else "Daughter",
+                    child_sex,
+                    self.random.choice(["Baby", "Child", "Teenage"]),
+                )
+            )
+        if self.random.random() < 0.15:
+            plan.append(("Parent", self.random.choice("MF"), "Old Age"))
+        return [
+            CommunityPerson(
+                first_name=self.random.choice(FIRST_NAMES[member_sex]),
+                last_name=last_name,
+                sex=member_sex,
+                relationship_to_head=relationship,
+                age_group=age_group,
+                date_of_birth=self.birth_date(age_group),
+                occupation=self.random.choice(self.occupations),
+                education_level=self.random.choice(self.education_levels),
+                trust_region_id=region_id,
+                trust_village_id=village_id,
+                dwelling_number_id=household.dwelling_number_id,
+                household_number=household,
+            )
+            for relationship, member_sex, age_group in plan
+        ]
+
+    def birth_date(self, age_group):
+        if self.random.random() < 0.3:
+            return None
+        low, high = {
+            "Baby": (0, 2),
+            "Child": (3, 12),
+            "Teenage": (13, 19),
+            "Young Adult": (20, 34),
+            "Middle-aged Adult": (35, 64),
+            "Old Age": (65, 90),
+        }[age_group]
+        return date.today() - timedelta(
+            days=self.random.randint(low * 365, high * 365 + 364)
+        )
+
+    def bank_account(self, household, head):
+        bank = self.random.choice(self.banks)
+        return HouseholdBankAccount(
+            household=household,
+            account_name=str(head),
+            account_number="".join(
+                self.random.choice("0123456789")
+                for _ in range(bank.account_number_length)
+            ),
+            bank_initials=bank,
+            branch="Porgera",
+            status=self.random.choice(["Active", "Active", "Active", "Dormant"]),
+        )
+
+    def create_tenements(self):
+        for model, fk, count, acquisition, rental, survey, point in (
+            (
+                LandTenement,
+                "land_tenement",
+                self.persons // PERSONS_PER_LAND_TENEMENT,
+                LandTenementAcquisition,
+                LandTenementRental,
+                (LandTenementSurvey, "land_tenement"),
+                (LandTenementSurveyPoint, "land_tenement_survey"),
+            ),
+            (
+                MiningTenement,
+                "mining_tenement",
+                self.persons // PERSONS_PER_MINING_TENEMENT,
+                MiningTenementAcquisition,
+                MiningTenementRental,
+                (MiningTenementSurvey, "mininig_tenement"),
+                (MiningTenementSurveyPoint, "mining_tenement_survey"),
+            ),
+        ):
+            tenements = self.bulk_create(
+                model,
+                [self.tenement(model, i) for i in range(max(1, count))],
+            )
+            self.bulk_create(
+                acquisition,
+                [self.acquisition(acquisition, fk, tenement) for tenement in tenements],
+            )
+            self.bulk_create(
+                rental,
+                [
+                    rental(
+                        **{fk: tenement},
+                        payment_date=date.today() - timedelta(days=365 * year),
+                        amount_paid=Decimal(self.random.randint(1000, 50000)),
+                        payment_method="Bank Transfer",
+                        payment_status="Completed",
+                    )
+                    for tenement in tenements
+                    for year in range(4)
+                ],
+            )
+            survey_model, survey_fk = survey
+            surveys = self.bulk_create(
+                survey_model,
+                [
+                    survey_model(
+                        **{survey_fk: tenement},
+                        survey_date=date.today()
+                        - timedelta(days=self.random.randint(0, 3650)),
+                        surveyor_name="Sample Surveyor",
+                    )
+                    for tenement in tenements
+                ],
+            )
+            point_model, point_fk = point
+            self.bulk_create(
+                point_model,
+                [
+                    point_model(
+                        **{point_fk: survey},
+                        sequence=sequence,
+                        latitude=latitude,
+                        longitude=longitude,
+                    )
+                    for survey in surveys
+                    for sequence, (latitude, longitude) in enumerate(self.polygon())
+                ],
+            )
+            refresh_geometry(
+                survey_model,
+                survey_model.objects.filter(pk__in=[survey.pk for survey in surveys]),
+            )
+            sync_portfolio(model, [tenement.pk for tenement in tenements])
+
+    def tenement(self, model, number):
+        llg = self.random.choice(self.llgs)
+        return model(
+            title=f"{model._meta.verbose_name} {self.tag}-{number}",
+            land_name=f"Land {self.tag}-{number}",
+            province_id=llg.province_id,
+            district_id=llg.district_id,
+            llg=llg,
+            lease_holder=self.random.choice(self.companies),
+            type_of_tenement=self.random.choice(_choices(model, "type_of_tenement")),
+        )
+
+    def acquisition(self, model, fk, tenement):
+        start = date.today() - timedelta(days=self.random.randint(0, 3650))
+        return model(
+            **{fk: tenement},
+            acquisition_date=start,
+            start_date=start,
+            duration_years=self.random.choice([10, 25, 40, 99]),
+            purchase_price=Decimal(self.random.randint(10000, 5000000)),
+            rental_amount=Decimal(self.random.randint(1000, 50000)),
+            rental_due_date=date.today()
+            + timedelta(days=self.random.randint(-90, 365)),
+        )
+
+    def polygon(self):
+        # A rough convex outline of 12 points around Porgera.
+        latitude = -5.47 + self.random.uniform(-0.2, 0.2)
+        longitude = 143.13 + self.random.uniform(-0.2, 0.2)
+        radius = self.random.uniform(0.001, 0.02)
+        points = []
+        for i in range(12):
+            angle = 2 * math.pi * i / 12
+            points.append(
+                (
+                    Decimal(f"{latitude + radius * math.cos(angle):.6f}"),
+                    Decimal(f"{longitude + radius * math.sin(angle):.6f}"),
+                )
+            )
+        return points
@@ -0,0 +1,115 @@
+from functools import reduce
+from operator import add, and_, or_
+
+from django.contrib.admin.utils import get_fields_from_path, lookup_spawns_duplicates
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.exceptions import ValidationError
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+
+def uses_trigrams(model):
+    return connections[router.db_for_read(model)].vendor == "postgresql"
+
+
+def trigram_filter(model, fields, search_term):
+    """
+    Require every word of ``search_term`` to be close to one of ``fields``.
+
+    On PostgreSQL a word matches by trigram similarity to the whole value
+    (``%``) or to part of it (``%>``), so misspellings and partly typed
+    names both match, and a ``gin_trgm_ops`` index serves either operator.
+    Other databases fall back to ``icontains``.
+    """
+    lookups = ["icontains"]
+    if uses_trigrams(model):
+        lookups = ["trigram_similar", "trigram_word_similar"]
+    return reduce(
+        and_,
+        (
+            reduce(
+                or_,
+                (
+                    Q(**{f"{field}__{lookup}": word})
+                    for field in fields
+                    for lookup in lookups
+                ),
+            )
+            for word in search_term.split()
+        ),
+        Q(),
+    )
+
+
+def lookup_filter(model, fields, search_term):
+    """
+    Match the whole of ``search_term`` against admin ``search_fields`` other
+    than the trigram ones: exactly for ``=field``, by prefix for ``^field``
+    and by containment otherwise. An exact value the field cannot hold, such
+    as a name for a number, matches nothing.
+    """
+    conditions = []
+    for name in fields:
+        path = name.lstrip("^=@")
+        if name.startswith("="):
+            field = get_fields_from_path(model, path)[-1]
+            try:
+                value = field.to_python(search_term)
+            except ValidationError:
+                continue
+            conditions.append(Q(**{f"{path}__exact": value}))
+        else:
+            lookup = "istartswith" if name.startswith("^") else "icontains"
+            conditions.append(Q(**{f"{path}__{lookup}": search_term}))
+    return reduce(or_, conditions, Q(pk__in=[]))
+
+
+def similarity_rank(fields, search_term):
+    # Sum over the words of each word's best word similarity to any field.
+    return reduce(
+        add,
+        (
+            Greatest(*(TrigramWordSimilarity(word, field) for field in fields))
+            if len(fields) > 1
+            else TrigramWordSimilarity(word, fields[0])
+            for word in search_term.split()
+        ),
+    )
+
+
+class TrigramSearchMixin:
+    """
+    Fuzzy changelist search over ``trigram_fields``, best match first.
+
+    Replaces the lookups of the ``search_fields`` it names when set; the
+    others still match the whole term, typically exactly or by prefix on a
+    number. Choosing a column sort replaces the ranking, as with any other
+    default ordering.
+    """
+
+    trigram_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not self.trigram_fields or not search_term.split():
+            return super().get_search_results(request, queryset, search_term)
+        condition = trigram_filter(self.model, self.trigram_fields, search_term)
+        others = [
+            name
+            for name in self.get_search_fields(request)
+            if name.lstrip("^=@") not in self.trigram_fields
+        ]
+        if others:
+            condition |= lookup_filter(self.model, others, search_term)
+        may_have_duplicates = any(
+            lookup_spawns_duplicates(self.opts, name.lstrip("^=@")) for name in others
+        )
+        return queryset.filter(condition), may_have_duplicates
+
+    def get_ordering(self, request):
+        ordering = super().get_ordering(request)
+        search_term = request.GET.get("q", "").strip()
+        if self.trigram_fields and search_term and uses_trigrams(self.model):
+            rank = similarity_rank(self.trigram_fields, search_term)
+            return [rank.desc(), *ordering]
+        return ordering
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .cache import LOOKUPS, bump_version
+from .models import (
+    District,
+    LocalLevelGovernment,
+    Province,
+    TrustRegion,
+    TrustVillage,
+    Village,
+)
+
+LOOKUP_MODELS = (
+    Province,
+    District,
+    LocalLevelGovernment,
+    Village,
+    TrustVillage,
+    TrustRegion,
+)
+
+
+def invalidate_lookups(sender, **kwargs):
+    # Bumping before commit would let a concurrent request cache the old rows
+    # under the new version.
+    transaction.on_commit(lambda: bump_version(LOOKUPS))
+
+
+for model in LOOKUP_MODELS:
+    post_save.connect(invalidate_lookups, sender=model)
+    post_delete.connect(invalidate_lookups, sender=model)
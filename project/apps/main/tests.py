@@ -1,3 +1,379 @@
-from django.test import TestCase
+import io
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from apps.community_context.models import CommunityPerson, Household
+from .admin import custom_admin_site
+from .benchmarks import run_benchmarks
+from .dbpool.base import ConnectionPool
+from .indexaudit import BTREE, admin_candidates, audit, migration_source
+from .perf import request_log
+from .sampledata import SampleDataGenerator
+from .models import (
+    Clan,
+    District,
+    LocalLevelGovernment,
+    Province,
+    Tribe,
+    TrustRegion,
+    TrustVillage,
+    Village,
+)
 
 # Create your tests here.
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class LookupViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.province = Province.objects.create(name="Enga")
+        District.objects.create(name="Porgera", province=self.province)
+        self.url = reverse("get_districts_by_province")
+        self.params = {"province_id": self.province.pk}
+
+    def test_repeated_lookup_is_served_from_cache(self):
+        self.client.get(self.url, self.params)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, self.params)
+        self.assertEqual(response.json()[0]["name"], "Porgera")
+
+    def test_matching_etag_returns_not_modified(self):
+        response = self.client.get(self.url, self.params)
+        self.assertTrue(response.has_header("Last-Modified"))
+        response = self.client.get(
+            self.url, self.params, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_saving_a_district_invalidates_the_lookup(self):
+        etag = self.client.get(self.url, self.params)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            District.objects.create(name="Wabag", province=self.province)
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_trust_regions(self):
+        response = self.client.get(reverse("get_trust_regions"))
+        self.assertEqual(response.json(), [])
+
+    def test_hierarchy_bundle_is_columnar_and_versioned(self):
+        url = reverse("get_hierarchy_bundle")
+        bundle = self.client.get(url, self.params).json()
+        self.assertEqual(bundle["provinces"]["name"], ["Enga"])
+        self.assertEqual(bundle["districts"]["province_id"], [self.province.pk])
+
+        response = self.client.get(url, {"version": bundle["version"]})
+        self.assertEqual(
+            response.json(), {"version": bundle["version"], "changed": False}
+        )
+
+
+class ChangeListQueryBudgetMixin:
+    # Session, user, counts, filters and prefetches; none of it per row.
+    query_budget = 15
+
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(user)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertChangeListWithinBudget(self, url, add_rows):
+        add_rows(5)
+        few = self.changelist_queries(url)
+        add_rows(20)
+        many = self.changelist_queries(url)
+        self.assertEqual(few, many, f"{url} makes queries per row")
+        self.assertLessEqual(many, self.query_budget)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class MainChangeListQueryTests(ChangeListQueryBudgetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.province = Province.objects.create(name="Enga")
+        self.district = District.objects.create(name="Porgera", province=self.province)
+        self.llg = LocalLevelGovernment.objects.create(
+            name="Porgera Rural", province=self.province, district=self.district
+        )
+        self.region = TrustRegion.objects.create(name="Upper Porgera")
+        self.tribe = Tribe.objects.create(name="Ipili", province=self.province)
+        self.created = 0
+
+    def location(self):
+        self.created += 1
+        return {
+            "name": f"Place {self.created}",
+            "province": self.province,
+            "district": self.district,
+            "llg": self.llg,
+        }
+
+    def add_villages(self, count):
+        for _ in range(count):
+            Village.objects.create(**self.location())
+
+    def add_trust_villages(self, count):
+        for _ in range(count):
+            TrustVillage.objects.create(trust_region=self.region, **self.location())
+
+    def add_llgs(self, count):
+        for _ in range(count):
+            location = self.location()
+            del location["llg"]
+            LocalLevelGovernment.objects.create(**location)
+
+    def add_clans(self, count):
+        for _ in range(count):
+            clan = Clan.objects.create(tribe=self.tribe, **self.location())
+            clan.village.add(Village.objects.create(**self.location()))
+            clan.trust_village.add(TrustVillage.objects.create(**self.location()))
+
+    def test_village_changelist(self):
+        self.assertChangeListWithinBudget(
+            reverse("crs:main_village_changelist"), self.add_villages
+        )
+
+    def test_trust_village_changelist(self):
+        self.assertChangeListWithinBudget(
+            reverse("crs:main_trustvillage_changelist"), self.add_trust_villages
+        )
+
+    def test_llg_changelist(self):
+        self.assertChangeListWithinBudget(
+            reverse("crs:main_locallevelgovernment_changelist"), self.add_llgs
+        )
+
+    def test_clan_changelist(self):
+        self.assertChangeListWithinBudget(
+            reverse("crs:main_clan_changelist"), self.add_clans
+        )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        for name in ("=HYPERLINK(1)", "-2+3", "Enga"):
+            Province.objects.create(name=name)
+
+    def test_link_only_on_the_crs_site(self):
+        link = reverse("crs:export", args=["main", "province"])
+        response = self.client.get(reverse("crs:main_province_changelist"))
+        self.assertContains(response, link)
+        response = self.client.get(reverse("admin:main_province_changelist"))
+        self.assertNotContains(response, link)
+
+    def test_formulas_are_escaped_and_missing_formats_refused(self):
+        url = reverse("crs:export", args=["main", "province"])
+        response = self.client.get(url, {"o": "1"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [line.split(",")[0] for line in lines[1:]],
+            ["'-2+3", "'=HYPERLINK(1)", "Enga"],
+        )
+
+        with mock.patch("apps.main.exports.FORMATS", ("csv",)):
+            response = self.client.get(url, {"format": "xlsx"})
+        self.assertContains(response, "Install openpyxl", status_code=400)
+        response = self.client.get(url, {"format": "pdf"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CRS_PERF_ENABLED=True,
+    CRS_PERF_SLOW_MS=0,
+)
+class PerfMiddlewareTests(TestCase):
+    def setUp(self):
+        request_log.clear()
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+
+    def test_records_queries_per_model_admin(self):
+        Province.objects.create(name="Enga")
+        with self.assertLogs("crs.perf", "WARNING"):
+            self.client.get(reverse("crs:main_province_changelist"))
+        record = request_log.snapshot()[-1]
+        self.assertEqual(record["model_admin"], "main.ProvinceAdmin")
+        self.assertGreater(record["query_count"], 0)
+        self.assertTrue(record["slow"])
+        self.assertEqual(len(record["queries"]), record["query_count"])
+        self.assertEqual(record["queries"][0]["stack"], [])
+
+        with self.settings(CRS_PERF_CAPTURE_STACKS=True), self.assertLogs("crs.perf"):
+            self.client.get(reverse("crs:main_province_changelist"))
+        queries = request_log.snapshot()[-1]["queries"]
+        self.assertTrue(any(query["stack"] for query in queries))
+
+        with self.assertLogs("crs.perf", "WARNING"):
+            response = self.client.get(reverse("crs:perf"))
+        self.assertContains(response, "main.ProvinceAdmin")
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.region = TrustRegion.objects.create(name="Upper Porgera")
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+
+    def add_person(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CommunityPerson.objects.create(
+                first_name="Kewa",
+                last_name="Pato",
+                sex="M",
+                relationship_to_head="Head",
+                age_group="Young Adult",
+                trust_region=self.region,
+            )
+
+    def test_tiles_are_cached_until_a_save(self):
+        self.add_person()
+        response = self.client.get(reverse("crs:index"))
+        self.assertIn(("Upper Porgera", 1), response.context["tiles"][0]["rows"])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("crs:index"))
+        self.assertFalse(
+            any("community_context_demographicrollup" in q["sql"] for q in queries)
+        )
+
+        self.add_person()
+        response = self.client.get(reverse("crs:index"))
+        self.assertIn(("Upper Porgera", 2), response.context["tiles"][0]["rows"])
+        self.assertContains(response, "Benefits allocated and distributed")
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class SampleDataTests(TestCase):
+    def test_generates_consistent_data_to_benchmark(self):
+        created = SampleDataGenerator(persons=500, seed=1).run()
+        self.assertEqual(created["Households"], 100)
+        self.assertEqual(CommunityPerson.objects.count(), created["Community Person"])
+        self.assertFalse(Household.objects.filter(member_count=0).exists())
+        self.assertFalse(Household.objects.filter(head_of_household=None).exists())
+
+        results = run_benchmarks(
+            repeat=1, names=["person changelist", "household change form"]
+        )
+        self.assertEqual([row["status"] for row in results], [200, 200])
+        self.assertGreater(results[0]["queries"], 0)
+
+
+class IndexAuditTests(TestCase):
+    def test_proposes_composites_for_filters_in_changelist_order(self):
+        candidates = {
+            (candidate.model._meta.db_table, candidate.method, candidate.columns)
+            for candidate in admin_candidates(custom_admin_site)
+        }
+        self.assertIn(
+            (
+                "land_landtenementrental",
+                BTREE,
+                ("payment_status", "payment_date"),
+            ),
+            candidates,
+        )
+        # Served by the composite above.
+        self.assertNotIn(
+            ("land_landtenementrental", BTREE, ("payment_status",)), candidates
+        )
+        stdout = io.StringIO()
+        call_command("audit_indexes", stdout=stdout)
+        self.assertIn(
+            "land_landtenementrental (payment_status, payment_date)", stdout.getvalue()
+        )
+        self.assertNotIn("(trust_village_id) btree", stdout.getvalue())
+
+    def test_only_project_tables_are_audited(self):
+        apps = {
+            candidate.model._meta.app_label
+            for candidate in admin_candidates(custom_admin_site)
+        }
+        self.assertNotIn("auth", apps)
+        self.assertIn("land", apps)
+
+    def test_generated_migration_creates_the_missing_indexes(self):
+        missing, _ = audit(custom_admin_site)
+        namespace = {}
+        exec(
+            migration_source([row[0] for row in missing], [("main", "0002")]), namespace
+        )
+        self.assertFalse(namespace["Migration"].atomic)
+        with connection.cursor() as cursor:
+            editor = SimpleNamespace(connection=connection, execute=cursor.execute)
+            namespace["create_indexes"](None, editor)
+            self.assertEqual(audit(custom_admin_site)[0], [])
+            namespace["drop_indexes"](None, editor)
+        self.assertEqual(len(audit(custom_admin_site)[0]), len(missing))
+
+
+class FakeConnection:
+    def __init__(self, status=TRANSACTION_STATUS_IDLE):
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=status)
+
+    def rollback(self):
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(TestCase):
+    def test_reuses_released_connections_up_to_max_size(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        self.assertIsNone(pool.checkout())
+        with self.assertRaises(OperationalError):
+            pool.checkout()
+
+        first = FakeConnection(TRANSACTION_STATUS_INTRANS)
+        pool.checkin(first)
+        self.assertIs(pool.checkout(), first)
+        self.assertEqual(first.info.transaction_status, TRANSACTION_STATUS_IDLE)
+        pool.checkin(first, discard=True)
+        self.assertEqual(first.closed, 1)
+        self.assertIsNone(pool.checkout())
+
+    def test_closes_connections_idle_too_long(self):
+        pool = ConnectionPool(max_size=2, max_idle=0)
+        connections = [FakeConnection(), FakeConnection()]
+        pool.checkout(), pool.checkout()
+        for fake in connections:
+            pool.checkin(fake)
+        self.assertIsNone(pool.checkout())
+        self.assertEqual([fake.closed for fake in connections], [1, 1])
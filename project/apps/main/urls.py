@@ -52,6 +52,11 @@ urlpatterns = [
         name="get_trust_villages_by_llg",
     ),
     path("get_trust_regions/", views.get_trust_regions_view, name="get_trust_regions"),
+    path(
+        "get_hierarchy_bundle/",
+        views.get_hierarchy_bundle_view,
+        name="get_hierarchy_bundle",
+    ),
     # path("login/", views.customLoginView, name="login"),
     # path("logout/", views.customLogoutView, name="logout"),
     path("crs/", custom_admin_site.urls),
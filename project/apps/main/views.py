@@ -3,53 +3,116 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.http import JsonResponse
-from .models import District, LocalLevelGovernment, TrustRegion, Village, TrustVillage
+from django.views.decorators.gzip import gzip_page
+from .cache import LOOKUPS, cached_json_response, get_version
+from .models import (
+    District,
+    LocalLevelGovernment,
+    Province,
+    TrustRegion,
+    Village,
+    TrustVillage,
+)
 
 
 # Create your views here.
 
 
+def _lookup_response(request, name, queryset, param=None):
+    value = request.GET.get(param) if param else None
+
+    def build():
+        if param:
+            return list(queryset.filter(**{param: value}).values("id", "name"))
+        return list(queryset.values("id", "name"))
+
+    return cached_json_response(request, LOOKUPS, f"{name}:{value}", build)
+
+
 def get_villages_by_llg_view(request):
-    llg_id = request.GET.get("llg_id")
-    villages = Village.objects.filter(llg_id=llg_id).values("id", "name")
-    return JsonResponse(list(villages), safe=False)
+    return _lookup_response(request, "villages_by_llg", Village.objects.all(), "llg_id")
 
 
 def get_trust_villages_by_llg_view(request):
-    llg_id = request.GET.get("llg_id")
-    villages = TrustVillage.objects.filter(llg_id=llg_id).values("id", "name")
-    return JsonResponse(list(villages), safe=False)
+    return _lookup_response(
+        request, "trust_villages_by_llg", TrustVillage.objects.all(), "llg_id"
+    )
 
 
 def get_trust_villages_by_district_view(request):
-    district_id = request.GET.get("district_id")
-    villages = TrustVillage.objects.filter(district_id=district_id).values("id", "name")
-    return JsonResponse(list(villages), safe=False)
+    return _lookup_response(
+        request,
+        "trust_villages_by_district",
+        TrustVillage.objects.all(),
+        "district_id",
+    )
 
 
 def get_villages_by_district_view(request):
-    district_id = request.GET.get("district_id")
-    villages = Village.objects.filter(district_id=district_id).values("id", "name")
-    return JsonResponse(list(villages), safe=False)
+    return _lookup_response(
+        request, "villages_by_district", Village.objects.all(), "district_id"
+    )
 
 
 def get_llgs_by_district_view(request):
-    district_id = request.GET.get("district_id")
-    llgs = LocalLevelGovernment.objects.filter(district_id=district_id).values(
-        "id", "name"
+    return _lookup_response(
+        request,
+        "llgs_by_district",
+        LocalLevelGovernment.objects.all(),
+        "district_id",
     )
-    return JsonResponse(list(llgs), safe=False)
 
 
 def get_districts_by_province_view(request):
-    province_id = request.GET.get("province_id")
-    districts = District.objects.filter(province_id=province_id).values("id", "name")
-    return JsonResponse(list(districts), safe=False)
+    return _lookup_response(
+        request, "districts_by_province", District.objects.all(), "province_id"
+    )
 
 
 def get_trust_regions_view(request):
-    regions = TrustRegion.objects.all()
-    return JsonResponse(list(regions), safe=False)
+    return _lookup_response(request, "trust_regions", TrustRegion.objects.all())
+
+
+def _columns(queryset, *fields):
+    rows = list(queryset.order_by("id").values_list("id", "name", *fields))
+    names = ("id", "name") + fields
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+
+@gzip_page
+def get_hierarchy_bundle_view(request):
+    # Whole Province -> District -> LLG -> Village tree in one columnar payload,
+    # optionally narrowed with ?province_id=. Clients that cache the bundle
+    # send back ?version= and get a body-less reply while it is still current.
+    version = get_version(LOOKUPS)["token"]
+    if request.GET.get("version") == version:
+        return JsonResponse({"version": version, "changed": False})
+
+    province_id = request.GET.get("province_id")
+
+    def build():
+        scope = {"province_id": province_id} if province_id else {}
+        provinces = Province.objects.all()
+        if province_id:
+            provinces = provinces.filter(id=province_id)
+        return {
+            "version": version,
+            "changed": True,
+            "provinces": _columns(provinces),
+            "districts": _columns(District.objects.filter(**scope), "province_id"),
+            "llgs": _columns(
+                LocalLevelGovernment.objects.filter(**scope), "district_id"
+            ),
+            "villages": _columns(Village.objects.filter(**scope), "llg_id"),
+            "trust_villages": _columns(
+                TrustVillage.objects.filter(**scope), "llg_id", "trust_region_id"
+            ),
+            "trust_regions": _columns(TrustRegion.objects.all()),
+        }
+
+    return cached_json_response(
+        request, LOOKUPS, f"bundle:{province_id or 'all'}", build
+    )
 
 
 @login_required(login_url="login")
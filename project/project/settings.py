@@ -13,20 +13,49 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+# Deployment settings and secrets come from CRS_* environment variables.
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return default if value in (None, "") else int(value)
+
+
+def env_list(name, default=()):
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
 
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-#ugae&5gnd&*9_2q@l27b9gmwd@a@zc=&%*_ny988certll=!p"
-
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Off unless CRS_DEBUG is set, which also allows the development key below.
+DEBUG = env_bool("CRS_DEBUG", False)
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get("CRS_SECRET_KEY")
+if not SECRET_KEY:
+    if not DEBUG:
+        raise ImproperlyConfigured(
+            "Set CRS_SECRET_KEY, or CRS_DEBUG=1 for local development."
+        )
+    SECRET_KEY = "django-insecure-#ugae&5gnd&*9_2q@l27b9gmwd@a@zc=&%*_ny988certll=!p"
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = env_list("CRS_ALLOWED_HOSTS")
 
 
 # Application definition
@@ -38,6 +67,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "apps.sysadmin.apps.SysadminConfig",
     "apps.main.apps.MainConfig",
     "apps.land.apps.LandConfig",
@@ -57,8 +87,22 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "apps.main.perf.PerfMiddleware",
 ]
 
+# Request timing and query recording, shown at /crs/_perf/. Off unless enabled.
+CRS_PERF_ENABLED = False
+CRS_PERF_SLOW_MS = 500
+CRS_PERF_BUFFER_SIZE = 500
+# Walks the stack on every query; turn on to trace slow queries to their code.
+CRS_PERF_CAPTURE_STACKS = False
+
+# Seconds the admin home dashboard tiles are cached between saves.
+CRS_DASHBOARD_TIMEOUT = 60 * 5
+
+# Months between tenement rental dues, for the rental ledger.
+CRS_RENTAL_PERIOD_MONTHS = 12
+
 ROOT_URLCONF = "project.urls"
 
 TEMPLATES = [
@@ -91,14 +135,46 @@ WSGI_APPLICATION = "project.wsgi.application"
 # }
 
 
+# Connections stay open for CRS_DB_CONN_MAX_AGE seconds and are checked
+# before each request reuses one, since connecting costs more than most of
+# the lookups themselves. With CRS_DB_POOL on, each worker process instead
+# shares up to CRS_DB_POOL_MAX_SIZE connections between its threads (see
+# apps/main/dbpool), so size it to the worker's threads: the database sees
+# workers x max size connections.
+DB_POOL = env_bool("CRS_DB_POOL")
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": "crs",
-        "USER": "crs",
-        "PASSWORD": "@crs$",
-        "HOST": "localhost",
-        "PORT": "5432",
+        "ENGINE": "apps.main.dbpool" if DB_POOL else "django.db.backends.postgresql",
+        "NAME": os.environ.get("CRS_DB_NAME", "crs"),
+        "USER": os.environ.get("CRS_DB_USER", "crs"),
+        "PASSWORD": os.environ.get("CRS_DB_PASSWORD", ""),
+        "HOST": os.environ.get("CRS_DB_HOST", "localhost"),
+        "PORT": os.environ.get("CRS_DB_PORT", "5432"),
+        # Pooled connections go back to the pool at the end of each request.
+        "CONN_MAX_AGE": 0 if DB_POOL else env_int("CRS_DB_CONN_MAX_AGE", 60),
+        "CONN_HEALTH_CHECKS": env_bool("CRS_DB_CONN_HEALTH_CHECKS", True),
+        "OPTIONS": {
+            "connect_timeout": env_int("CRS_DB_CONNECT_TIMEOUT", 10),
+        },
+    }
+}
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "max_size": env_int("CRS_DB_POOL_MAX_SIZE", 4),
+        "timeout": env_int("CRS_DB_POOL_TIMEOUT", 30),
+        "max_idle": env_int("CRS_DB_POOL_MAX_IDLE", 600),
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# File based so that invalidations are seen by every worker on the host.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache"),
     }
 }
 
@@ -140,6 +216,7 @@ USE_TZ = True
 STATIC_URL = "/static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
+PAYMENT_BATCH_ROOT = os.path.join(BASE_DIR, "payment_batches")
 STATIC_ROOT = os.path.join(BASE_DIR, "collected_static")
 
 STATICFILES_DIRS = [
@@ -157,14 +234,12 @@ STATICFILES_FINDERS = [
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-# settings.py
-
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
-EMAIL_HOST = "smtp.gmail.com"
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
-EMAIL_HOST_USER = "crdatam@gmail.com"
-EMAIL_HOST_PASSWORD = "fchksezzfzlygusc"
+EMAIL_HOST = os.environ.get("CRS_EMAIL_HOST", "smtp.gmail.com")
+EMAIL_PORT = env_int("CRS_EMAIL_PORT", 587)
+EMAIL_USE_TLS = env_bool("CRS_EMAIL_USE_TLS", True)
+EMAIL_HOST_USER = os.environ.get("CRS_EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.environ.get("CRS_EMAIL_HOST_PASSWORD", "")
 
 
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
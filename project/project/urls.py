@@ -12,6 +12,7 @@ from apps.sysadmin.views import (
     PasswordResetCommpleteView,
 )
 from apps.community_context.views import DwellingAutocomplete
+from apps.land.views import tenement_outlines_view
 
 # from sysadmin.admin import SuperUserAdminSite
 
@@ -48,6 +49,11 @@ urlpatterns = [
         DwellingAutocomplete.as_view(),
         name="dwelling_autocomplete",
     ),
+    path(
+        "tenement-outlines",
+        tenement_outlines_view,
+        name="tenement_outlines",
+    ),
     path("admin/", admin.site.urls),
     path("", include("apps.main.urls")),
 ]